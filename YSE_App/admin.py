@@ -43,6 +43,7 @@ admin.site.register(PhotometricBand)
 admin.site.register(PrincipalInvestigator)
 admin.site.register(Profile)
 admin.site.register(UserTelescopeToFollow)
+admin.site.register(UserQueryResult)
 #admin.site.register(UserQuery)
 admin.site.register(Host)
 admin.site.register(Transient)
@@ -58,8 +59,6 @@ admin.site.register(InformationSource)
 admin.site.register(TransientWebResource)
 admin.site.register(HostWebResource)
 admin.site.register(AlternateTransientNames)
-admin.site.register(TransientSpecData)
-admin.site.register(HostSpecData)
 admin.site.register(TransientPhotData)
 admin.site.register(HostPhotData)
 admin.site.register(TransientImage)
@@ -73,3 +72,10 @@ admin.site.register(Log)
 admin.site.register(TransientTag)
 admin.site.register(GWCandidate)
 admin.site.register(GWCandidateImage)
+admin.site.register(IngestJob)
+admin.site.register(IngestJobItem)
+admin.site.register(IngestFailure)
+admin.site.register(TransientEnrichment)
+admin.site.register(TransientLightCurveSummary)
+admin.site.register(TransientSearchDocument)
+admin.site.register(SiteNightEphemeris)
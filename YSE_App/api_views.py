@@ -1,7 +1,7 @@
 from django.http import HttpResponse, HttpResponseRedirect, Http404, JsonResponse
-from rest_framework import serializers, viewsets, status, permissions
+from rest_framework import serializers, viewsets, status, permissions, mixins
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, list_route
 from rest_framework import generics
 from rest_framework import viewsets
 from YSE_App.common import custom_viewsets
@@ -10,6 +10,7 @@ from rest_framework.reverse import reverse
 from .models import *
 from .serializers import *
 from .data import PhotometryService, SpectraService, ObservingResourceService
+from .common.cone_search import cone_search, radec_box_q
 
 from django_filters.rest_framework import DjangoFilterBackend,filters
 import django_filters
@@ -181,7 +182,7 @@ class TransientPhotometryViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet
 	lookup_field = "id"
 
 	def get_queryset(self):
-		allowed_phot = PhotometryService.GetAuthorizedTransientPhotometry_ByUser(self.request.user)
+		allowed_phot = PhotometryService.GetAuthorizedTransientPhotometry_ByUser(self.request.auth_context)
 		return allowed_phot
 
 class HostPhotometryViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -190,7 +191,7 @@ class HostPhotometryViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	lookup_field = "id"
 
 	def get_queryset(self):
-		allowed_phot = PhotometryService.GetAuthorizedHostPhotometry_ByUser(self.request.user)
+		allowed_phot = PhotometryService.GetAuthorizedHostPhotometry_ByUser(self.request.auth_context)
 		return allowed_phot
 
 class TransientPhotDataViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -198,7 +199,7 @@ class TransientPhotDataViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_phot_data = PhotometryService.GetAuthorizedTransientPhotData_ByUser(self.request.user)
+		allowed_phot_data = PhotometryService.GetAuthorizedTransientPhotData_ByUser(self.request.auth_context)
 		return allowed_phot_data
 
 
@@ -207,7 +208,7 @@ class HostPhotDataViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_phot_data = PhotometryService.GetAuthorizedHostPhotData_ByUser(self.request.user)
+		allowed_phot_data = PhotometryService.GetAuthorizedHostPhotData_ByUser(self.request.auth_context)
 		return allowed_phot_data
 
 
@@ -261,7 +262,7 @@ class TransientSpectrumViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	lookup_field = "id"
 
 	def get_queryset(self):
-		allowed_spec = SpectraService.GetAuthorizedTransientSpectrum_ByUser(self.request.user)
+		allowed_spec = SpectraService.GetAuthorizedTransientSpectrum_ByUser(self.request.auth_context)
 		return allowed_spec
 
 class HostSpectrumViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -270,23 +271,34 @@ class HostSpectrumViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	lookup_field = "id"
 
 	def get_queryset(self):
-		allowed_spec = SpectraService.GetAuthorizedHostSpectrum_ByUser(self.request.user)
+		allowed_spec = SpectraService.GetAuthorizedHostSpectrum_ByUser(self.request.auth_context)
 		return allowed_spec
 
-class TransientSpecDataViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
-	serializer_class = TransientSpecDataSerializer
+class SpecDataViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+	# spectra are stored packed, so individual data points are read-only
 	permission_classes = (permissions.IsAuthenticated,)
+	lookup_field = "id"
+	lookup_value_regex = "[0-9]+-[0-9]+"
+
+	def get_object(self):
+		spectrum_id,index = self.kwargs[self.lookup_field].split('-')
+		spec_data = self.get_queryset().get(int(spectrum_id),int(index))
+		if spec_data is None:
+			raise Http404
+		return spec_data
+
+class TransientSpecDataViewSet(SpecDataViewSet):
+	serializer_class = TransientSpecDataSerializer
 
 	def get_queryset(self):
-		allowed_spec_data = SpectraService.GetAuthorizedTransientSpecData_ByUser(self.request.user)
+		allowed_spec_data = SpectraService.GetAuthorizedTransientSpecData_ByUser(self.request.auth_context)
 		return allowed_spec_data
 
-class HostSpecDataViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
+class HostSpecDataViewSet(SpecDataViewSet):
 	serializer_class = HostSpecDataSerializer
-	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_spec_data = SpectraService.GetAuthorizedHostSpecData_ByUser(self.request.user)
+		allowed_spec_data = SpectraService.GetAuthorizedHostSpecData_ByUser(self.request.auth_context)
 		return allowed_spec_data
 
 ### `Telescope Resource` ViewSets ###
@@ -295,7 +307,7 @@ class ToOResourceViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_resource = ObservingResourceService.GetAuthorizedToOResource_ByUser(self.request.user)
+		allowed_resource = ObservingResourceService.GetAuthorizedToOResource_ByUser(self.request.auth_context)
 		return allowed_resource
 
 class QueuedResourceViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -303,7 +315,7 @@ class QueuedResourceViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_resource = ObservingResourceService.GetAuthorizedQueuedResource_ByUser(self.request.user)
+		allowed_resource = ObservingResourceService.GetAuthorizedQueuedResource_ByUser(self.request.auth_context)
 		return allowed_resource
 
 class ClassicalResourceViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -312,7 +324,7 @@ class ClassicalResourceViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_resource = ObservingResourceService.GetAuthorizedClassicalResource_ByUser(self.request.user)
+		allowed_resource = ObservingResourceService.GetAuthorizedClassicalResource_ByUser(self.request.auth_context)
 		return allowed_resource
 
 class ClassicalObservingDateViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
@@ -320,7 +332,7 @@ class ClassicalObservingDateViewSet(custom_viewsets.ListCreateRetrieveUpdateView
 	permission_classes = (permissions.IsAuthenticated,)
 
 	def get_queryset(self):
-		allowed_resource = ObservingResourceService.GetAuthorizedClassicalObservingDate_ByUser(self.request.user)
+		allowed_resource = ObservingResourceService.GetAuthorizedClassicalObservingDate_ByUser(self.request.auth_context)
 		return allowed_resource
 
 ### `Telescope` ViewSets ###
@@ -334,15 +346,23 @@ class TransientFilter(django_filters.FilterSet):
 	created_date_gte = django_filters.DateTimeFilter(name="created_date", lookup_expr='gte')
 	modified_date_gte = django_filters.DateTimeFilter(name="modified_date", lookup_expr='gte')
 	status_in = django_filters.BaseInFilter(name="status__name")#, lookup_expr='in')
-	ra_gte = django_filters.Filter(name="ra", lookup_expr='gte')
-	ra_lte = django_filters.Filter(name="ra", lookup_expr='lte')
-	dec_gte = django_filters.Filter(name="dec", lookup_expr='gte')
-	dec_lte = django_filters.Filter(name="dec", lookup_expr='lte')
+	ra_gte = django_filters.NumberFilter(name="ra", method='filter_radec_box')
+	ra_lte = django_filters.NumberFilter(name="ra", method='filter_radec_box')
+	dec_gte = django_filters.NumberFilter(name="dec", method='filter_radec_box')
+	dec_lte = django_filters.NumberFilter(name="dec", method='filter_radec_box')
 	
 	class Meta:
 		model = Transient
 		fields = ('created_date','modified_date')
 
+	def filter_radec_box(self, queryset, name, value):
+		# the four edges are applied together, by whichever of them is seen first,
+		# so the box can use the HEALPix index and ra_gte > ra_lte can wrap through RA=0
+		if getattr(self, '_radec_box_done', False): return queryset
+		self._radec_box_done = True
+		box = [self.form.cleaned_data.get(k) for k in ('ra_gte','ra_lte','dec_gte','dec_lte')]
+		return queryset.filter(radec_box_q(*[None if b is None else float(b) for b in box]))
+
 ### `Transient` ViewSets ###
 class TransientViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	queryset = Transient.objects.all()
@@ -352,6 +372,34 @@ class TransientViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	filter_class = TransientFilter
 	#filter_fields = ('status','created_date','modified_date','mw_ebv','status__name')
 
+	@list_route(methods=['get'], url_path='cone')
+	def cone(self, request):
+		"""
+		transients within radius (arcsec, default 5) of ra, dec (deg), nearest first,
+		each with its separation in arcsec.  the other transient filters still apply
+		"""
+		try:
+			ra,dec = float(request.query_params['ra']),float(request.query_params['dec'])
+			radius = float(request.query_params.get('radius',5))
+		except (KeyError, ValueError):
+			return Response({"message":"ra and dec (deg) are required, radius (arcsec) is optional"},
+							status=status.HTTP_400_BAD_REQUEST)
+		if abs(dec) > 90 or radius <= 0:
+			return Response({"message":"dec must be within +/-90 and radius positive"},
+							status=status.HTTP_400_BAD_REQUEST)
+
+		matches = cone_search(self.filter_queryset(self.get_queryset()), ra, dec, radius/3600.)
+		page = self.paginate_queryset(matches)
+		if page is not None: matches = page
+
+		data = []
+		for transient,sep in matches:
+			serializer = self.get_serializer(transient)
+			data += [dict(serializer.data, separation=sep*3600.)]
+		if page is not None:
+			return self.get_paginated_response(data)
+		return Response(data)
+
 class AlternateTransientNamesViewSet(custom_viewsets.ListCreateRetrieveUpdateViewSet):
 	queryset = AlternateTransientNames.objects.all()
 	serializer_class = AlternateTransientNamesSerializer
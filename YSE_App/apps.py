@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class YseAppConfig(AppConfig):
     name = 'YSE_App'
+
+    def ready(self):
+        from . import checks
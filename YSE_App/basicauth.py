@@ -1,24 +1,86 @@
 import datetime
 import json
- 
+import hashlib
+import hmac
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import HttpResponse, HttpResponseForbidden
 from django.contrib import auth
 from django.contrib.auth import authenticate, login
-  
+from django.contrib.auth.models import User
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework import exceptions
+
+# a verified username/password is remembered this long, so a bot posting
+# thousands of times a night pays for the password hash once every few
+# minutes instead of on every request
+credential_cache_seconds = getattr(settings,'CREDENTIAL_CACHE_SECONDS',300)
+
+def credential_cache_key(username, password):
+	# the cache never sees the password, only a keyed hash of it
+	digest = hmac.new(settings.SECRET_KEY.encode('utf-8'),
+					  ('%s:%s'%(username,password)).encode('utf-8'),hashlib.sha256).hexdigest()
+	return 'basicauth:%s'%digest
+
+def password_fingerprint(user):
+	# enough to notice a password change without putting the stored hash in the cache
+	return hashlib.sha256(user.password.encode('utf-8')).hexdigest()
+
+def authenticate_basic(username, password):
+	"""auth.authenticate() with the result cached for credential_cache_seconds"""
+	key = credential_cache_key(username, password)
+	cached = cache.get(key)
+	if cached is not None:
+		user_id,password_hash = cached
+		user = User.objects.filter(id=user_id).first()
+		# changing the password (or deactivating the user) invalidates the entry
+		if user is not None and user.is_active and password_fingerprint(user) == password_hash:
+			return user
+		cache.delete(key)
+
+	user = auth.authenticate(username=username, password=password)
+	if user is not None and user.is_active:
+		cache.set(key,(user.id,password_fingerprint(user)),credential_cache_seconds)
+	return user
+
+def authenticate_token(key):
+	"""the user of a rest_framework authtoken key, or None"""
+	token = Token.objects.select_related('user').filter(key=key).first()
+	return token.user if token is not None else None
+
+class CachedBasicAuthentication(BasicAuthentication):
+	"""rest_framework basic auth that goes through the same credential cache"""
+	def authenticate_credentials(self, userid, password, request=None):
+		user = authenticate_basic(userid, password)
+		if user is None or not user.is_active:
+			raise exceptions.AuthenticationFailed('Invalid username/password.')
+		return (user, None)
+
 # The basic auth decorator
 import base64
 def login_or_basic_auth_required(view):
+	"""
+	accepts "Authorization: Basic <user:password>", "Authorization: Token <key>"
+	or a logged-in session.  the authenticated user is attached as request.user,
+	so the views never need to look at the header again
+	"""
 	def _decorator(request, *args, **kwargs):
 		if 'HTTP_AUTHORIZATION' in request.META.keys():
 			auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-			if auth_method.lower() == 'basic':
-				credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-				username, password = credentials.split(':', 1)
-				user = auth.authenticate(username=username, password=password)
+			if auth_method.lower() in ('basic','token'):
+				if auth_method.lower() == 'basic':
+					credentials = base64.b64decode(credentials.strip()).decode('utf-8')
+					username, password = credentials.split(':', 1)
+					user = authenticate_basic(username, password)
+				else:
+					user = authenticate_token(credentials.strip())
 				if user is not None and user.is_active:
 					# Correct password, and the user is marked "active"
+					request.user = user
 					return view(request, *args, **kwargs)
 				else:
 					return HttpResponseForbidden('Incorrect user credentials.')
@@ -32,5 +94,3 @@ def login_or_basic_auth_required(view):
 			else:
 				return HttpResponseForbidden('Incorrect user credentials')
 	return _decorator
-
-
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# backends that keep their entries inside one process
+process_local_caches = ('django.core.cache.backends.locmem.LocMemCache',
+						'django.core.cache.backends.dummy.DummyCache')
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+	"""the default cache holds group ids and invalidation versions, so every process has to see the same one"""
+	backend = settings.CACHES.get('default',{}).get('BACKEND')
+	if backend in process_local_caches:
+		return [Warning('the default cache (%s) is local to each process'%backend,
+						hint='user group ids and cache invalidations made by one process will not reach the others; '
+						'configure a shared cache such as memcached in CACHES',
+						id='YSE_App.W001')]
+	return []
@@ -212,6 +212,35 @@ def sendemail(from_addr, to_addr,
 		except:
 			print("Send fail")
 
+def sendemails(from_addr, messages,
+			   login, password, smtpserver):
+	"""send [(to_addr, subject, message), ...] over one SMTP connection; returns which ones went out"""
+
+	print("Preparing %i emails"%len(messages))
+
+	sent = [False]*len(messages)
+	if not len(messages): return sent
+	try:
+		with smtplib.SMTP(smtpserver) as server:
+			server.starttls()
+			server.login(login, password)
+			for i,(to_addr,subject,message) in enumerate(messages):
+				msg = MIMEMultipart('alternative')
+				msg['Subject'] = subject
+				msg['From'] = from_addr
+				msg['To'] = to_addr
+				msg.attach(MIMEText(message, 'html'))
+				try:
+					server.sendmail(from_addr, [to_addr], msg.as_string())
+					sent[i] = True
+				except smtplib.SMTPException:
+					print("Send fail: %s"%to_addr)
+	except (smtplib.SMTPException, OSError) as e:
+		print("Send fail: %s"%e)
+
+	print("Sent %i of %i emails"%(sum(sent),len(messages)))
+	return sent
+
 def sendsms(from_addr, to_addr,
 			subject, message,
 			login, password, smtpserver, cc_addr=None):
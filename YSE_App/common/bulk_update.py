@@ -0,0 +1,23 @@
+from django.db.models import Case, When, Value
+
+def bulk_update(model, objs, fields, batch_size=500):
+	"""
+	UPDATE ... SET f = CASE WHEN pk=... for a list of instances.
+	QuerySet.bulk_update only exists from Django 2.2, so fall back to the
+	same CASE/WHEN construction on older versions
+	"""
+	if not objs: return 0
+	if hasattr(model.objects, 'bulk_update'):
+		return model.objects.bulk_update(objs, fields, batch_size=batch_size)
+
+	fields = [model._meta.get_field(f) for f in fields]
+	nupdated = 0
+	for i in range(0,len(objs),batch_size):
+		batch = objs[i:i+batch_size]
+		update_kwargs = {}
+		for field in fields:
+			whens = [When(pk=obj.pk, then=Value(getattr(obj, field.attname), output_field=field))
+					 for obj in batch]
+			update_kwargs[field.attname] = Case(*whens, output_field=field)
+		nupdated += model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**update_kwargs)
+	return nupdated
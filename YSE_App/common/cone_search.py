@@ -0,0 +1,107 @@
+import healpy as hp
+import numpy as np
+from django.db.models import Q
+
+# Transient.healpix and Host.healpix are nested pixels at this order (~3.2 arcsec pixels).
+# changing it means recomputing both columns
+healpix_order = 16
+healpix_nside = 2**healpix_order
+
+# ra/dec boxes bigger than this (deg, center to corner) don't bother with the index
+max_box_radius = 10.
+
+def radec_to_healpix(ra, dec):
+	"""nested HEALPix pixel(s) of ra, dec (deg) at healpix_nside, vectorised"""
+	return hp.ang2pix(healpix_nside, ra, dec, nest=True, lonlat=True)
+
+def healpix_or_none(ra, dec):
+	"""the healpix value to store for one object, None if it has no usable position"""
+	if ra is None or dec is None: return None
+	ra,dec = float(ra),float(dec)
+	if not np.isfinite(ra) or not np.isfinite(dec) or abs(dec) > 90: return None
+	return int(radec_to_healpix(ra, dec))
+
+def angular_separation(ra1, dec1, ra2, dec2):
+	"""great-circle distance (deg) by the haversine formula, vectorised over any of the inputs"""
+	ra1,dec1,ra2,dec2 = [np.radians(np.asarray(x,dtype=float)) for x in (ra1,dec1,ra2,dec2)]
+	a = np.sin((dec2-dec1)/2.)**2 + np.cos(dec1)*np.cos(dec2)*np.sin((ra2-ra1)/2.)**2
+	return np.degrees(2*np.arcsin(np.sqrt(np.clip(a,0,1))))
+
+def radec_to_vec(ra, dec):
+	ra,dec = np.radians(np.asarray(ra,dtype=float)),np.radians(np.asarray(dec,dtype=float))
+	return np.column_stack([np.cos(dec)*np.cos(ra),np.cos(dec)*np.sin(ra),np.sin(dec)])
+
+def radius_to_chord(radius):
+	"""great-circle radius (deg) -> straight-line distance between unit vectors"""
+	return 2*np.sin(np.radians(np.asarray(radius,dtype=float))/2.)
+
+def chord_to_radius(chord):
+	return np.degrees(2*np.arcsin(np.clip(np.asarray(chord,dtype=float)/2.,0,1)))
+
+def pixel_ranges(ra, dec, radius):
+	"""
+	[(first, last), ...] inclusive ranges of index pixels that together cover
+	the cone of radius (deg) around ra, dec.  the cone is covered at the coarsest
+	order whose pixels are still about the size of the radius; in nested order
+	each of those is one contiguous block of index pixels, so a handful of
+	BETWEENs on the indexed column fetch every candidate.  HEALPix has no
+	seam at RA=0 and no singularity at the poles, so neither needs special care
+	"""
+	radius = np.radians(radius)
+	order = healpix_order
+	while order > 0 and hp.nside2resol(2**order) < radius: order -= 1
+
+	vec = hp.ang2vec(ra, dec, lonlat=True)
+	pix = np.sort(hp.query_disc(2**order, vec, radius, inclusive=True, nest=True))
+	if not len(pix): pix = np.array([hp.vec2pix(2**order, *vec, nest=True)])
+
+	# runs of consecutive coarse pixels -> one range each
+	breaks = np.where(np.diff(pix) != 1)[0]
+	starts,ends = pix[np.r_[0,breaks+1]],pix[np.r_[breaks,len(pix)-1]]
+	shift = 2*(healpix_order-order)
+	return [(int(s) << shift,((int(e)+1) << shift)-1) for s,e in zip(starts,ends)]
+
+def healpix_q(ra, dec, radius, field='healpix'):
+	"""Q() selecting every row whose pixel may be within radius (deg) of ra, dec"""
+	q = Q()
+	for first,last in pixel_ranges(ra, dec, radius):
+		if first == last: q |= Q(**{field:first})
+		else: q |= Q(**{'%s__range'%field:(first,last)})
+	return q
+
+def cone_search(queryset, ra, dec, radius):
+	"""
+	[(object, separation in deg), ...] for everything in queryset (Transients or
+	Hosts) within radius (deg) of ra, dec, nearest first
+	"""
+	candidates = list(queryset.filter(healpix_q(ra, dec, radius)))
+	if not len(candidates): return []
+
+	sep = angular_separation(ra, dec, [c.ra for c in candidates], [c.dec for c in candidates])
+	order = np.argsort(sep, kind='mergesort')
+	return [(candidates[i],float(sep[i])) for i in order if sep[i] <= radius]
+
+def radec_box_q(ra_min=None, ra_max=None, dec_min=None, dec_max=None):
+	"""
+	Q() for ra_min <= ra <= ra_max and dec_min <= dec <= dec_max, any of which
+	may be None.  ra_min > ra_max is a box through RA=0.  a small enough box
+	with all four edges is narrowed to the pixels of its circumscribed cone first
+	"""
+	q = Q()
+	if ra_min is not None and ra_max is not None and ra_min > ra_max:
+		q &= Q(ra__gte=ra_min) | Q(ra__lte=ra_max)
+	else:
+		if ra_min is not None: q &= Q(ra__gte=ra_min)
+		if ra_max is not None: q &= Q(ra__lte=ra_max)
+	if dec_min is not None: q &= Q(dec__gte=dec_min)
+	if dec_max is not None: q &= Q(dec__lte=dec_max)
+
+	if None in (ra_min,ra_max,dec_min,dec_max): return q
+	ra_width = (ra_max-ra_min) % 360.
+	ra_center,dec_center = ra_min + ra_width/2.,(dec_min+dec_max)/2.
+	# the farthest point of the box from its center is always a corner
+	radius = np.max(angular_separation(ra_center, dec_center, [ra_min,ra_min,ra_max,ra_max],
+									   [dec_min,dec_max,dec_min,dec_max]))
+	if radius <= max_box_radius:
+		q &= healpix_q(ra_center, dec_center, radius)
+	return q
@@ -0,0 +1,123 @@
+import datetime
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from django.db.models import Q
+from django.utils import timezone
+from YSE_App.models import Transient, AlternateTransientNames
+from YSE_App.common.cone_search import radec_to_vec, radius_to_chord, chord_to_radius
+
+# a full rebuild also picks up positions changed with QuerySet.update(), which
+# leaves modified_date alone and so never shows up as a change
+rebuild_seconds = 3600
+# rows changed this long before the last sync are fetched again, to cover clock skew
+sync_overlap_seconds = 60
+# rebuild once the changed rows outnumber this fraction of the tree
+max_delta_fraction = 0.1
+min_delta_rebuild = 1000
+
+class TransientIndex(object):
+	"""
+	KD-tree over the unit vectors of every Transient, kept per process.  each
+	query first asks the database for transients added or saved since the last
+	one; those go into a small separate delta (and their old tree entries
+	are masked) until there are enough of them to be worth a rebuild.  a change
+	in the row count that additions don't explain means something was deleted,
+	which also forces a rebuild
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.tree = None
+		self.built = None
+
+	def _fetch(self, queryset):
+		rows = np.array(list(queryset.order_by('id').values_list('id','ra','dec')),dtype=float).reshape(-1,3)
+		return rows[:,0].astype(int),radec_to_vec(rows[:,1],rows[:,2])
+
+	def rebuild(self):
+		now = timezone.now()
+		self.ids,vec = self._fetch(Transient.objects.all())
+		self.tree = cKDTree(vec) if len(self.ids) else None
+		self.live = np.ones(len(self.ids),dtype=bool)
+		self.delta_ids,self.delta_vec = np.zeros(0,dtype=int),np.zeros((0,3))
+		self.count = len(self.ids)
+		self.max_id = int(self.ids.max()) if len(self.ids) else 0
+		self.built = self.synced = now
+
+	def sync(self):
+		now = timezone.now()
+		if self.built is None or (now - self.built).total_seconds() > rebuild_seconds:
+			return self.rebuild()
+
+		since = self.synced - datetime.timedelta(seconds=sync_overlap_seconds)
+		ids,vec = self._fetch(Transient.objects.filter(Q(id__gt=self.max_id) | Q(modified_date__gte=since)))
+		n_new = np.sum(ids > self.max_id)
+		if Transient.objects.count() != self.count + n_new:
+			return self.rebuild()
+
+		if len(ids):
+			# changed rows replace their tree entries and any earlier delta entries
+			idx = np.searchsorted(self.ids,ids)
+			in_tree = (idx < len(self.ids)) & (self.ids[np.minimum(idx,len(self.ids)-1)] == ids) \
+					  if len(self.ids) else np.zeros(len(ids),dtype=bool)
+			self.live[idx[in_tree]] = False
+			keep = ~np.in1d(self.delta_ids,ids)
+			self.delta_ids = np.concatenate([self.delta_ids[keep],ids])
+			self.delta_vec = np.concatenate([self.delta_vec[keep],vec])
+			self.count += n_new
+			self.max_id = max(self.max_id,int(ids.max()))
+		self.synced = now
+
+		if len(self.delta_ids) > max(min_delta_rebuild,max_delta_fraction*len(self.ids)):
+			self.rebuild()
+
+	def query(self, ra, dec, radius):
+		"""
+		for each position, [(transient_id, separation in deg), ...] within its
+		radius (deg), nearest first.  ra, dec and radius are arrays
+		"""
+		vec = radec_to_vec(ra,dec)
+		chord = radius_to_chord(np.broadcast_to(radius,(len(vec),)))
+		matches = [[] for i in range(len(vec))]
+
+		if self.tree is not None:
+			for i,idx in enumerate(self.tree.query_ball_point(vec,chord)):
+				idx = np.array(idx,dtype=int)
+				idx = idx[self.live[idx]]
+				if len(idx):
+					d = np.sqrt(np.sum((self.tree.data[idx]-vec[i])**2,axis=1))
+					matches[i] += list(zip(self.ids[idx].tolist(),chord_to_radius(d).tolist()))
+
+		if len(self.delta_ids):
+			# the delta is small, a throwaway tree is cheaper than N x delta distances
+			for i,idx in enumerate(cKDTree(self.delta_vec).query_ball_point(vec,chord)):
+				idx = np.array(idx,dtype=int)
+				if len(idx):
+					d = np.sqrt(np.sum((self.delta_vec[idx]-vec[i])**2,axis=1))
+					matches[i] += list(zip(self.delta_ids[idx].tolist(),chord_to_radius(d).tolist()))
+
+		return [sorted(m,key=lambda x: x[1]) for m in matches]
+
+transient_index = TransientIndex()
+
+def crossmatch(ra, dec, radius):
+	"""
+	match many positions against every Transient at once.  returns, for each
+	position, a list of dicts with the transient's id, name, ra, dec, alternate
+	names and separation (arcsec), nearest first.  ra, dec, radius in deg
+	"""
+	with transient_index.lock:
+		transient_index.sync()
+		matches = transient_index.query(ra, dec, radius)
+
+	ids = set(tid for m in matches for tid,sep in m)
+	transients = {t['id']:t for t in Transient.objects.filter(id__in=ids).values('id','name','ra','dec')}
+	alt_names = {}
+	for tid,name in AlternateTransientNames.objects.filter(transient_id__in=ids).values_list('transient_id','name'):
+		alt_names.setdefault(tid,[]).append(name)
+
+	results = []
+	for m in matches:
+		results += [[dict(transients[tid],alternate_names=alt_names.get(tid,[]),separation=sep*3600.)
+					 for tid,sep in m if tid in transients]]
+	return results
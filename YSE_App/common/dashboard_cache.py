@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from YSE_App.models import Transient
+
+# the dashboard's rendered tables are cached per status.  each status has a
+# version number that's part of its tables' cache keys; changing a transient
+# bumps the version of its old and new status, so the stale fragments are
+# never read again and expire on their own
+dashboard_cache_seconds = getattr(settings,'DASHBOARD_CACHE_SECONDS',600)
+
+def status_version_key(status_id):
+	return 'dashboard_status_version:%s'%status_id
+
+def new_version():
+	# a version that was evicted mustn't start again from a number already used
+	return int(time.time()*1000)
+
+def status_versions(status_ids):
+	"""{status id: version} for status_ids, from the cache"""
+	keys = {status_version_key(s):s for s in status_ids}
+	versions = cache.get_many(list(keys.keys()))
+	for key in set(keys.keys()) - set(versions.keys()):
+		cache.add(key,new_version(),None)
+		versions[key] = cache.get(key)
+	return {s:versions[k] for k,s in keys.items()}
+
+def forget_statuses(status_ids):
+	"""the dashboard tables for status_ids have to be rendered again"""
+	for status_id in set(status_ids):
+		if status_id is None: continue
+		try: cache.incr(status_version_key(status_id))
+		except ValueError: cache.set(status_version_key(status_id),new_version(),None)
+
+def forget_transients(transient_ids):
+	"""the same for the statuses of transient_ids, e.g. after their photometry changed"""
+	transient_ids = set(transient_ids)
+	if not len(transient_ids): return
+	forget_statuses(Transient.objects.filter(id__in=transient_ids).values_list('status_id',flat=True).distinct())
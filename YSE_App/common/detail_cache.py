@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import cache
+from YSE_App.common.dashboard_cache import new_version
+
+# what the transient detail page shows besides the transient itself is cached
+# per transient and group set, see YSE_App/transient_detail_utils.py.  as for
+# the dashboard, each transient has a version number that's part of the key
+# and writes to anything the page shows bump it
+detail_cache_seconds = getattr(settings,'TRANSIENT_DETAIL_CACHE_SECONDS',600)
+
+def detail_version_key(transient_id):
+	return 'transient_detail_version:%s'%transient_id
+
+def detail_version(transient_id):
+	key = detail_version_key(transient_id)
+	version = cache.get(key)
+	if version is None:
+		cache.add(key,new_version(),None)
+		version = cache.get(key)
+	return version
+
+def forget_transient_details(transient_ids):
+	"""the detail pages of transient_ids have to be gathered again"""
+	for transient_id in set(transient_ids):
+		if transient_id is None: continue
+		try: cache.incr(detail_version_key(transient_id))
+		except ValueError: cache.set(detail_version_key(transient_id),new_version(),None)
@@ -0,0 +1,96 @@
+import datetime
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from astropy.time import Time
+from YSE_App.models import Telescope, SiteNightEphemeris
+from YSE_App.common.observability import SiteNight, night_of
+
+# the sun and moon of each telescope's observing nights, stored in
+# SiteNightEphemeris so the observing night pages, the resource tables and
+# the template filters never work them out twice.  a night missing from the
+# table is worked out and stored the first time it's asked about;
+# manage.py precompute_ephemerides fills in the months ahead.  a row is
+# worked out again if the telescope has moved since
+time_fields = ('sun_evening','sun_morning','civil_evening','civil_morning','nautical_evening',
+			   'nautical_morning','astronomical_evening','astronomical_morning','night_start','night_end',
+			   'moonrise','moonset')
+value_fields = ('moon_illumination','moon_ra','moon_dec')
+
+def night_date(obs_date):
+	"""the date an observing night (a date or a datetime) is stored under"""
+	if isinstance(obs_date,datetime.datetime): return obs_date.date()
+	if isinstance(obs_date,str): return datetime.datetime.strptime(obs_date.split()[0].split('T')[0],'%Y-%m-%d').date()
+	return obs_date
+
+def as_datetime(time):
+	if time is None: return None
+	return time.to_datetime(timezone=timezone.utc)
+
+def compute_ephemeris(telescope, date):
+	"""an unsaved SiteNightEphemeris for telescope's site on date"""
+	values = SiteNight.for_telescope(telescope,night_of(date)).ephemeris()
+	row = SiteNightEphemeris(telescope=telescope,date=date,latitude=telescope.latitude,
+							 longitude=telescope.longitude,elevation=telescope.elevation,
+							 created_by_id=telescope.created_by_id,modified_by_id=telescope.modified_by_id)
+	for field in time_fields: setattr(row,field,as_datetime(values[field]))
+	for field in value_fields: setattr(row,field,values[field])
+	return row
+
+def store(rows):
+	"""save rows, new or recomputed; another process may have stored the same nights meanwhile"""
+	for row in rows:
+		try:
+			with transaction.atomic():
+				SiteNightEphemeris.objects.filter(telescope_id=row.telescope_id,date=row.date).delete()
+				row.save()
+		except IntegrityError:
+			pass
+
+def get_ephemerides(telescope_dates):
+	"""
+	{(telescope id, date): SiteNightEphemeris} for (telescope, date or
+	datetime) pairs, in one query plus whatever has to be worked out
+	"""
+	telescopes,dates = {},set()
+	for telescope,date in telescope_dates:
+		telescopes[telescope.id] = telescope
+		dates.add(night_date(date))
+	wanted = set((telescope.id,night_date(date)) for telescope,date in telescope_dates)
+	if not wanted: return {}
+
+	ephemerides = {}
+	for row in SiteNightEphemeris.objects.filter(telescope_id__in=telescopes.keys(),date__in=dates):
+		key = (row.telescope_id,row.date)
+		if key in wanted and row.same_site(telescopes[row.telescope_id]): ephemerides[key] = row
+
+	missing = [compute_ephemeris(telescopes[t],d) for t,d in sorted(wanted - set(ephemerides.keys()))]
+	store(missing)
+	for row in missing:
+		ephemerides[(row.telescope_id,row.date)] = row
+	return ephemerides
+
+def get_ephemeris(telescope, date):
+	return get_ephemerides([(telescope,date)])[(telescope.id,night_date(date))]
+
+def ephemeris_site_night(ephemeris, telescope=None):
+	"""the SiteNight of a stored ephemeris, with its night and moon taken from it"""
+	telescope = telescope or ephemeris.telescope
+	night = (Time(ephemeris.night_start),Time(ephemeris.night_end)) if ephemeris.night_start else (None,None)
+	return SiteNight.from_ephemeris(telescope.latitude,telescope.longitude,telescope.elevation,night_of(ephemeris.date),
+									night,ephemeris.moon_ra,ephemeris.moon_dec)
+
+def stored_site_night(telescope, obs_date):
+	"""the SiteNight of telescope on obs_date, from the ephemeris table"""
+	return ephemeris_site_night(get_ephemeris(telescope,obs_date),telescope)
+
+def precompute_ephemerides(telescopes=None, start=None, ndays=90):
+	"""store the ephemerides of telescopes (default all) for ndays from start (default today) that aren't there yet"""
+	telescopes = list(telescopes if telescopes is not None else Telescope.objects.all())
+	start = night_date(start or timezone.now())
+	dates = [start + datetime.timedelta(days=i) for i in range(ndays)]
+	n_nights = 0
+	for telescope in telescopes:
+		n_stored = SiteNightEphemeris.objects.filter(telescope=telescope,date__in=dates).count()
+		get_ephemerides([(telescope,d) for d in dates])
+		n_nights += SiteNightEphemeris.objects.filter(telescope=telescope,date__in=dates).count() - n_stored
+	return n_nights
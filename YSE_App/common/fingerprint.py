@@ -0,0 +1,15 @@
+import hashlib
+import json
+
+def _default(x):
+	# numpy arrays/scalars, datetimes
+	if hasattr(x,'tolist'): return x.tolist()
+	return str(x)
+
+def fingerprint(*objs):
+	"""
+	sha256 of a canonical JSON encoding of objs.  dict order doesn't matter,
+	list order does, so two uploads with the same content get the same hash
+	"""
+	text = json.dumps(objs,sort_keys=True,default=_default,separators=(',',':'))
+	return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,120 @@
+import time
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import Group
+from YSE_App.common.dashboard_cache import new_version
+from YSE_App.models import Instrument, ObservationGroup, PhotometricBand, DataQuality, \
+	TransientStatus, TransientClass, TransientTag, InternalSurvey, AntaresClassification
+
+# name -> pk maps for the small enum-like tables the ingestion endpoints
+# look things up in.  each table is warmed with a single query the first time
+# it is needed and thrown away whenever a row of it is saved or deleted.
+# the maps are per process, so saving or deleting a row also bumps the
+# table's version in the shared cache, which every process checks before
+# trusting its map
+cached_models = (Instrument, ObservationGroup, PhotometricBand, DataQuality,
+				 TransientStatus, TransientClass, TransientTag, InternalSurvey,
+				 AntaresClassification, Group)
+
+# a name that isn't in the cache may have been added by another process;
+# re-read the table on a miss, but no more often than this
+refresh_on_miss_seconds = 60
+# how long a map is trusted before its version is checked again
+version_check_seconds = 5
+
+_cache = {}
+
+def version_key(model):
+	return 'fk_resolver_version:%s'%model._meta.label
+
+def _version(model):
+	key = version_key(model)
+	version = cache.get(key)
+	if version is None:
+		cache.add(key,new_version(),None)
+		version = cache.get(key)
+	return version
+
+def _forget(model):
+	"""every process has to re-read model's table"""
+	invalidate(model)
+	try: cache.incr(version_key(model))
+	except ValueError: cache.set(version_key(model),new_version(),None)
+
+def _warm(model):
+	# the version is read first, so a change made while the table is read
+	# is picked up at the next check
+	version = _version(model)
+	names,pks,bands = {},set(),{}
+	if model is PhotometricBand:
+		rows = PhotometricBand.objects.order_by('pk').values_list('pk','name','instrument__name')
+		for pk,name,instrument_name in rows:
+			bands.setdefault((name,instrument_name),pk)
+			names.setdefault(name,pk)
+			pks.add(pk)
+	else:
+		for pk,name in model.objects.order_by('pk').values_list('pk','name'):
+			names.setdefault(name,pk)
+			pks.add(pk)
+
+	_cache[model] = {'names':names,'pks':pks,'bands':bands,'version':version,
+					 'time':time.time(),'checked':time.time()}
+	return _cache[model]
+
+def _get(model, refresh=False):
+	entry = _cache.get(model)
+	now = time.time()
+	if entry is not None and now - entry['checked'] > version_check_seconds:
+		if _version(model) != entry['version']: entry = None
+		else: entry['checked'] = now
+	if entry is None or \
+	   (refresh and now - entry['time'] > refresh_on_miss_seconds):
+		entry = _warm(model)
+	return entry
+
+def invalidate(model=None):
+	if model is None: _cache.clear()
+	else: _cache.pop(model,None)
+
+def get_pk(model, name, default_name=None):
+	"""
+	pk of the first `model` row called `name`, or of the row called
+	`default_name` if there isn't one (None if neither exists).  models
+	outside of cached_models are passed straight through to the database
+	"""
+	if model not in cached_models:
+		for n in (name,default_name):
+			if n is None: continue
+			pk = model.objects.filter(name=n).values_list('pk',flat=True).first()
+			if pk is not None: return pk
+		return None
+
+	names = _get(model)['names']
+	if name not in names: names = _get(model,refresh=True)['names']
+	if name in names: return names[name]
+	if default_name is not None: return names.get(default_name)
+	return None
+
+def get_band_pk(name, instrument_name, default_name='Unknown'):
+	"""pk of band `name` on `instrument_name`, falling back to the band `default_name`"""
+	bands = _get(PhotometricBand)['bands']
+	if (name,instrument_name) not in bands: bands = _get(PhotometricBand,refresh=True)['bands']
+	if (name,instrument_name) in bands: return bands[(name,instrument_name)]
+	if default_name is not None: return _get(PhotometricBand)['names'].get(default_name)
+	return None
+
+def has_pk(model, pk):
+	if model not in cached_models:
+		return model.objects.filter(pk=pk).exists()
+	pks = _get(model)['pks']
+	if pk not in pks: pks = _get(model,refresh=True)['pks']
+	return pk in pks
+
+def _invalidate_on_change(sender, **kwargs):
+	_forget(sender)
+	# bands are keyed on their instrument's name
+	if sender is Instrument: _forget(PhotometricBand)
+
+for model in cached_models:
+	post_save.connect(_invalidate_on_change, sender=model, dispatch_uid='fk_resolver_save_%s'%model.__name__)
+	post_delete.connect(_invalidate_on_change, sender=model, dispatch_uid='fk_resolver_delete_%s'%model.__name__)
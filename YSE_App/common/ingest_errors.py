@@ -0,0 +1,100 @@
+import threading
+import uuid
+from django.conf import settings
+from django.contrib.auth.models import User
+from django_cron import CronJobBase, Schedule
+from YSE_App.models import IngestFailure
+from YSE_App.common.alert import sendemails
+
+_local = threading.local()
+
+class IngestFailureCollector(object):
+	"""
+	gathers everything that goes wrong during one ingest run and writes it to
+	IngestFailure in one go on exit.  nothing is mailed from here; the digest
+	cron picks the rows up later
+
+	with IngestFailureCollector(user) as failures:
+		failures.add('2019abc','no such status','status','Foo')
+	"""
+	def __init__(self, user, ingest_job=None):
+		self.user = user
+		self.ingest_job = ingest_job
+		self.run_id = uuid.uuid4().hex
+		self.failures = []
+
+	def add(self, transient_name, message, field=None, value=None):
+		print('Transient %s: %s'%(transient_name,message))
+		self.failures += [IngestFailure(
+			ingest_job=self.ingest_job,run_id=self.run_id,transient_name=transient_name,
+			message=message,field=field,value=None if value is None else str(value),
+			created_by_id=self.user.id,modified_by_id=self.user.id)]
+
+	def flush(self):
+		IngestFailure.objects.bulk_create(self.failures)
+		self.failures = []
+
+	def __enter__(self):
+		if not hasattr(_local,'collectors'): _local.collectors = []
+		_local.collectors += [self]
+		return self
+
+	def __exit__(self, exc_type, exc_value, tb):
+		_local.collectors.pop()
+		self.flush()
+		return False
+
+def report_ingest_failure(user, transient_name, message, field=None, value=None):
+	"""record a failure with the innermost active collector, or on its own if there isn't one"""
+	collectors = getattr(_local,'collectors',[])
+	if len(collectors):
+		collectors[-1].add(transient_name, message, field=field, value=value)
+	else:
+		with IngestFailureCollector(user) as failures:
+			failures.add(transient_name, message, field=field, value=value)
+
+def send_ingest_failure_digests():
+	"""one email per user and ingest run, all sent over a single SMTP connection"""
+	pending = IngestFailure.objects.filter(notified=False).order_by('created_by_id','run_id','id')
+	if not pending.exists(): return 0
+
+	users = {u.id:u for u in User.objects.filter(id__in=pending.values('created_by_id'))}
+	digests = {}
+	for f in pending:
+		digests.setdefault((f.created_by_id,f.run_id),[]).append(f)
+
+	messages,message_ids = [],[]
+	for (user_id,run_id),failures in digests.items():
+		if not users[user_id].email:
+			# nobody to tell
+			IngestFailure.objects.filter(id__in=[f.id for f in failures]).update(notified=True)
+			continue
+		html_msg = "Alert : YSE_PZ failed to upload %i transient(s)"%len(set(f.transient_name for f in failures))
+		if failures[0].ingest_job_id: html_msg += " in ingest job %i"%failures[0].ingest_job_id
+		html_msg += "<br><br>\n"
+		for f in failures:
+			if f.field:
+				html_msg += "%s : %s value doesn't exist in the %s FK relationship<br>\n"%(f.transient_name,f.value,f.field)
+			else:
+				html_msg += "%s : %s<br>\n"%(f.transient_name,f.message)
+		messages += [(users[user_id].email,"TNS Transient Upload Failure",html_msg)]
+		message_ids += [[f.id for f in failures]]
+
+	smtpserver = "%s:%s" % (settings.SMTP_HOST, settings.SMTP_PORT)
+	from_addr = "%s@gmail.com" % settings.SMTP_LOGIN
+	sent = sendemails(from_addr, messages, settings.SMTP_LOGIN, settings.SMTP_PASSWORD, smtpserver)
+
+	# anything that didn't go out is retried on the next run
+	sent_ids = [i for ids,ok in zip(message_ids,sent) if ok for i in ids]
+	IngestFailure.objects.filter(id__in=sent_ids).update(notified=True)
+	return sum(sent)
+
+class ingest_failure_digest_cron(CronJobBase):
+	RUN_EVERY_MINS = 10
+
+	schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+	code = 'YSE_App.common.ingest_errors.ingest_failure_digest_cron'
+
+	def do(self):
+		n_sent = send_ingest_failure_digests()
+		print('sent %i ingest failure digest(s)'%n_sent)
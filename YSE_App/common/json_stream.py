@@ -0,0 +1,84 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+class _Reader(object):
+	"""text buffer over a file-like object (a request, an open file, io.StringIO)"""
+	def __init__(self, stream, chunk_size):
+		self.stream = stream
+		self.chunk_size = chunk_size
+		self.decoder = codecs.getincrementaldecoder('utf-8')()
+		self.buf = ''
+		self.pos = 0
+		self.eof = False
+
+	def fill(self, nbytes=None):
+		"""read more of the stream into the buffer, returns False at EOF"""
+		if self.eof: return False
+		chunk = self.stream.read(max(nbytes or 0,self.chunk_size))
+		if isinstance(chunk,bytes):
+			text = self.decoder.decode(chunk,final=not chunk)
+		else: text = chunk
+		if not chunk: self.eof = True
+		# drop everything already consumed so the buffer only ever holds the current item
+		self.buf = self.buf[self.pos:] + text
+		self.pos = 0
+		return bool(chunk)
+
+	def peek(self):
+		"""next non-whitespace character, or '' at EOF"""
+		while True:
+			while self.pos < len(self.buf) and self.buf[self.pos] in _whitespace:
+				self.pos += 1
+			if self.pos < len(self.buf): return self.buf[self.pos]
+			if not self.fill(): return ''
+
+	def expect(self, chars):
+		c = self.peek()
+		if c == '' or c not in chars:
+			raise json.JSONDecodeError('Expecting one of %r'%chars,self.buf,self.pos)
+		self.pos += 1
+		return c
+
+	def value(self):
+		"""decode one complete JSON value, reading more of the stream until it is all there"""
+		self.peek()
+		while True:
+			try:
+				obj,end = _decoder.raw_decode(self.buf,self.pos)
+			except json.JSONDecodeError:
+				# read as much again as is buffered so a big value isn't re-decoded once per chunk
+				if not self.fill(len(self.buf)-self.pos): raise
+				continue
+			# a value is always followed by , : ] or }.  anything else (or nothing yet)
+			# means a number was cut off by the chunk boundary, e.g. -0. or 12
+			i = end
+			while i < len(self.buf) and self.buf[i] in _whitespace: i += 1
+			if (i == len(self.buf) or self.buf[i] not in ',:]}') and self.fill(): continue
+			self.pos = end
+			return obj
+
+def iter_json_object(stream, chunk_size=65536):
+	"""
+	yield the (key, value) pairs of a top-level JSON object one at a time,
+	reading the stream as it goes.  only the pair being decoded is held in
+	memory, not the whole document, so a multi-hundred-MB upload costs
+	about as much as its biggest top-level entry:
+
+	for name,transient in iter_json_object(request):
+		...
+	"""
+	reader = _Reader(stream, chunk_size)
+	reader.expect('{')
+	if reader.peek() == '}':
+		reader.pos += 1
+		return
+	while True:
+		key = reader.value()
+		if not isinstance(key,str):
+			raise json.JSONDecodeError('Expecting property name',reader.buf,reader.pos)
+		reader.expect(':')
+		yield key,reader.value()
+		if reader.expect(',}') == '}': return
@@ -0,0 +1,213 @@
+import threading
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from YSE_App.models import Transient, TransientPhotometry, TransientPhotData, TransientLightCurveSummary
+from YSE_App.common.bulk_update import bulk_update
+from YSE_App.common.dashboard_cache import forget_transients
+from YSE_App.common.detail_cache import forget_transient_details
+
+# TransientLightCurveSummary columns written on every update
+summary_fields = ('recent_mag','recent_mag_band','recent_magdate','disc_mag','disc_magdate',
+				  'peak_mag','peak_magdate','n_detections','modified_by','modified_date')
+
+_local = threading.local()
+
+def as_datetime(obs_date):
+	# ingestion hands over obs_date as the uploaded string, the database gives back datetimes
+	if isinstance(obs_date,str): obs_date = parse_datetime(obs_date.replace(' ','T'))
+	if timezone.is_naive(obs_date): obs_date = timezone.make_aware(obs_date,timezone.utc)
+	return obs_date
+
+def detections(points):
+	"""(obs_date, mag, band_id, discovery_point) for the points that count towards a summary"""
+	return [(as_datetime(p.obs_date),float(p.mag),p.band_id,p.discovery_point) for p in points
+			if p.mag is not None and p.data_quality_id is None]
+
+def detection_rows(transient_ids):
+	# the same, straight from the database, oldest first
+	return TransientPhotData.objects.filter(
+		photometry__transient_id__in=transient_ids,mag__isnull=False,data_quality__isnull=True).\
+		order_by('obs_date','id').values_list('photometry__transient_id','obs_date','mag','band_id','discovery_point')
+
+def photometry_transient_id(photometry_id):
+	return TransientPhotometry.objects.filter(id=photometry_id).values_list('transient_id',flat=True).first()
+
+def clear_summary(summary):
+	summary.recent_mag = summary.recent_mag_band_id = summary.recent_magdate = None
+	summary.disc_mag = summary.disc_magdate = None
+	summary.peak_mag = summary.peak_magdate = None
+	summary.n_detections = 0
+
+def fold_points(summary, points):
+	"""add detections to a summary; a later point (or a later id on the same date) is the recent one"""
+	for obs_date,mag,band_id,discovery_point in points:
+		summary.n_detections += 1
+		if summary.recent_magdate is None or obs_date >= summary.recent_magdate:
+			summary.recent_mag,summary.recent_mag_band_id,summary.recent_magdate = mag,band_id,obs_date
+		if summary.peak_mag is None or mag < summary.peak_mag:
+			summary.peak_mag,summary.peak_magdate = mag,obs_date
+		if discovery_point and (summary.disc_magdate is None or obs_date < summary.disc_magdate):
+			summary.disc_mag,summary.disc_magdate = mag,obs_date
+
+def update_summaries(added=None, changed=(), create=True):
+	"""
+	bring the summaries of some transients up to date.  added maps transient id
+	to the TransientPhotData just inserted for it, which are folded into the
+	summary as it stands; changed transients (a point edited or removed) and
+	any without a summary yet are recomputed from all their points.  create=False
+	only touches summaries that already exist, for use while deleting
+	"""
+	added = added or {}
+	transient_ids = set(changed) | set(added.keys())
+	transient_ids.discard(None)
+	if not len(transient_ids): return 0
+
+	summaries = {s.transient_id:s for s in
+				 TransientLightCurveSummary.objects.filter(transient_id__in=transient_ids)}
+	rebuild = (set(changed) | (set(added.keys()) - set(summaries.keys()))) & transient_ids
+	if create and len(rebuild - set(summaries.keys())):
+		for id,created_by_id,modified_by_id in Transient.objects.filter(
+				id__in=rebuild - set(summaries.keys())).values_list('id','created_by_id','modified_by_id'):
+			summaries[id] = TransientLightCurveSummary(transient_id=id,created_by_id=created_by_id,
+													   modified_by_id=modified_by_id)
+
+	for transient_id,points in added.items():
+		if transient_id in summaries and transient_id not in rebuild:
+			fold_points(summaries[transient_id],detections(points))
+	rebuild &= set(summaries.keys())
+	if len(rebuild):
+		for transient_id in rebuild: clear_summary(summaries[transient_id])
+		for transient_id,obs_date,mag,band_id,discovery_point in detection_rows(rebuild):
+			fold_points(summaries[transient_id],[(obs_date,mag,band_id,discovery_point)])
+
+	return save_summaries(summaries.values())
+
+def save_summaries(summaries):
+	now = timezone.now()
+	new,existing = [],[]
+	for s in summaries:
+		s.modified_date = now
+		if s.pk is None: new += [s]
+		else: existing += [s]
+	TransientLightCurveSummary.objects.bulk_create(new, batch_size=500)
+	bulk_update(TransientLightCurveSummary, existing, summary_fields)
+	# the dashboard shows the latest magnitudes
+	forget_transients([s.transient_id for s in new+existing])
+	return len(new)+len(existing)
+
+def rebuild_summaries(transient_ids):
+	"""recompute the summaries of transient_ids from scratch, creating any that are missing"""
+	return update_summaries(changed=transient_ids)
+
+def deleted_point_matters(summary, points):
+	"""whether any of the deleted detections was the summary's recent, peak or discovery point"""
+	if summary.recent_magdate is None or summary.peak_mag is None: return True
+	for point in points:
+		obs_date = as_datetime(point.obs_date)
+		if obs_date >= summary.recent_magdate or point.mag <= summary.peak_mag or \
+		   (point.discovery_point and obs_date == summary.disc_magdate):
+			return True
+	return False
+
+def points_deleted(points, photometry_transient=None):
+	"""
+	TransientPhotData rows went away.  their photometry has to be merged again
+	on the next upload and their transients' detail pages are stale.  a
+	summary only needs recomputing if it lost its recent, peak or discovery
+	point; otherwise it's some detections fewer.  photometry_transient maps
+	the ids of photometry sets deleted along with the points to their
+	transients.  the number of queries doesn't depend on the number of points
+	"""
+	photometry_ids = set(p.photometry_id for p in points)
+	photometry_transient = dict(photometry_transient or {})
+	photometry_transient.update(TransientPhotometry.objects.filter(
+		id__in=photometry_ids - set(photometry_transient.keys())).values_list('id','transient_id'))
+	TransientPhotometry.objects.filter(id__in=photometry_ids).exclude(content_hash=None).update(content_hash=None)
+	forget_transient_details(set(photometry_transient.values()))
+
+	removed = {}
+	for point in points:
+		if point.mag is None or point.data_quality_id is not None: continue
+		# a transient deleted along with its points takes its summary with it
+		if point.photometry_id not in photometry_transient: continue
+		removed.setdefault(photometry_transient[point.photometry_id],[]).append(point)
+	if not len(removed): return
+
+	rebuild,fewer = [],{}
+	for summary in TransientLightCurveSummary.objects.filter(transient_id__in=removed.keys()):
+		if deleted_point_matters(summary,removed[summary.transient_id]): rebuild += [summary.transient_id]
+		else: fewer.setdefault(len(removed[summary.transient_id]),[]).append(summary.id)
+	if len(rebuild): update_summaries(changed=rebuild, create=False)
+	for n,summary_ids in fewer.items():
+		TransientLightCurveSummary.objects.filter(id__in=summary_ids).\
+			update(n_detections=F('n_detections')-n,modified_date=timezone.now())
+
+class PointDeletions(object):
+	"""
+	collects the TransientPhotData deleted while it's active and hands them to
+	points_deleted together on exit, rather than one point at a time as the
+	post_delete signal sends them
+
+	with PointDeletions():
+		TransientPhotData.objects.filter(photometry=photometry).delete()
+	"""
+	def __init__(self):
+		self.points = []
+		self.photometry_transient = {}
+
+	def add(self, point):
+		self.points += [point]
+
+	def add_photometry(self, photometry):
+		# gone by the time the points are dealt with, so remember its transient now
+		self.photometry_transient[photometry.id] = photometry.transient_id
+
+	def __enter__(self):
+		if not hasattr(_local,'deletions'): _local.deletions = []
+		_local.deletions += [self]
+		return self
+
+	def __exit__(self, exc_type, exc_value, tb):
+		_local.deletions.pop()
+		# a delete that failed was rolled back, so nothing changed
+		if exc_type is None and len(self.points): points_deleted(self.points,self.photometry_transient)
+		self.points,self.photometry_transient = [],{}
+		return False
+
+def point_deleted(point):
+	"""a TransientPhotData row went away: record it with the innermost PointDeletions, or deal with it now"""
+	deletions = getattr(_local,'deletions',[])
+	if len(deletions): deletions[-1].add(point)
+	else: points_deleted([point])
+
+def photometry_deleted(photometry):
+	"""a TransientPhotometry row went away; its points were deleted just before it"""
+	deletions = getattr(_local,'deletions',[])
+	if len(deletions): deletions[-1].add_photometry(photometry)
+
+class SummaryUpdates(object):
+	"""
+	the photometry changes of one or more transients, collected while they're
+	written and applied to the summaries together by apply()
+	"""
+	def __init__(self):
+		self.added = {}
+		self.changed = set()
+
+	def add(self, transient_id, points):
+		self.added.setdefault(transient_id,[]).extend(points)
+
+	def change(self, transient_id):
+		self.changed.add(transient_id)
+
+	def extend(self, other):
+		for transient_id,points in other.added.items(): self.add(transient_id,points)
+		self.changed |= other.changed
+
+	def apply(self):
+		# every change shows on the detail page, whether or not the summary moves
+		forget_transient_details(set(self.added.keys()) | self.changed)
+		n = update_summaries(self.added,self.changed)
+		self.added,self.changed = {},set()
+		return n
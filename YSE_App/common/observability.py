@@ -0,0 +1,271 @@
+import functools
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, FK5, GCRS, AltAz, EarthLocation, get_moon, get_sun
+from astropy.utils.iers import IERSRangeError
+
+# when, how high and how far from the moon targets are at one site around one
+# time, for all targets at once.  this is what the observing-night tables,
+# the rise/set/moon endpoints and the template filters ask, and what
+# astroplan's Observer answered one target and one ephemeris at a time.
+#
+# as those callers did, rise and set are the last crossings of the horizon
+# (18 deg by default) in the 24 hours before the time given.  they come from
+# the hour angle at which each target crosses the horizon, which for targets
+# fixed on the sky is exact, so only the sun, the moon and the local sidereal
+# time are evaluated, once for the site and night.  altitudes are geometric
+# (no refraction, as astroplan without a pressure) and agree with astroplan
+# to within seconds
+sidereal_rate = 360.98564736629 # degrees of sidereal time per day
+night_grid_minutes = 10
+night_sun_altitude = -18
+
+def of_date(ra, dec, time):
+	# precessed to the equinox of time, which is what sidereal time is measured from
+	sc = SkyCoord(ra,dec,unit=u.deg,frame='icrs').transform_to(FK5(equinox=time))
+	return sc.ra.deg,sc.dec.deg
+
+def local_sidereal_time(time, longitude):
+	"""mean local sidereal time in degrees at longitude (deg)"""
+	try:
+		return time.sidereal_time('mean',longitude=longitude*u.deg).deg
+	except IERSRangeError:
+		# past the end of the IERS tables; UT1 is within a second of UTC
+		time = time.copy()
+		time.delta_ut1_utc = 0.
+		return time.sidereal_time('mean',longitude=longitude*u.deg).deg
+
+def altitude(latitude, ra, dec, lst):
+	"""altitude in degrees of (ra, dec) of date at local sidereal time lst"""
+	lat,dec,ha = np.radians(latitude),np.radians(dec),np.radians(lst-ra)
+	return np.degrees(np.arcsin(np.sin(lat)*np.sin(dec) + np.cos(lat)*np.cos(dec)*np.cos(ha)))
+
+def crossing(t, alt, level, i):
+	# when alt crosses level between t[i] and t[i+1], by linear interpolation
+	return t[i] + (level-alt[i])/(alt[i+1]-alt[i])*(t[i+1]-t[i])
+
+def stretches_below(t, alt, level):
+	"""[(start, end)] of the stretches of t where alt is below level"""
+	below = alt < level
+	edges = list(np.nonzero(below[:-1] != below[1:])[0])
+	stretches,start = [],t[0] if below[0] else None
+	for i in edges:
+		if below[i+1]: start = crossing(t,alt,level,i)
+		else: stretches += [(start,crossing(t,alt,level,i))]
+	if below[-1]: stretches += [(start,t[-1])]
+	return stretches
+
+def moon_separation(moon, ra, dec):
+	"""degrees between the moon, from get_moon, and targets at ra and dec"""
+	# both as seen from the earth's centre
+	sc = SkyCoord(ra,dec,unit=u.deg,frame=moon.frame)
+	return sc.separation(SkyCoord(moon.ra,moon.dec,frame=moon.frame)).deg
+
+# where the sun and moon are doesn't depend on the site, so sites asking
+# about the same time share them
+@functools.lru_cache(maxsize=64)
+def sun_grid(jd):
+	"""(jd, ra, dec of date) of the sun on a grid from a day before jd to half a day after"""
+	n_grid = int(36*60/night_grid_minutes)+1
+	grid = jd + np.linspace(-1,0.5,n_grid)
+	sun = get_sun(Time(grid,format='jd'))
+	ra,dec = of_date(sun.ra.deg,sun.dec.deg,Time(jd,format='jd'))
+	return grid,ra,dec
+
+@functools.lru_cache(maxsize=64)
+def moon_at(jd):
+	return get_moon(Time(jd,format='jd'))
+
+def time_string(time):
+	"""HH:MM:SS.sss (UT) of an astropy Time, None for no time at all"""
+	if time is None: return None
+	return time.isot.split('T')[-1]
+
+class SiteNight(object):
+	"""
+	the sky at one site over the 24 hours up to time.  evaluating targets
+	against it costs a few array operations however many there are
+	"""
+	def __init__(self, latitude, longitude, elevation, time, horizon=18):
+		self.latitude,self.longitude,self.elevation = latitude,longitude,elevation
+		self.time = time if isinstance(time,Time) else Time(time)
+		self.horizon = horizon
+		self.lst = local_sidereal_time(self.time,longitude)
+		self._moon,self._night,self._sun = None,None,None
+
+	@classmethod
+	def for_telescope(cls, telescope, time, **kwargs):
+		return cls(telescope.latitude,telescope.longitude,telescope.elevation,time,**kwargs)
+
+	@classmethod
+	def from_ephemeris(cls, latitude, longitude, elevation, time, night, moon_ra, moon_dec, **kwargs):
+		"""a SiteNight that takes the night and the moon from a stored ephemeris instead of working them out"""
+		site_night = cls(latitude,longitude,elevation,time,**kwargs)
+		site_night._night = night
+		site_night._moon = SkyCoord(moon_ra,moon_dec,unit=u.deg,frame=GCRS(obstime=site_night.time))
+		return site_night
+
+	def moon(self):
+		if self._moon is None: self._moon = moon_at(self.time.jd)
+		return self._moon
+
+	def night(self):
+		"""
+		(start, end) of the astronomically dark night going on at time, or else
+		of the last one before it; (None, None) when there's been none
+		"""
+		if self._night is None: self._night = self._dark_stretch()
+		return self._night
+
+	def sun_altitudes(self):
+		"""(jd, sun altitude) on one grid, over the 24 hours and on to the end of a night that's going on"""
+		if self._sun is None:
+			jd,ra,dec = sun_grid(self.time.jd)
+			self._sun = jd,altitude(self.latitude,ra,dec,self.lst + (jd-self.time.jd)*sidereal_rate)
+		return self._sun
+
+	def _dark_stretch(self):
+		jd,alt = self.sun_altitudes()
+		nights = [n for n in stretches_below(jd,alt,night_sun_altitude) if n[0] <= self.time.jd]
+		if not nights: return None,None
+		return Time(nights[-1][0],format='jd'),Time(nights[-1][1],format='jd')
+
+	def sun_crossing(self, level, rising):
+		"""the last time before time that the sun rose (or set) through level degrees, None if it didn't"""
+		jd,alt = self.sun_altitudes()
+		before = jd <= self.time.jd + 1e-9
+		stretches = stretches_below(jd[before],alt[before],level)
+		if rising: times = [end for start,end in stretches if end < jd[before][-1]]
+		else: times = [start for start,end in stretches if start > jd[0]]
+		return Time(times[-1],format='jd') if times else None
+
+	def moon_crossing(self, level, rising):
+		"""the last time before time that the moon rose (or set) through level degrees, None if it didn't"""
+		n_grid = int(24*60/night_grid_minutes)+1
+		jd = self.time.jd + np.linspace(-1,0,n_grid)
+		times = Time(jd,format='jd')
+		location = EarthLocation.from_geodetic(self.longitude*u.deg,self.latitude*u.deg,self.elevation*u.m)
+		# topocentric, the moon's parallax is a degree
+		alt = get_moon(times,location=location).transform_to(AltAz(obstime=times,location=location)).alt.deg
+		stretches = stretches_below(jd,alt,level)
+		if rising: times = [end for start,end in stretches if end < jd[-1]]
+		else: times = [start for start,end in stretches if start > jd[0]]
+		return Time(times[-1],format='jd') if times else None
+
+	def moon_illumination(self):
+		"""fraction of the moon's disk that's lit at time"""
+		sun,moon = get_sun(self.time),self.moon()
+		elongation = sun.separation(moon)
+		phase_angle = np.arctan2(sun.distance*np.sin(elongation),moon.distance - sun.distance*np.cos(elongation))
+		return float((1 + np.cos(phase_angle))/2)
+
+	def ephemeris(self):
+		"""
+		{name: astropy Time or value} of the sun and moon events the observing
+		night pages show, all the last before time as for rise and set
+		"""
+		ephemeris = {}
+		for name,level in [('sun',0),('civil',-6),('nautical',-12),('astronomical',-18)]:
+			ephemeris['%s_evening'%name] = self.sun_crossing(level,False)
+			ephemeris['%s_morning'%name] = self.sun_crossing(level,True)
+		ephemeris['night_start'],ephemeris['night_end'] = self.night()
+		ephemeris['moonrise'] = self.moon_crossing(0,True)
+		ephemeris['moonset'] = self.moon_crossing(0,False)
+		ephemeris['moon_illumination'] = self.moon_illumination()
+		moon = self.moon()
+		ephemeris['moon_ra'],ephemeris['moon_dec'] = float(moon.ra.deg),float(moon.dec.deg)
+		return ephemeris
+
+	def _previous_lst_crossing(self, lst):
+		# days before time since the local sidereal time was last lst
+		return ((self.lst - lst) % 360)/sidereal_rate
+
+	def targets(self, ra, dec):
+		"""Targets for arrays of ra and dec in degrees (ICRS)"""
+		return Targets(self,ra,dec)
+
+class Targets(object):
+	"""
+	rise, set and transit times, best airmass during the night and moon
+	separation of arrays of targets as seen from a SiteNight
+	"""
+	def __init__(self, site_night, ra, dec):
+		self.site_night = site_night
+		self.ra,self.dec = np.atleast_1d(np.asarray(ra,dtype=float)),np.atleast_1d(np.asarray(dec,dtype=float))
+		self.ra_of_date,self.dec_of_date = of_date(self.ra,self.dec,site_night.time)
+
+		# hour angle at which each target crosses the horizon; nan when it never
+		# does, because it's always above or always below it
+		lat,dec,h = np.radians(site_night.latitude),np.radians(self.dec_of_date),np.radians(site_night.horizon)
+		with np.errstate(invalid='ignore',divide='ignore'):
+			cos_ha = (np.sin(h) - np.sin(lat)*np.sin(dec))/(np.cos(lat)*np.cos(dec))
+			self.horizon_ha = np.degrees(np.arccos(np.where(np.abs(cos_ha) <= 1,cos_ha,np.nan)))
+
+	def __len__(self):
+		return len(self.ra)
+
+	def _times(self, days_before):
+		times = self.site_night.time.jd - days_before
+		return [Time(t,format='jd') if np.isfinite(t) else None for t in times]
+
+	def rise_times(self):
+		return self._times(self.site_night._previous_lst_crossing(self.ra_of_date-self.horizon_ha))
+
+	def set_times(self):
+		return self._times(self.site_night._previous_lst_crossing(self.ra_of_date+self.horizon_ha))
+
+	def transit_times(self):
+		return self._times(self.site_night._previous_lst_crossing(self.ra_of_date))
+
+	def altitudes(self, time):
+		"""altitudes in degrees at an astropy Time"""
+		sn = self.site_night
+		return altitude(sn.latitude,self.ra_of_date,self.dec_of_date,sn.lst + (time.jd-sn.time.jd)*sidereal_rate)
+
+	def dark_altitudes(self):
+		"""the highest each target gets while it's dark, nan when there's no night"""
+		start,end = self.site_night.night()
+		if start is None: return np.full(len(self),np.nan)
+		# the highest a target gets is at one end of the night or at a transit
+		# during it, the last before time or the ones either side of that
+		alt = np.maximum(self.altitudes(start),self.altitudes(end))
+		last_transit = self.site_night.time.jd - self.site_night._previous_lst_crossing(self.ra_of_date)
+		transit_alt = 90 - np.abs(self.site_night.latitude - self.dec_of_date)
+		for transit in last_transit + np.array([-1,0,1])[:,None]*360/sidereal_rate:
+			dark = (transit >= start.jd) & (transit <= end.jd)
+			alt = np.where(dark,np.maximum(alt,transit_alt),alt)
+		return alt
+
+	def min_airmass(self):
+		"""the lowest airmass of each target while it's dark, None when it isn't up then"""
+		return [1/np.sin(np.radians(a)) if a > 0 else None for a in self.dark_altitudes()]
+
+	def observable(self):
+		"""is each target above the horizon at some point while it's dark"""
+		with np.errstate(invalid='ignore'):
+			return [bool(up) for up in self.dark_altitudes() > self.site_night.horizon]
+
+	def moon_angles(self):
+		"""separation from the moon at the site night's time, in degrees"""
+		return moon_separation(self.site_night.moon(),self.ra,self.dec)
+
+	def summary(self):
+		"""[{rise_time, set_time, transit_time, min_airmass, observable, moon_angle}], one per target"""
+		columns = zip(self.rise_times(),self.set_times(),self.transit_times(),self.min_airmass(),
+					  self.observable(),self.moon_angles())
+		return [{'rise_time':r,'set_time':s,'transit_time':t,'min_airmass':a,'observable':o,'moon_angle':m}
+				for r,s,t,a,o,m in columns]
+
+@functools.lru_cache(maxsize=256)
+def site_night(latitude, longitude, elevation, time_iso, horizon=18):
+	"""a SiteNight, reused for calls about the same telescope and time"""
+	return SiteNight(latitude,longitude,elevation,Time(time_iso),horizon=horizon)
+
+def telescope_night(telescope, time, horizon=18):
+	if not isinstance(time,Time): time = Time(time)
+	return site_night(telescope.latitude,telescope.longitude,telescope.elevation,time.isot,horizon)
+
+def night_of(obs_date):
+	"""the Time the observing night tables have always asked about: 0h UT on obs_date"""
+	return Time(str(obs_date).split()[0])
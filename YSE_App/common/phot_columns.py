@@ -0,0 +1,76 @@
+import io
+import json
+import datetime
+import numpy as np
+from django.utils import timezone
+from YSE_App.common.phot_merge import point_fields, UNIX_EPOCH, UNIX_EPOCH_MJD
+
+# columnar photometry uploads: an .npz with one array per column and the
+# JSON header (what add_transient_phot/add_transient_phot_batch take outside
+# the points) as a 0-d string array called "header".  obs_mjd and band are
+# required; NaN (or "" for data_quality) is null.  a batch upload adds a
+# transient column, and may add instrument and obs_group columns
+required_columns = ('obs_mjd','band')
+float_columns = ('flux','flux_err','flux_zero_point','mag','mag_err')
+flag_columns = ('forced','diffim','discovery_point')
+string_columns = ('band','data_quality','transient','instrument','obs_group')
+
+def is_columnar_upload(request):
+	"""is the body (or the "file" upload) an .npz rather than JSON"""
+	if 'file' in request.FILES:
+		return request.FILES['file'].name.lower().endswith('.npz')
+	content_type = request.content_type.lower()
+	return 'npz' in content_type or 'octet-stream' in content_type
+
+def columnar_upload_data(request):
+	if 'file' in request.FILES: return request.FILES['file'].read()
+	return request.body
+
+def mjd_to_datetimes(mjd):
+	"""MJD array -> aware UTC datetimes, without a Time object"""
+	us = np.round((np.asarray(mjd,dtype=float) - UNIX_EPOCH_MJD)*86400e6).astype('int64')
+	return np.array([d.replace(tzinfo=timezone.utc) for d in
+					 (np.datetime64(UNIX_EPOCH) + us.astype('timedelta64[us]')).astype(datetime.datetime)],
+					dtype=object)
+
+def nullable(values, null):
+	# object arrays hold plain python values, which every database driver takes
+	out = np.asarray(values).astype(object)
+	out[null] = None
+	return out
+
+def read_phot_npz(data):
+	"""
+	(header dict, {column: array}, mjd array) from the bytes of an .npz upload.
+	the columns are the point_fields of phot_merge, ready for merge_transient_phot,
+	plus any transient/instrument/obs_group columns
+	"""
+	npz = np.load(io.BytesIO(data),allow_pickle=False)
+	header = json.loads(str(npz['header'])) if 'header' in npz.files else {}
+	for c in required_columns:
+		if c not in npz.files: raise ValueError('column %s is required'%c)
+
+	mjd = np.asarray(npz['obs_mjd'],dtype=float)
+	npoints = len(mjd)
+	if not np.all(np.isfinite(mjd)): raise ValueError('obs_mjd has missing values')
+	columns = {'obs_date':mjd_to_datetimes(mjd)}
+	for c in npz.files:
+		if c in ('header','obs_mjd'): continue
+		if len(npz[c]) != npoints: raise ValueError('column %s has %i rows, obs_mjd has %i'%(c,len(npz[c]),npoints))
+	for c in string_columns:
+		if c in npz.files:
+			values = npz[c].astype(str)
+			columns[c] = nullable(values,values == '')
+	for c in float_columns:
+		values = np.asarray(npz[c],dtype=float) if c in npz.files else np.full(npoints,np.nan)
+		columns[c] = nullable(values,~np.isfinite(values))
+	for c in flag_columns:
+		if c in npz.files: columns[c] = np.asarray(npz[c],dtype=int).astype(bool).astype(object)
+		else: columns[c] = np.full(npoints,None,dtype=object)
+	if 'data_quality' not in columns: columns['data_quality'] = np.full(npoints,None,dtype=object)
+
+	return header,columns,mjd
+
+def take_rows(columns, rows):
+	"""the point_fields columns for a subset of rows"""
+	return {f:columns[f][rows] for f in point_fields}
@@ -0,0 +1,148 @@
+import datetime
+import numpy as np
+from astropy.time import Time
+from django.db import transaction
+from django.utils import timezone
+from YSE_App.models import TransientPhotometry, TransientPhotData, DataQuality
+from YSE_App.common.fk_resolver import get_pk, get_band_pk
+from YSE_App.common.fingerprint import fingerprint
+from YSE_App.common.bulk_update import bulk_update
+from YSE_App.common.lightcurve_summary import SummaryUpdates
+
+# fields overwritten on an existing point when the upload clobbers it
+clobber_fields = ('obs_date','flux','flux_err','flux_zero_point','mag','mag_err',
+				  'forced','diffim','data_quality','discovery_point',
+				  'modified_by','modified_date')
+point_fields = ('obs_date','band','flux','flux_err','flux_zero_point','mag','mag_err',
+				'forced','diffim','data_quality','discovery_point')
+
+UNIX_EPOCH = datetime.datetime(1970,1,1)
+UNIX_EPOCH_MJD = 40587.0
+
+def datetimes_to_mjd(dates):
+	# UTC datetimes -> MJD without building a Time object per row
+	mjd = np.empty(len(dates))
+	for i,d in enumerate(dates):
+		if timezone.is_aware(d): d = timezone.make_naive(d, timezone.utc)
+		mjd[i] = (d - UNIX_EPOCH).total_seconds()/86400. + UNIX_EPOCH_MJD
+	return mjd
+
+def points_to_columns(photdata):
+	"""turn a list of add_transient_phot point dicts into lists keyed by field"""
+	columns = {f:[] for f in point_fields}
+	for p in photdata:
+		for f in point_fields:
+			columns[f] += [p[f]]
+	return columns
+
+def canonical_points(columns):
+	"""
+	the points of columns as rows sorted by (obs_date, band, ...), so the same
+	points hash the same whatever order they were uploaded in
+	"""
+	return sorted(zip(*[columns[f] for f in point_fields]),key=lambda row: [str(v) for v in row])
+
+def resolve_band_ids(band_names, instrument_name):
+	return np.array([get_band_pk(b,instrument_name) for b in band_names],dtype=int)
+
+def resolve_dq_ids(dq_names):
+	return [get_pk(DataQuality,dq,'Bad') if dq else None for dq in dq_names]
+
+def match_existing(existing_band_ids, existing_mjd, band_ids, mjd, mjdmatchmin):
+	"""
+	match each new (band, mjd) against the existing (band, mjd) pairs,
+	|mjd - existing_mjd| < mjdmatchmin within the same band.  returns, for every
+	new point, the (possibly empty) array of indices into the existing arrays
+	"""
+	matches = [np.array([],dtype=int)]*len(mjd)
+	for b in np.unique(band_ids):
+		iexist = np.where(existing_band_ids == b)[0]
+		if not len(iexist): continue
+		order = iexist[np.argsort(existing_mjd[iexist])]
+		sorted_mjd = existing_mjd[order]
+
+		inew = np.where(band_ids == b)[0]
+		lo = np.searchsorted(sorted_mjd, mjd[inew]-mjdmatchmin, side='right')
+		hi = np.searchsorted(sorted_mjd, mjd[inew]+mjdmatchmin, side='left')
+		for i,l,h in zip(inew,lo,hi):
+			if h > l: matches[i] = order[l:h]
+	return matches
+
+def merge_transient_phot(transientphot, columns, instrument_name, user,
+						 mjdmatchmin=0.01, clobber=False, mjd=None, existing=None, summary_updates=None):
+	"""
+	merge new points into the TransientPhotData of a single TransientPhotometry.
+	a new point that lies within mjdmatchmin of an existing point in the same
+	band is a duplicate and, if clobber is set, overwrites every point it matches;
+	everything else is inserted.  returns (n_inserted, n_updated)
+
+	an upload identical to the last one merged into transientphot (same points,
+	instrument, mjdmatchmin and clobber) can't change anything and is skipped
+	without reading the existing points.  existing, the (id, band_id, obs_date)
+	of transientphot's points, saves the query when the caller has already read
+	them for many TransientPhotometry at once
+
+	the transient's TransientLightCurveSummary is brought up to date in the same
+	transaction, unless summary_updates, a SummaryUpdates, is given to collect
+	the change for the caller to apply along with others
+	"""
+	npoints = len(columns['obs_date'])
+	if not npoints: return 0,0
+
+	content_hash = fingerprint(canonical_points(columns),instrument_name,mjdmatchmin,clobber)
+	if transientphot.content_hash == content_hash: return 0,0
+
+	if mjd is None:
+		mjd = Time(list(columns['obs_date']),format='isot').mjd
+	mjd = np.atleast_1d(np.asarray(mjd,dtype=float))
+	band_ids = resolve_band_ids(columns['band'], instrument_name)
+	dq_ids = resolve_dq_ids(columns['data_quality'])
+
+	if existing is None:
+		existing = list(TransientPhotData.objects.filter(photometry=transientphot).\
+						values_list('id','band_id','obs_date'))
+	if len(existing):
+		existing_ids = np.array([e[0] for e in existing])
+		existing_band_ids = np.array([e[1] for e in existing])
+		existing_mjd = datetimes_to_mjd([e[2] for e in existing])
+		matches = match_existing(existing_band_ids, existing_mjd, band_ids, mjd, mjdmatchmin)
+	else:
+		matches = [()]*npoints
+
+	now = timezone.now()
+	inserts,updates = [],{}
+	for i in range(npoints):
+		pointdict = {'obs_date':columns['obs_date'][i],
+					 'flux':columns['flux'][i],
+					 'flux_err':columns['flux_err'][i],
+					 'flux_zero_point':columns['flux_zero_point'][i],
+					 'mag':columns['mag'][i],
+					 'mag_err':columns['mag_err'][i],
+					 'forced':columns['forced'][i],
+					 'diffim':columns['diffim'][i],
+					 'data_quality_id':dq_ids[i],
+					 'discovery_point':columns['discovery_point'][i],
+					 'modified_by_id':user.id}
+		if len(matches[i]):
+			if clobber:
+				# later points win, as they did when each match was saved in turn
+				for idx in matches[i]:
+					updates[int(existing_ids[idx])] = pointdict
+		else:
+			inserts += [TransientPhotData(photometry=transientphot,band_id=int(band_ids[i]),
+										  created_by_id=user.id,**pointdict)]
+
+	update_objs = [TransientPhotData(id=pk,modified_date=now,**pointdict)
+				   for pk,pointdict in updates.items()]
+	updates = SummaryUpdates() if summary_updates is None else summary_updates
+	# new points can be added to the summary, changed ones mean recomputing it
+	if len(update_objs): updates.change(transientphot.transient_id)
+	else: updates.add(transientphot.transient_id, inserts)
+	with transaction.atomic():
+		TransientPhotData.objects.bulk_create(inserts, batch_size=500)
+		bulk_update(TransientPhotData, update_objs, clobber_fields)
+		TransientPhotometry.objects.filter(id=transientphot.id).update(content_hash=content_hash)
+		if summary_updates is None: updates.apply()
+	transientphot.content_hash = content_hash
+
+	return len(inserts),len(update_objs)
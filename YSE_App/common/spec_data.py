@@ -0,0 +1,91 @@
+import numpy as np
+from django.db.models.functions import Length
+
+# a spectrum is stored as one packed little-endian record array in
+# Spectrum.spec_data, sorted by wavelength, with NaN for missing errors
+spec_dtype = np.dtype([('wavelength','<f8'),('flux','<f8'),
+					   ('wavelength_err','<f8'),('flux_err','<f8')])
+
+def pack_spectrum(wavelength, flux, flux_err=None, wavelength_err=None):
+	wavelength = np.asarray(wavelength,dtype=float)
+	spec = np.empty(len(wavelength),dtype=spec_dtype)
+	spec['wavelength'] = wavelength
+	spec['flux'] = np.asarray(flux,dtype=float)
+	for key,col in (('flux_err',flux_err),('wavelength_err',wavelength_err)):
+		if col is None: spec[key] = np.nan
+		else: spec[key] = np.array([np.nan if c is None else c for c in col],dtype=float)
+
+	return spec[np.argsort(spec['wavelength'],kind='mergesort')].tobytes()
+
+def unpack_spectrum(blob):
+	"""read-only, zero-copy view of a packed spectrum (empty if there isn't one)"""
+	if not blob: return np.empty(0,dtype=spec_dtype)
+	return np.frombuffer(blob,dtype=spec_dtype)
+
+def spectrum_length(nbytes):
+	if not nbytes: return 0
+	return nbytes//spec_dtype.itemsize
+
+def _nan_to_none(x):
+	x = float(x)
+	if np.isnan(x): return None
+	return x
+
+class SpecDataPoint(object):
+	"""one wavelength bin of a packed spectrum, shaped like the old SpecData rows"""
+	def __init__(self, spectrum, index, row):
+		self.id = '%i-%i'%(spectrum.id,index)
+		self.spectrum = spectrum
+		self.wavelength = float(row['wavelength'])
+		self.flux = float(row['flux'])
+		self.wavelength_err = _nan_to_none(row['wavelength_err'])
+		self.flux_err = _nan_to_none(row['flux_err'])
+		self.created_by = spectrum.created_by
+		self.modified_by = spectrum.modified_by
+		self.created_date = spectrum.created_date
+		self.modified_date = spectrum.modified_date
+
+class SpecDataPoints(object):
+	"""
+	lazy sequence of SpecDataPoints over every spectrum in a queryset, so the
+	REST pagination can count and slice it without unpacking all the spectra
+	"""
+	def __init__(self, spectra):
+		self.spectra = spectra
+		rows = spectra.order_by('id').annotate(spec_data_length=Length('spec_data')).\
+			   values_list('id','spec_data_length')
+		self.ids = np.array([r[0] for r in rows],dtype=int)
+		self.offsets = np.concatenate([[0],np.cumsum([spectrum_length(r[1]) for r in rows])]).astype(int)
+
+	def __len__(self):
+		return int(self.offsets[-1])
+
+	def __iter__(self):
+		return iter(self[0:len(self)])
+
+	def __getitem__(self, key):
+		if not isinstance(key,slice):
+			points = self[key:key+1]
+			if not points: raise IndexError(key)
+			return points[0]
+
+		start,stop,_ = key.indices(len(self))
+		if stop <= start: return []
+		first = np.searchsorted(self.offsets,start,side='right')-1
+		last = np.searchsorted(self.offsets,stop,side='left')
+		spectra = self.spectra.model.objects.select_related('created_by','modified_by').\
+				  filter(id__in=self.ids[first:last])
+		points = []
+		for s in sorted(spectra,key=lambda s: s.id):
+			i = np.searchsorted(self.ids,s.id)
+			spec = unpack_spectrum(s.spec_data)
+			lo,hi = max(start-self.offsets[i],0),min(stop-self.offsets[i],len(spec))
+			points += [SpecDataPoint(s,j,spec[j]) for j in range(lo,hi)]
+		return points
+
+	def get(self, spectrum_id, index):
+		spectrum = self.spectra.filter(id=spectrum_id).first()
+		if spectrum is None: return None
+		spec = spectrum.get_spec_data()
+		if index >= len(spec): return None
+		return SpecDataPoint(spectrum,index,spec[index])
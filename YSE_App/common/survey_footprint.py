@@ -0,0 +1,59 @@
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from django.conf import settings as djangoSettings
+from YSE_App.common.cone_search import radec_to_vec, radius_to_chord
+
+class FieldCatalog(object):
+	"""
+	a survey's square fields, fov (deg) on a side, centred on the ra/dec columns
+	of a csv file.  the file is read, and a KD-tree of the field centres built,
+	the first time the catalog is queried in each process.  a point is in a
+	field if it is within fov/2 of the centre in dec and fov/2 on the sky in ra
+	"""
+	def __init__(self, file, fov, usecols=(1,2), delimiter=','):
+		self.file = file
+		self.fov = fov
+		self.usecols = usecols
+		self.delimiter = delimiter
+		self.lock = threading.Lock()
+		self.tree = None
+
+	def load(self):
+		with self.lock:
+			if self.tree is None:
+				self.ra,self.dec = np.loadtxt(self.file,unpack=True,usecols=self.usecols,
+											  delimiter=self.delimiter,ndmin=2)
+				self.tree = cKDTree(radec_to_vec(self.ra,self.dec))
+		return self.tree
+
+	def contains(self, ra, dec):
+		"""boolean array: is each of ra, dec (deg, scalars or arrays) in any field"""
+		tree = self.load()
+		ra,dec = np.atleast_1d(np.asarray(ra,dtype=float)),np.atleast_1d(np.asarray(dec,dtype=float))
+		# candidates within the half-diagonal of a field, with room to spare
+		candidates = tree.query_ball_point(radec_to_vec(ra,dec),radius_to_chord(0.75*self.fov))
+		point = np.repeat(np.arange(len(ra)),[len(c) for c in candidates])
+		field = np.array([f for c in candidates for f in c],dtype=int)
+
+		dra = (ra[point] - self.ra[field] + 180.) % 360. - 180.
+		inside = (np.abs(dra*np.cos(np.radians(self.dec[field]))) < self.fov/2.) & \
+				 (np.abs(dec[point] - self.dec[field]) < self.fov/2.)
+		result = np.zeros(len(ra),dtype=bool)
+		result[point[inside]] = True
+		return result
+
+# tag name -> the fields it marks.  other surveys (K2 campaigns, our own
+# fields) go in here the same way, see register_footprint
+footprints = {
+	# format=NAME,RA,DEC,DIST,BMAG,JMAG,KMAG,TYPE,EXTINCTION(A_V), 21 arcmin fields
+	'Thacher':FieldCatalog('%sYSE_App/tags/thacher.csv'%djangoSettings.STATIC_ROOT,fov=21/60.),
+}
+
+def register_footprint(tag_name, catalog):
+	footprints[tag_name] = catalog
+
+def footprint_tags(ra, dec, names=None):
+	"""{tag name: boolean array} for each footprint (or just names) over ra, dec"""
+	if names is None: names = footprints.keys()
+	return {name:footprints[name].contains(ra,dec) for name in names}
@@ -1,45 +1,79 @@
-import requests,re
+import numpy as np
+from django.conf import settings as djangoSettings
 
-def tess_obs(ra, dec, discovery_jd):
+# TESS looks at one 24x96 deg strip per ~27 day sector: four 24x24 deg cameras
+# stacked along the ecliptic meridian of the boresight, camera 1 nearest the
+# ecliptic.  tess_sectors.csv has the dates of each sector and the ecliptic
+# lon/lat of its boresight; the longitudes are the nominal anti-solar pointing at
+# mid-sector, good to about a degree, which only matters right at a camera edge.
+# the footprint ignores the gaps between CCDs
+# format=SECTOR,STARTJD,ENDJD,ECLLON,ECLLAT
+sector_file = '%sYSE_App/tags/tess_sectors.csv'%djangoSettings.STATIC_ROOT
+
+camera_offsets = np.array([-36.,-12.,12.,36.])
+camera_half_width = 12.
+# J2000 obliquity of the ecliptic
+obliquity = np.radians(23.4392911)
+
+before_leeway = 20	 # Days of leeway before date
+after_leeway = 100	 # Days of leeway after date
+
+_sectors = None
+def sector_table():
+	"""sector, start_jd, end_jd, boresight ecliptic lon and lat (deg) arrays, read on first use"""
+	global _sectors
+	if _sectors is None:
+		sector,start,end,lon,lat = np.loadtxt(sector_file,unpack=True,delimiter=',',ndmin=2)
+		_sectors = (sector.astype(int),start,end,lon,lat)
+	return _sectors
+
+def radec_to_ecliptic_vec(ra, dec):
+	ra,dec = np.radians(np.atleast_1d(np.asarray(ra,dtype=float))),np.radians(np.atleast_1d(np.asarray(dec,dtype=float)))
+	x,y,z = np.cos(dec)*np.cos(ra),np.cos(dec)*np.sin(ra),np.sin(dec)
+	return np.array([x,
+					 np.cos(obliquity)*y + np.sin(obliquity)*z,
+					 -np.sin(obliquity)*y + np.cos(obliquity)*z])
 
-	before_leeway = 20	 # Days of leeway before date
-	after_leeway = 100	 # Days of leeway after date
-	tess_date = [2458324.5,2458352.5,2458381.5,2458409.5,2458437.5,2458463.5,
-		     2458490.5,2458516.5,2458542.5,2458568.5,2458595.5,2458624.5,
-		     2458653.5,2458682.5,2458710.5,2458737.5,2458763.5,2458789.5,
-		     2458814.5,2458841.5,2458869.5,2458897.5,2458926.5,2458955.5,
-		     2458982.5,2459008.5,2459034.5]
-
-	url = 'https://heasarc.gsfc.nasa.gov/cgi-bin/tess/webtess/'
-	url += 'wtv.py?Entry={ra}%2C{dec}'
-	r = requests.get(url.format(ra=str(ra), dec=str(dec)))
-	if r.status_code!=200:
-		print('status message:',r.text)
-		error = 'ERROR: could not get {url}, status code {code}'
-		raise RuntimeError(error.format(url=url, code=r.status_code))
-		return(None)
-
-	reg = r"observed in camera \w+.\nSector \w+"
-	info = re.findall(reg, r.content.decode())
-	sectors=[]
-	for k in info:
-	    sectors.append(int(re.split(r'\s', k)[5])-1)
-
-	if len(sectors)>0:
-		for sector in sectors:
-			if (discovery_jd > tess_date[int(sector)-1]-before_leeway and
-				discovery_jd < tess_date[int(sector)]+after_leeway):
-				return(True)
-	return(False)
-
-# These should be false
-#print("Should be false:")
-#print tess_obs(94.1105250, -21.3756833, 2458481.52282)
-#print tess_obs(202.884383, -12.4804833, 2458526.52282)
-#print tess_obs(308.684333, +60.1933063, 2458526.52282)
-
-# These should be true
-#print "Should be true:"
-#print tess_obs(64.46742, -63.67525, 2458345.52282) # 2018fhw
-#print tess_obs(65.13394, -38.96065, 2458440.52282) # 2018ioa
-#print tess_obs(98.38955, -61.00797, 2458509.52282) # 2019aeg
+def tess_cameras(ra, dec):
+	"""
+	for N positions (deg), an (N, n_sectors) array of the camera (1-4) that saw
+	each one in each sector of sector_table(), 0 where none did
+	"""
+	sector,start,end,lon,lat = sector_table()
+	x,y,z = radec_to_ecliptic_vec(ra, dec)
+	cameras = np.zeros((len(x),len(sector)),dtype=int)
+	tan_half_width = np.tan(np.radians(camera_half_width))
+
+	for i in range(len(sector)):
+		# rotate the boresight meridian to lon=0
+		l = np.radians(lon[i])
+		xs,ys = x*np.cos(l) + y*np.sin(l),-x*np.sin(l) + y*np.cos(l)
+		# cameras run from the ecliptic towards the pole
+		for camera,offset in enumerate(camera_offsets*np.sign(lat[i]),1):
+			# rotate the camera centre (which may be past the pole) to lon=lat=0
+			b = np.radians(lat[i] + offset)
+			xc,zc = xs*np.cos(b) + z*np.sin(b),-xs*np.sin(b) + z*np.cos(b)
+			# gnomonic projection onto the camera
+			with np.errstate(divide='ignore',invalid='ignore'):
+				on_camera = (xc > 0) & (np.abs(ys) < tan_half_width*xc) & (np.abs(zc) < tan_half_width*xc)
+			cameras[on_camera & (cameras[:,i] == 0),i] = camera
+	return cameras
+
+def tess_obs_batch(ra, dec, discovery_jd, before_leeway=before_leeway, after_leeway=after_leeway):
+	"""
+	boolean array: was each position on a TESS camera during a sector running
+	from before_leeway days before to after_leeway days after its discovery_jd
+	"""
+	sector,start,end,lon,lat = sector_table()
+	jd = np.atleast_1d(np.asarray(discovery_jd,dtype=float))
+	in_window = (jd[:,None] > start[None,:]-before_leeway) & (jd[:,None] < end[None,:]+after_leeway)
+	return np.any((tess_cameras(ra, dec) > 0) & in_window,axis=1)
+
+def tess_sectors_observed(ra, dec):
+	"""[(sector, camera), ...] for one position"""
+	sector = sector_table()[0]
+	cameras = tess_cameras(ra, dec)[0]
+	return [(int(s),int(c)) for s,c in zip(sector,cameras) if c]
+
+def tess_obs(ra, dec, discovery_jd):
+	return bool(tess_obs_batch(ra, dec, discovery_jd)[0])
@@ -0,0 +1,182 @@
+import re
+import datetime
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from YSE_App.models import Transient, AlternateTransientNames, TransientSearchDocument, TransientSearchTerm
+
+# the search box.  every transient has a TransientSearchDocument listing the
+# terms it can be found by and TransientSearchTerm indexes them, so a query
+# costs one indexed prefix lookup per word however many fields there are.
+#
+#   2019abc Following        every word must prefix-match a term of some field
+#   status:Following host:NGC   ...or of the field named
+#   z>0.05 mag<19.5 date>=2019-10-01   comparisons on the transient itself
+
+# aliases accepted before a ":" -> the field of TransientSearchTerm
+term_fields = {'name':'name','alt':'name','status':'status','group':'group','obs_group':'group',
+			   'class':'class','type':'class','host':'host','tag':'tag','tags':'tag',
+			   'z':'z','redshift':'z','ra':'ra','dec':'dec','date':'date','disc_date':'date'}
+
+# fields that take <, <=, >, >=, relative to the transient
+compare_fields = {'z':'redshift','redshift':'redshift','ra':'ra','dec':'dec',
+				  'ebv':'mw_ebv','mw_ebv':'mw_ebv','ps':'point_source_probability',
+				  'mag':'lightcurve_summary__recent_mag','disc_mag':'lightcurve_summary__disc_mag',
+				  'peak_mag':'lightcurve_summary__peak_mag','ndet':'lightcurve_summary__n_detections',
+				  'date':'disc_date','disc_date':'disc_date','lastobs':'lightcurve_summary__recent_magdate'}
+date_fields = ('disc_date','lightcurve_summary__recent_magdate')
+compare_ops = {'>':'gt','>=':'gte','<':'lt','<=':'lte'}
+word_re = re.compile(r'^([a-z_]+)(>=|<=|>|<|:|=)(.+)$')
+term_length = TransientSearchTerm._meta.get_field('term').max_length
+
+def tokenize(text):
+	return [t for t in re.split(r'[\s,;/()]+', text.lower()) if t]
+
+def name_terms(name):
+	terms = tokenize(name)
+	# AT2019abc/SN 2019abc/2019abc are all found by 2019abc, and by abc
+	m = re.match(r'^(?:sn|at)?\s*(\d{4})([a-z]+)$', name.lower())
+	if m: terms += [m.group(1)+m.group(2), m.group(2)]
+	return terms
+
+def format_z(z):
+	return ('%.4f'%z).rstrip('0')
+
+def document_terms(transient, alt_names=(), tags=()):
+	"""the sorted (field, term) pairs of one transient, from a row of document_rows"""
+	(id,name,status,group,spec_class,photo_class,tns_class,host_name,
+	 redshift,host_redshift,ra,dec,disc_date) = transient
+	terms = [('name',t) for n in [name]+list(alt_names) if n for t in name_terms(n)]
+	terms += [('status',t) for t in tokenize(status or '')]
+	terms += [('group',t) for t in tokenize(group or '')]
+	terms += [('class',t) for c in (spec_class,photo_class,tns_class) if c for t in tokenize(c)]
+	terms += [('host',t) for t in tokenize(host_name or '')]
+	terms += [('tag',t) for tag in tags for t in tokenize(tag)]
+	z = redshift if redshift is not None else host_redshift
+	if z is not None: terms += [('z',format_z(z))]
+	terms += [('ra','%.5f'%ra),('dec','%.5f'%dec)]
+	if disc_date: terms += [('date',disc_date.strftime('%Y-%m-%d'))]
+	return sorted(set((f,t[:term_length]) for f,t in terms))
+
+def document_rows(transient_ids):
+	"""{transient id: ((field, term) list, created_by_id)} for transient_ids, three queries for the lot"""
+	alt_names,tags = {},{}
+	for transient_id,name in AlternateTransientNames.objects.filter(
+			transient_id__in=transient_ids).values_list('transient_id','name'):
+		alt_names.setdefault(transient_id,[]).append(name)
+	for transient_id,name in Transient.tags.through.objects.filter(
+			transient_id__in=transient_ids).values_list('transient_id','transienttag__name'):
+		tags.setdefault(transient_id,[]).append(name)
+
+	rows = Transient.objects.filter(id__in=transient_ids).values_list(
+		'id','name','status__name','obs_group__name','best_spec_class__name','photo_class__name',
+		'TNS_spec_class','host__name','redshift','host__redshift','ra','dec','disc_date','created_by_id')
+	return {row[0]:(document_terms(row[:-1],alt_names.get(row[0],[]),tags.get(row[0],[])),row[-1])
+			for row in rows}
+
+def index_transients(transient_ids):
+	"""
+	bring the search documents of transient_ids up to date.  only the
+	documents whose terms changed have their index rows rewritten; returns
+	how many that was
+	"""
+	transient_ids = set(transient_ids)
+	if not len(transient_ids): return 0
+	rows = document_rows(transient_ids)
+	documents = {d.transient_id:d for d in TransientSearchDocument.objects.filter(transient_id__in=transient_ids)}
+
+	changed,new_documents = {},[]
+	for transient_id,(terms,created_by_id) in rows.items():
+		text = '\n'.join('%s:%s'%ft for ft in terms)
+		document = documents.get(transient_id)
+		if document is not None and document.text == text: continue
+		changed[transient_id] = terms
+		if document is None:
+			# the index of a transient belongs to whoever made the transient
+			new_documents += [TransientSearchDocument(transient_id=transient_id,text=text,
+													  created_by_id=created_by_id,modified_by_id=created_by_id)]
+		else:
+			document.text = text
+			document.save(update_fields=['text','modified_date'])
+	if not len(changed): return 0
+
+	TransientSearchDocument.objects.bulk_create(new_documents, batch_size=500)
+	TransientSearchTerm.objects.filter(transient_id__in=changed.keys()).delete()
+	TransientSearchTerm.objects.bulk_create(
+		[TransientSearchTerm(transient_id=t,field=f,term=term) for t,terms in changed.items() for f,term in terms],
+		batch_size=1000)
+	return len(changed)
+
+def parse_date_value(value):
+	date = parse_date(value)
+	if date is None: raise ValueError('%s is not a YYYY-MM-DD date'%value)
+	return timezone.make_aware(datetime.datetime(date.year,date.month,date.day),timezone.utc)
+
+def parse_query(value, extra_terms=(), extra_compare=()):
+	"""[(field, op, value)] for the words of a query; field is None for a plain word"""
+	words = []
+	for word in value.split():
+		m = word_re.match(word.lower())
+		if m:
+			field,op,v = m.groups()
+			if op == '=': op = ':'
+			if op == ':' and field in extra_terms:
+				words += [(field,op,v)]
+				continue
+			if op == ':' and field in term_fields:
+				words += [(term_fields[field],op,v)]
+				continue
+			if op in compare_ops and (field in compare_fields or field in extra_compare):
+				words += [(field,op,v)]
+				continue
+		words += [(None,':',word.lower())]
+	return words
+
+def term_query(field, term, prefix=''):
+	terms = TransientSearchTerm.objects.filter(term__startswith=term[:term_length])
+	if field is not None: terms = terms.filter(field=field)
+	return Q(**{prefix+'id__in':terms.values('transient_id')})
+
+def compare_query(lookup, op, value, prefix=''):
+	if lookup == 'redshift':
+		# the transient's redshift, or its host's when it has none
+		value = float(value)
+		return Q(**{prefix+'redshift__'+compare_ops[op]:value}) | \
+			Q(**{prefix+'redshift__isnull':True,prefix+'host__redshift__'+compare_ops[op]:value})
+	value = parse_date_value(value) if lookup in date_fields else float(value)
+	return Q(**{prefix+lookup+'__'+compare_ops[op]:value})
+
+def search(qs, value, prefix='', text_lookups=(), extra_terms=None, extra_compare=None):
+	"""
+	filter qs by a search box query, one filter() per word.  prefix is the
+	path from qs's model to the Transient ('transient__' for followups).  a
+	plain word may also match the start of any of text_lookups; extra_terms
+	("field:") and extra_compare (dates, "field>") map more fields to lookups
+	on qs's own model.  a comparison that can't be read (z>abc) matches nothing
+	"""
+	extra_terms,extra_compare = extra_terms or {},extra_compare or {}
+	for field,op,v in parse_query(value,extra_terms,extra_compare):
+		try:
+			if field in extra_terms:
+				q = Q(**{extra_terms[field]+'__istartswith':v})
+			elif field in extra_compare:
+				q = Q(**{extra_compare[field]+'__'+compare_ops[op]:parse_date_value(v)})
+			elif field is None or op == ':':
+				q = term_query(field,v,prefix)
+				if field is None:
+					for lookup in text_lookups: q |= Q(**{lookup+'__istartswith':v})
+			else:
+				q = compare_query(compare_fields[field],op,v,prefix)
+		except ValueError:
+			return qs.none()
+		qs = qs.filter(q)
+	return qs
+
+def search_transients(qs, value):
+	return search(qs, value)
+
+def search_followups(qs, value):
+	# a followup is also found by its own status, and by its valid dates
+	return search(qs, value, prefix='transient__', text_lookups=('status__name',),
+				  extra_terms={'followup':'status__name'},
+				  extra_compare={'start':'valid_start','stop':'valid_stop'})
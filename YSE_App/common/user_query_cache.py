@@ -0,0 +1,166 @@
+import re
+import time
+import datetime
+import traceback
+from contextlib import contextmanager
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections, DatabaseError
+from django.db.models import Max, Count
+from django.utils import timezone
+from django_cron import CronJobBase, Schedule
+from YSE_App.models import Transient, UserQuery, UserQueryResult
+from YSE_App.common.fingerprint import fingerprint
+
+# the SQL Explorer queries people put on their personal dashboards are run
+# here, in the background, and the transients they return are stored in
+# UserQueryResult.  a result is rerun when it's older than
+# USER_QUERY_RESULT_SECONDS or when the fingerprint of the tables it reads
+# changes, whichever is first; the dashboard shows what's stored meanwhile.
+# every run is cut off after USER_QUERY_TIME_LIMIT seconds
+user_query_result_seconds = getattr(settings,'USER_QUERY_RESULT_SECONDS',3600)
+user_query_time_limit = getattr(settings,'USER_QUERY_TIME_LIMIT',30)
+table_re = re.compile(r'\byse_app_\w+', re.I)
+
+class UserQueryTimeout(Exception):
+	pass
+
+def dashboard_query(sql):
+	"""can sql be shown as a table of transients on the personal dashboard"""
+	sql = sql.lower()
+	return sql.startswith('select') and 'yse_app_transient' in sql and 'name' in sql
+
+def query_models(sql):
+	"""the YSE_App models (M2M tables included) whose tables sql reads"""
+	tables = set(t.lower() for t in table_re.findall(sql))
+	return sorted([m for m in apps.get_app_config('YSE_App').get_models(include_auto_created=True)
+				   if m._meta.db_table.lower() in tables], key=lambda m: m._meta.db_table)
+
+def table_state(model):
+	# the latest modification and the row count, which catches deletions too.
+	# update()s that don't touch modified_date are only caught by the TTL
+	fields = [f.name for f in model._meta.get_fields()]
+	if 'modified_date' in fields:
+		state = model._base_manager.aggregate(latest=Max('modified_date'),rows=Count('pk'))
+		return [state['latest'],state['rows']]
+	return [None,model._base_manager.count()]
+
+def tables_fingerprint(sql, states=None):
+	"""fingerprint of sql and of the tables it reads; states caches table_state across queries"""
+	states = {} if states is None else states
+	for model in query_models(sql):
+		if model not in states: states[model] = table_state(model)
+	return fingerprint(sql,[(m._meta.db_table,states[m]) for m in query_models(sql)])
+
+@contextmanager
+def statement_time_limit(connection, seconds):
+	"""the database gives up on a statement running longer than seconds"""
+	if not seconds:
+		yield
+		return
+	connection.ensure_connection()
+	if connection.vendor == 'mysql':
+		# MySQL >= 5.7.8, read-only SELECTs only, which is all that's run here
+		with connection.cursor() as cursor: cursor.execute('SET SESSION MAX_EXECUTION_TIME=%i'%(seconds*1000))
+		try: yield
+		finally:
+			with connection.cursor() as cursor: cursor.execute('SET SESSION MAX_EXECUTION_TIME=0')
+	elif connection.vendor == 'postgresql':
+		with connection.cursor() as cursor: cursor.execute('SET statement_timeout = %i'%(seconds*1000))
+		try: yield
+		finally:
+			with connection.cursor() as cursor: cursor.execute('SET statement_timeout = 0')
+	elif connection.vendor == 'sqlite':
+		start = time.time()
+		connection.connection.set_progress_handler(lambda: time.time()-start > seconds, 10000)
+		try: yield
+		finally: connection.connection.set_progress_handler(None, 0)
+	else:
+		yield
+
+def run_user_query(sql, time_limit=None):
+	"""the names in the first column of sql's rows, from the explorer connection"""
+	connection = connections['explorer']
+	start = time.time()
+	try:
+		with statement_time_limit(connection,time_limit), connection.cursor() as cursor:
+			cursor.execute(sql.replace('%','%%'), ())
+			return set(row[0] for row in cursor)
+	except DatabaseError:
+		if time_limit and time.time()-start >= time_limit:
+			raise UserQueryTimeout('timed out after %s s'%time_limit)
+		raise
+
+def transient_ids(names):
+	ids,names = [],list(names)
+	for i in range(0,len(names),1000):
+		ids += list(Transient.objects.filter(name__in=names[i:i+1000]).values_list('id',flat=True))
+	return ids
+
+def refresh_result(result, fingerprint=None, time_limit=None):
+	"""run result's query now and store the transients it returns"""
+	time_limit = user_query_time_limit if time_limit is None else time_limit
+	start = timezone.now()
+	UserQueryResult.objects.filter(id=result.id).update(status='Running',started_date=start,modified_date=start)
+	# taken before the query runs, so anything changed meanwhile is picked up next time
+	fingerprint = fingerprint or tables_fingerprint(result.query.sql)
+	try:
+		names = run_user_query(result.query.sql, time_limit)
+	except Exception as e:
+		print('query %i failed: %s'%(result.query_id,traceback.format_exc()))
+		result.status,result.message = 'Failed',str(e)
+	else:
+		ids = transient_ids(names)
+		result.transients.set(ids)
+		result.status,result.message,result.n_rows = 'Done',None,len(ids)
+	now = timezone.now()
+	# a failed query isn't retried until its SQL or its tables change, or the TTL is up
+	result.fingerprint,result.started_date,result.refreshed_date = fingerprint,start,now
+	result.duration = (now-start).total_seconds()
+	result.save(update_fields=['status','message','n_rows','fingerprint','started_date',
+							   'refreshed_date','duration','modified_date'])
+	return result
+
+def get_result(user_query):
+	"""user_query's stored result; a new one, waiting for the refresh job, if it's never been run"""
+	try:
+		return user_query.query.dashboard_result
+	except ObjectDoesNotExist:
+		result,created = UserQueryResult.objects.get_or_create(
+			query=user_query.query,defaults={'created_by_id':user_query.user_id,'modified_by_id':user_query.user_id})
+		return result
+
+def is_refreshing(result):
+	"""will the refresh job replace what result shows"""
+	if result.status in ('Pending','Running') or result.refreshed_date is None: return True
+	return timezone.now()-result.refreshed_date > datetime.timedelta(seconds=user_query_result_seconds)
+
+def refresh_due_results(max_age=None, time_limit=None):
+	"""rerun every dashboard query that's pending, out of date or reads tables that changed"""
+	max_age = user_query_result_seconds if max_age is None else max_age
+	cutoff = timezone.now() - datetime.timedelta(seconds=max_age)
+	states,seen,n_refreshed = {},set(),0
+	for user_query in UserQuery.objects.filter(query__isnull=False).select_related('query').order_by('query_id'):
+		if not dashboard_query(user_query.query.sql): continue
+		# several people can have the same query on their dashboards
+		if user_query.query_id in seen: continue
+		seen.add(user_query.query_id)
+		result = get_result(user_query)
+
+		current = tables_fingerprint(result.query.sql,states)
+		if result.status == 'Pending' or result.fingerprint != current or \
+		   result.refreshed_date is None or result.refreshed_date < cutoff:
+			refresh_result(result,current,time_limit)
+			n_refreshed += 1
+	return n_refreshed
+
+class user_query_refresh_cron(CronJobBase):
+	RUN_EVERY_MINS = 5
+
+	schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+	code = 'YSE_App.common.user_query_cache.user_query_refresh_cron'
+
+	def do(self):
+		n_refreshed = refresh_due_results()
+		print('refreshed %i dashboard queries'%n_refreshed)
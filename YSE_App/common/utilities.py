@@ -2,6 +2,7 @@ from astropy.coordinates import SkyCoord
 from astropy.coordinates import EarthLocation
 import astropy.units as u
 import numpy as np
+import math
 from astroplan import Observer
 from astropy.time import Time
 import requests
@@ -16,10 +17,17 @@ def getSeparation(ra1_decimal,dec1_decimal,
 		c2 = SkyCoord(ra2_decimal,dec2_decimal,unit=(u.deg, u.deg))
 		return(c1.separation(c2).arcsec)
 		
+def _sexigesimal(value):
+	# what astropy's Angle.hms/.dms compute, without building a SkyCoord
+	# (the tables call this twice per row)
+	sign = math.copysign(1.0, value)
+	(df, d) = math.modf(abs(value))
+	(mf, m) = math.modf(df*60.)
+	return (math.floor(sign*d), sign*math.floor(m), sign*mf*60.)
+
 def GetSexigesimalString(ra_decimal, dec_decimal):
-	c = SkyCoord(ra_decimal,dec_decimal,unit=(u.deg, u.deg))
-	ra = c.ra.hms
-	dec = c.dec.dms
+	ra = _sexigesimal((ra_decimal % 360.)/15.)
+	dec = _sexigesimal(dec_decimal)
 
 	ra_string = "%02d:%02d:%05.2f" % (ra[0],ra[1],ra[2])
 	if dec[0] >= 0:
@@ -28,7 +36,7 @@ def GetSexigesimalString(ra_decimal, dec_decimal):
 		dec_string = "%03d:%02d:%05.2f" % (dec[0],np.abs(dec[1]),np.abs(dec[2]))
 		
 	# Python has a -0.0 object. If the deg is this (because object lies < 60 min south), the string formatter will drop the negative sign
-	if c.dec < 0.0 and dec[0] == 0.0:
+	if dec_decimal < 0.0 and dec[0] == 0.0:
 		dec_string = "-00:%02d:%05.2f" % (np.abs(dec[1]),np.abs(dec[2]))
 	return (ra_string, dec_string)
 
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django_tables2 import RequestConfig
+from .models import Transient, TransientStatus
+from .table_utils import TransientTable, NewTransientTable, TransientFilter, PageData, page_ids
+from .common.dashboard_cache import status_versions, dashboard_cache_seconds
+from .common.fingerprint import fingerprint
+
+# (status, title, prefix, table) for each dashboard table, in the order shown
+dashboard_categories = (('New','New Transients','new',NewTransientTable),
+						('FollowupRequested','Followup Requested','followrequest',TransientTable),
+						('Following','Following','following',TransientTable),
+						('Watch','Watch','watch',TransientTable),
+						('FollowupFinished','Finished Following','finishedfollowing',TransientTable),
+						('NeedsTemplate','Needs Template','needstemplate',TransientTable))
+dashboard_page_size = 10
+
+# everything a table row shows besides the transient itself
+dashboard_related = ('status','obs_group','best_spec_class','host','lightcurve_summary')
+# latest discovery first; the id keeps transients discovered together on the same page
+dashboard_order = ('-disc_date','-id')
+
+def dashboard_pages(request, tables):
+	"""
+	{status id: PageData} of the page the request shows of each of tables,
+	[(status id, prefix)].  one query lists the ids of every status's
+	transients and one more reads the transients on all the pages
+	"""
+	ids = {status_id:[] for status_id,prefix in tables}
+	if not len(ids): return {}
+	for id,status_id in Transient.objects.filter(status_id__in=ids.keys()).\
+		order_by(*dashboard_order).values_list('id','status_id'):
+		ids[status_id].append(id)
+	pages = {status_id:page_ids(request,prefix,ids[status_id],dashboard_page_size) for status_id,prefix in tables}
+	transients = Transient.objects.select_related(*dashboard_related).\
+		in_bulk([i for rows,offset in pages.values() for i in rows])
+	return {status_id:PageData([transients[i] for i in rows],len(ids[status_id]),offset)
+			for status_id,(rows,offset) in pages.items()}
+
+def fragment_key(prefix, version, request):
+	# the page links in a table carry the other tables' page/sort/search
+	# parameters, so the whole query string is part of the key
+	return 'dashboard_table:%s:%s:%s'%(prefix,version,fingerprint(sorted(request.GET.lists())))
+
+def reads_database(request, prefix):
+	"""is this table sorted or searched, which the database does better than a list"""
+	return bool(request.GET.get(prefix+'sort') or request.GET.get(prefix+'-ex'))
+
+def render_dashboard_tables(request):
+	"""
+	[(table html, title, prefix, filter)] for the dashboard.  a table is only
+	rendered when it isn't in the cache for its status's current version.
+	those that aren't sorted or searched read just the page they show, all
+	of them together (see dashboard_pages)
+	"""
+	statuses = list(TransientStatus.objects.all())
+	status_ids = {s.name:s.id for s in statuses}
+	versions = status_versions(status_ids.values())
+	keys = {prefix:fragment_key(prefix,versions.get(status_ids.get(status)),request)
+			for status,title,prefix,table_class in dashboard_categories}
+	fragments = cache.get_many(list(keys.values()))
+
+	missing = [(status,prefix) for status,title,prefix,table_class in dashboard_categories
+			   if keys[prefix] not in fragments]
+	pages = dashboard_pages(request,[(status_ids[status],prefix) for status,prefix in missing
+									 if status in status_ids and not reads_database(request,prefix)])
+
+	categories = []
+	for status,title,prefix,table_class in dashboard_categories:
+		status_id = status_ids.get(status)
+		queryset = Transient.objects.filter(status_id=status_id).order_by(*dashboard_order)
+		transientfilter = TransientFilter(request.GET, queryset=queryset, prefix=prefix)
+		html = fragments.get(keys[prefix])
+		if html is None:
+			if status_id is None: data = []
+			elif reads_database(request,prefix): data = transientfilter.qs.select_related(*dashboard_related)
+			else: data = pages[status_id]
+			table = table_class(data, prefix=prefix)
+			RequestConfig(request, paginate={'per_page': dashboard_page_size}).configure(table)
+			html = render_to_string('YSE_App/dashboard_table_fragment.html',
+									{'table':table,'all_transient_statuses':statuses}, request=request)
+			cache.set(keys[prefix],html,dashboard_cache_seconds)
+		categories += [(html,title,prefix,transientfilter)]
+
+	return categories
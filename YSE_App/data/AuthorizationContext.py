@@ -0,0 +1,72 @@
+from YSE_App.models import *
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+
+# group memberships rarely change, and every change clears the entry
+# (see user_groups_changed in models/profile_models.py)
+user_groups_cache_seconds = 3600
+
+def GetUserGroupIds(user):
+	"""ids of the user's groups, from the cache when possible"""
+	if user is None or not user.is_authenticated: return []
+	key = user_groups_cache_key(user.id)
+	group_ids = cache.get(key)
+	if group_ids is None:
+		group_ids = list(user.groups.values_list('id',flat=True))
+		cache.set(key,group_ids,user_groups_cache_seconds)
+	return group_ids
+
+class AuthorizationContext(object):
+	"""
+	what a user may see, worked out once per request.  the Get*_ByUser
+	functions of the Photometry, Spectra and ObservingResource services take
+	one of these wherever they take a user
+	"""
+	def __init__(self, user):
+		self.user = user
+		self._group_ids = None
+		self._allowed = {}
+
+	@property
+	def group_ids(self):
+		if self._group_ids is None:
+			self._group_ids = GetUserGroupIds(self.user)
+		return self._group_ids
+
+	def group_query(self):
+		"""(no groups, one of the user's groups), as GetUserGroupQuery used to return"""
+		return Q(groups__isnull=True), Q(groups__id__in=self.group_ids)
+
+	def allowed(self, model):
+		"""every row of model (anything with a groups m2m) the user may see"""
+		if model not in self._allowed:
+			no_group,contains_group = self.group_query()
+			self._allowed[model] = model.objects.filter(no_group | contains_group).distinct()
+		# a fresh copy, so nothing the caller does ends up cached here
+		return self._allowed[model].all()
+
+	def allowed_ids(self, model):
+		"""subquery of the ids of allowed(model)"""
+		return self.allowed(model).values('id')
+
+def GetAuthorizationContext(user):
+	"""an AuthorizationContext for user, the same one every time for the same user object"""
+	if isinstance(user, AuthorizationContext): return user
+	context = getattr(user,'_authorization_context',None)
+	if context is None:
+		context = AuthorizationContext(user)
+		user._authorization_context = context
+	return context
+
+class AuthorizationContextMiddleware(object):
+	"""
+	request.auth_context, built the first time it's used: by then basic auth
+	or rest_framework may have replaced request.user
+	"""
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		request.auth_context = SimpleLazyObject(lambda: GetAuthorizationContext(request.user))
+		return self.get_response(request)
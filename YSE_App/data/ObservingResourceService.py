@@ -1,34 +1,20 @@
 from YSE_App.models import *
 from django.db.models import Q
+from YSE_App.data.AuthorizationContext import GetAuthorizationContext
 
 
 def GetUserGroupQuery(user):
-    user_groups = []
-    for g in user.groups.all():
-        user_groups.append(g.name)
-
-    no_group = Q(groups__isnull=True)
-    contains_group = Q(groups__name__in=user_groups)
-
-    return no_group, contains_group
+    return GetAuthorizationContext(user).group_query()
 
 def GetAuthorizedToOResource_ByUser(user):
-    group_query_tuple = GetUserGroupQuery(user)
-    allowed_too_resources = ToOResource.objects.filter(group_query_tuple[0] | group_query_tuple[1]).distinct()
-
-    return allowed_too_resources
+    # user may also be an AuthorizationContext, e.g. request.auth_context
+    return GetAuthorizationContext(user).allowed(ToOResource)
 
 def GetAuthorizedQueuedResource_ByUser(user):
-    group_query_tuple = GetUserGroupQuery(user)
-    allowed_queuedresources = QueuedResource.objects.filter(group_query_tuple[0] | group_query_tuple[1]).distinct()
-
-    return allowed_queuedresources
+    return GetAuthorizationContext(user).allowed(QueuedResource)
 
 def GetAuthorizedClassicalResource_ByUser(user):
-    group_query_tuple = GetUserGroupQuery(user)
-    allowed_classicalresources = ClassicalResource.objects.filter(group_query_tuple[0] | group_query_tuple[1]).distinct()
-
-    return allowed_classicalresources
+    return GetAuthorizationContext(user).allowed(ClassicalResource)
 
 def GetAuthorizedClassicalObservingDate_ByUser(user):
     allowed_classical_resource = GetAuthorizedClassicalResource_ByUser(user)
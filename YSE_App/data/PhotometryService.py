@@ -1,22 +1,14 @@
 from YSE_App.models import *
 from django.db.models import Q
 from YSE_App.models import phot_models
+from YSE_App.data.AuthorizationContext import GetAuthorizationContext
 
 def GetUserGroupQuery(user):
-	user_groups = []
-	for g in user.groups.all():
-		user_groups.append(g.name)
-
-	no_group = Q(groups__isnull=True)
-	contains_group = Q(groups__name__in=user_groups)
-
-	return no_group, contains_group
+	return GetAuthorizationContext(user).group_query()
 
 def GetAuthorizedTransientPhotometry_ByUser(user):
-	group_query_tuple = GetUserGroupQuery(user)
-	allowed_phot = TransientPhotometry.objects.filter(group_query_tuple[0] | group_query_tuple[1]).distinct()
-	
-	return allowed_phot
+	# user may also be an AuthorizationContext, e.g. request.auth_context
+	return GetAuthorizationContext(user).allowed(TransientPhotometry)
 
 def GetAuthorizedTransientPhotometry_ByUser_ByTransient(user, transient_id):
 
@@ -27,10 +19,7 @@ def GetAuthorizedTransientPhotometry_ByUser_ByTransient(user, transient_id):
 	return allowed_phot_by_group_by_transient
 
 def GetAuthorizedHostPhotometry_ByUser(user):
-	host_query_tuple = GetUserGroupQuery(user)
-	allowed_phot = HostPhotometry.objects.filter(host_query_tuple[0] | host_query_tuple[1]).distinct()
-
-	return allowed_phot
+	return GetAuthorizationContext(user).allowed(HostPhotometry)
 
 def GetAuthorizedHostPhotometry_ByUser_ByHost(user, host_id):
 	allowed_phot_by_group = GetAuthorizedHostPhotometry_ByUser(user)
@@ -1,16 +1,12 @@
 from YSE_App.models import *
 from django.db.models import Q
+from YSE_App.common.spec_data import SpecDataPoints
+from YSE_App.data.AuthorizationContext import GetAuthorizationContext
 
 
 def GetUserGroupQuery(user):
-    user_groups = []
-    for g in user.groups.all():
-        user_groups.append(g.name)
-
-    no_group = Q(groups__isnull=True)
-    contains_group = Q(groups__name__in=user_groups)
-
-    return no_group, contains_group
+    # user may also be an AuthorizationContext, e.g. request.auth_context
+    return GetAuthorizationContext(user).group_query()
 
 def GetAuthorizedTransientSpectrum_ByUser(user, includeBadData=False):
     group_query_tuple = GetUserGroupQuery(user)
@@ -42,43 +38,35 @@ def GetAuthorizedHostSpectrum_ByUser_ByHost(user, host_id, includeBadData=False)
 
 def GetAuthorizedTransientSpecData_ByUser(user, includeBadData=False):
     allowed_spec = GetAuthorizedTransientSpectrum_ByUser(user, includeBadData)
-    spec_ids = allowed_spec.values('id')
-    allowed_spec_data_query = Q(spectrum__id__in=spec_ids)
-    allowed_spec_data = TransientSpecData.objects.filter(allowed_spec_data_query)
+    allowed_spec_data = SpecDataPoints(allowed_spec)
 
     return allowed_spec_data
 
 def GetAuthorizedHostSpecData_ByUser(user, includeBadData=False):
     allowed_spec = GetAuthorizedHostSpectrum_ByUser(user, includeBadData)
-    spec_ids = allowed_spec.values('id')
-    allowed_spec_data_query = Q(spectrum__id__in=spec_ids)
-    allowed_spec_data = HostSpecData.objects.filter(allowed_spec_data_query)
+    allowed_spec_data = SpecDataPoints(allowed_spec)
 
     return allowed_spec_data
 
 def GetAuthorizedTransientSpecData_BySpectrum(user, spectrum_id, includeBadData=False):
     # First check if they're allowed to access...
-    allowed_spec = GetAuthorizedTransientSpectrum_ByUser(user, includeBadData)
-    if allowed_spec:
-        allowed_spec = allowed_spec.filter(pk=spectrum_id)
+    allowed_spec = GetAuthorizedTransientSpectrum_ByUser(user, includeBadData).filter(pk=spectrum_id)
 
     spec_data = None
     if allowed_spec:
-        #... then get the data according to the dq flag preference
-        spec_data = TransientSpecData.objects.filter(spectrum__id=spectrum_id)
+        #... then unpack the spectrum's arrays
+        spec_data = allowed_spec[0].get_spec_data()
 
     return spec_data
 
 def GetAuthorizedHostSpecData_BySpectrum(user, spectrum_id, includeBadData=False):
     # First check if they're allowed to access...
-    allowed_spec = GetAuthorizedHostSpectrum_ByUser(user, includeBadData)
-    if allowed_spec:
-        allowed_spec = allowed_spec.filter(pk=spectrum_id)
+    allowed_spec = GetAuthorizedHostSpectrum_ByUser(user, includeBadData).filter(pk=spectrum_id)
 
     spec_data = None
     if allowed_spec:
-        #... then get the data according to the dq flag preference
-        spec_data = HostSpecData.objects.filter(spectrum__id=spectrum_id)
+        #... then unpack the spectrum's arrays
+        spec_data = allowed_spec[0].get_spec_data()
 
     return spec_data
 
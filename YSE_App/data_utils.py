@@ -2,11 +2,12 @@ import django
 from django.http import HttpResponse,JsonResponse
 from django.shortcuts import render, get_object_or_404, render_to_response
 from .models import *
-from django.db import models
+from django.db import models, transaction
 from astropy.coordinates import get_moon, SkyCoord
 from astropy.time import Time
 import astropy.units as u
 import datetime
+import io
 import json
 import numpy as np
 from django.conf import settings as djangoSettings
@@ -22,221 +23,308 @@ from .basicauth import *
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.parsers import JSONParser
 from django.db.models import ForeignKey
-from .common.alert import sendemail
-from .common.utilities import getRADecBox
+from .common.ingest_errors import IngestFailureCollector, report_ingest_failure
+from .common.cone_search import cone_search, healpix_or_none
+from .common.crossmatch import crossmatch
+from .common.phot_merge import merge_transient_phot, points_to_columns, point_fields
+from .common.lightcurve_summary import SummaryUpdates
+from .common.fk_resolver import get_pk, get_band_pk
+from .common.json_stream import iter_json_object
+from .common.phot_columns import is_columnar_upload, columnar_upload_data, read_phot_npz, take_rows
+from .common.fingerprint import fingerprint
+from .common.transient_search import index_transients
+from .common.detail_cache import forget_transient_details
+from .common.dashboard_cache import forget_statuses, forget_transients
 from django.db.models import Q
 
 @csrf_exempt
 @login_or_basic_auth_required
 def add_transient(request):
-	transient_data = JSONParser().parse(request)
+	# parsed one transient at a time as the body is read, see common/json_stream.py
+	transient_data = iter_json_object(request)
 	
-	auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-	credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-	username, password = credentials.split(':', 1)
-	user = auth.authenticate(username=username, password=password)
-
-	# ready to send error emails
-	smtpserver = "%s:%s" % (djangoSettings.SMTP_HOST, djangoSettings.SMTP_PORT)
-	from_addr = "%s@gmail.com" % djangoSettings.SMTP_LOGIN
-	subject = "TNS Transient Upload Failure"
-	txt_msg = "Alert : YSE_PZ Failed to upload transient %s "
-	
-	for transientlistkey in transient_data.keys():
-		if transientlistkey == 'noupdatestatus': continue
-
-		transient = transient_data[transientlistkey]
-
-		transientkeys = transient.keys()
-		if 'name' not in transientkeys:
-			return_dict = {"message":"Error : Transient name not provided for transient %s!"%transientlistkey}
-			return JsonResponse(return_dict)
-		print('updating transient %s'%transient['name'])
-		try:
-			transientdict = {'created_by_id':user.id,'modified_by_id':user.id}
-			for transientkey in transientkeys:
-				if transientkey == 'transientphotometry' or \
-				   transientkey == 'transientspectra' or \
-				   transientkey == 'host' or \
-				   transientkey == 'tags' or \
-				   transientkey == 'gw' or \
-				   transientkey == 'non_detect_instrument': continue
-
-				if not isinstance(Transient._meta.get_field(transientkey), ForeignKey):
-					transientdict[transientkey] = transient[transientkey]
-				else:
-					fkmodel = Transient._meta.get_field(transientkey).remote_field.model
-					if transientkey == 'non_detect_band' and 'non_detect_instrument' in transient.keys():
-						fk = fkmodel.objects.filter(name=transient[transientkey]).filter(instrument__name=transient['non_detect_instrument'])
-						if not len(fk):
-							fk = fkmodel.objects.filter(name=transient[transientkey])
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
+
+	# the upload is ingested by the ingest worker, see ingest_queue.py
+	return queue_ingest_job('add_transient',transient_data,user)
+
+def ingest_transients(transient_data,user,progress=None,ingest_job=None):
+
+	# transient_data is a dict or an iterator of (key, transient) pairs, in which
+	# case noupdatestatus has to come before the transients (ingest_queue.job_items does this)
+	if isinstance(transient_data,dict):
+		noupdatestatus = transient_data.get('noupdatestatus')
+		transient_data = transient_data.items()
+	else: noupdatestatus = None
+
+	# failures are stored and mailed as one digest later, see common/ingest_errors.py
+	with IngestFailureCollector(user,ingest_job=ingest_job) as failures:
+		# transients changed with update(), which sends none of the signals that
+		# keep the search index, the dashboard and the detail pages current, and
+		# the statuses they were listed under before
+		updated_ids,stale_status_ids = set(),set()
+		for transientlistkey,transient in transient_data:
+			if transientlistkey == 'noupdatestatus':
+				noupdatestatus = transient
+				continue
+
+			transientkeys = transient.keys()
+			if 'name' not in transientkeys:
+				failures.add(transientlistkey,"Transient name not provided")
+				if progress: progress(transientlistkey,"Error : Transient name not provided for transient %s!"%transientlistkey)
+				continue
+			print('updating transient %s'%transient['name'])
+			try:
+				transientdict = {'created_by_id':user.id,'modified_by_id':user.id}
+				for transientkey in transientkeys:
+					if transientkey == 'transientphotometry' or \
+					   transientkey == 'transientspectra' or \
+					   transientkey == 'host' or \
+					   transientkey == 'tags' or \
+					   transientkey == 'gw' or \
+					   transientkey == 'non_detect_instrument': continue
+
+					if not isinstance(Transient._meta.get_field(transientkey), ForeignKey):
+						transientdict[transientkey] = transient[transientkey]
 					else:
-						fk = fkmodel.objects.filter(name=transient[transientkey])
-					if not len(fk):
-						fk = fkmodel.objects.filter(name='Unknown')
-						print("Sending email to: %s" % user.username)
-						html_msg = "Alert : YSE_PZ Failed to upload transient %s "
-						html_msg += "\nError : %s value doesn\'t exist in transient.%s FK relationship"
-						sendemail(from_addr, user.email, subject,
-								  html_msg%(transient['name'],transient[transientkey],transientkey),
-								  djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
-
-					transientdict[transientkey] = fk[0]
-
-			dbtransient = Transient.objects.filter(name=transient['name'])
-			if not len(dbtransient):
-				dbtransient = Transient.objects.create(**transientdict)
-			else: #if clobber:
-				if 'noupdatestatus' in transient_data.keys() and not transient_data['noupdatestatus']:
-					if dbtransient[0].status.name == 'Ignore': dbtransient[0].status = TransientStatus.objects.filter(name='New')[0]
-					else: transientdict['status'] = dbtransient[0].status
-				else: transientdict['status'] = dbtransient[0].status
-				dbtransient.update(**transientdict)
-				dbtransient = dbtransient[0]
-			if 'tags' in transientkeys:
-				for tag in transient['tags']:
-					dbtransient.tags.add(tags=transient['tags'])
-				dbtransient.save()
+						fkmodel = Transient._meta.get_field(transientkey).remote_field.model
+						if transientkey == 'non_detect_band' and 'non_detect_instrument' in transient.keys():
+							fk = get_band_pk(transient[transientkey],transient['non_detect_instrument'],default_name=None)
+							if fk is None:
+								fk = get_pk(fkmodel,transient[transientkey])
+						else:
+							fk = get_pk(fkmodel,transient[transientkey])
+						if fk is None:
+							fk = get_pk(fkmodel,'Unknown')
+							failures.add(transient['name'],"%s value doesn't exist in transient.%s FK relationship"%(
+								transient[transientkey],transientkey),field='transient.%s'%transientkey,value=transient[transientkey])
+
+						transientdict['%s_id'%transientkey] = fk
+
+				# update() below skips Transient.save(), which keeps healpix in step with ra/dec
+				if 'ra' in transientdict and 'dec' in transientdict:
+					transientdict['healpix'] = healpix_or_none(transientdict['ra'],transientdict['dec'])
+
+				dbtransient = Transient.objects.filter(name=transient['name'])
+				if not len(dbtransient):
+					dbtransient = Transient.objects.create(**transientdict)
+				else: #if clobber:
+					if noupdatestatus is not None and not noupdatestatus:
+						if dbtransient[0].status.name == 'Ignore': dbtransient[0].status_id = get_pk(TransientStatus,'New')
+						else: transientdict['status_id'] = dbtransient[0].status_id
+					else: transientdict['status_id'] = dbtransient[0].status_id
+					dbtransient.update(**transientdict)
+					dbtransient = dbtransient[0]
+					updated_ids.add(dbtransient.id)
+					stale_status_ids.add(dbtransient.status_id)
+				if 'tags' in transientkeys:
+					for tag in transient['tags']:
+						dbtransient.tags.add(tags=transient['tags'])
+					dbtransient.save()
 			
-			if 'transientphotometry' in transientkeys:
-				# do photometry
-				add_transient_phot_util(transient['transientphotometry'],dbtransient,user)
+				if 'transientphotometry' in transientkeys:
+					# do photometry
+					add_transient_phot_util(transient['transientphotometry'],dbtransient,user)
 			
-			if 'transientspectra' in transientkeys:
-				# spectrum
-				add_transient_spec_util(transient['transientspectra'],dbtransient,user)
+				if 'transientspectra' in transientkeys:
+					# spectrum
+					add_transient_spec_util(transient['transientspectra'],dbtransient,user)
 		
-			if 'host' in transientkeys:
-				# host galaxy
-				add_transient_host_util(transient['host'],dbtransient,user)
+				if 'host' in transientkeys:
+					# host galaxy
+					add_transient_host_util(transient['host'],dbtransient,user)
+
+				if progress: progress(transient['name'],None)
 				
-		except Exception as e:
-			print('Transient %s failed!'%transient['name'])
-			print("Sending email to: %s" % user.username)
-			html_msg = "Alert : YSE_PZ Failed to upload transient %s with error %s"
-			sendemail(from_addr, user.email, subject, html_msg%(transient['name'],e),
-                      djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
-			# sending SMS is too scary for now
-			#sendsms(from_addr, phone_email, subject, txt_msg%transient['name'],
-            #        djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
+			except Exception as e:
+				print('Transient %s failed!'%transient['name'])
+				if progress: progress(transient['name'],str(e))
+				failures.add(transient['name'],str(e))
+
+		index_transients(updated_ids)
+		forget_statuses(stale_status_ids)
+		forget_transients(updated_ids)
+		forget_transient_details(updated_ids)
 			
-	return_dict = {"message":"success"}
-
-	return JsonResponse(return_dict)
 
 @csrf_exempt
 @login_or_basic_auth_required
 def add_gw_candidate(request):
-	transient_data = JSONParser().parse(request)
-	
-	auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-	credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-	username, password = credentials.split(':', 1)
-	user = auth.authenticate(username=username, password=password)
-
-	# ready to send error emails
-	smtpserver = "%s:%s" % (djangoSettings.SMTP_HOST, djangoSettings.SMTP_PORT)
-	from_addr = "%s@gmail.com" % djangoSettings.SMTP_LOGIN
-	subject = "TNS Transient Upload Failure"
-	txt_msg = "Alert : YSE_PZ Failed to upload transient %s "
+	# parsed one transient at a time as the body is read, see common/json_stream.py
+	transient_data = iter_json_object(request)
 	
-	for transientlistkey in transient_data.keys():
-		if transientlistkey == 'noupdatestatus': continue
-
-		transient = transient_data[transientlistkey]
-
-		transientkeys = transient.keys()
-		if 'name' not in transientkeys:
-			return_dict = {"message":"Error : Transient name not provided for transient %s!"%transientlistkey}
-			return JsonResponse(return_dict)
-		print('updating transient %s'%transient['name'])
-		try:
-			transientdict = {'created_by_id':user.id,'modified_by_id':user.id}
-			for transientkey in transientkeys:
-				if transientkey == 'transientphotometry' or \
-				   transientkey == 'transientspectra' or \
-				   transientkey == 'host' or \
-				   transientkey == 'tags' or \
-				   transientkey == 'gwcandidate' or \
-				   transientkey == 'gwcandidateimage' or \
-				   transientkey == 'non_detect_instrument': continue
-
-				if not isinstance(Transient._meta.get_field(transientkey), ForeignKey):
-					transientdict[transientkey] = transient[transientkey]
-				else:
-					fkmodel = Transient._meta.get_field(transientkey).remote_field.model
-					if transientkey == 'non_detect_band' and 'non_detect_instrument' in transient.keys():
-						fk = fkmodel.objects.filter(name=transient[transientkey]).filter(instrument__name=transient['non_detect_instrument'])
-						if not len(fk):
-							fk = fkmodel.objects.filter(name=transient[transientkey])
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
+
+	# the upload is ingested by the ingest worker, see ingest_queue.py
+	return queue_ingest_job('add_gw_candidate',transient_data,user)
+
+def ingest_gw_candidates(transient_data,user,progress=None,ingest_job=None):
+
+	# transient_data is a dict or an iterator of (key, transient) pairs, in which
+	# case noupdatestatus has to come before the transients (ingest_queue.job_items does this)
+	if isinstance(transient_data,dict):
+		noupdatestatus = transient_data.get('noupdatestatus')
+		transient_data = transient_data.items()
+	else: noupdatestatus = None
+
+	# failures are stored and mailed as one digest later, see common/ingest_errors.py
+	with IngestFailureCollector(user,ingest_job=ingest_job) as failures:
+		# transients changed with update(), which sends none of the signals that
+		# keep the search index, the dashboard and the detail pages current, and
+		# the statuses they were listed under before
+		updated_ids,stale_status_ids = set(),set()
+		for transientlistkey,transient in transient_data:
+			if transientlistkey == 'noupdatestatus':
+				noupdatestatus = transient
+				continue
+
+			transientkeys = transient.keys()
+			if 'name' not in transientkeys:
+				failures.add(transientlistkey,"Transient name not provided")
+				if progress: progress(transientlistkey,"Error : Transient name not provided for transient %s!"%transientlistkey)
+				continue
+			print('updating transient %s'%transient['name'])
+			try:
+				transientdict = {'created_by_id':user.id,'modified_by_id':user.id}
+				for transientkey in transientkeys:
+					if transientkey == 'transientphotometry' or \
+					   transientkey == 'transientspectra' or \
+					   transientkey == 'host' or \
+					   transientkey == 'tags' or \
+					   transientkey == 'gwcandidate' or \
+					   transientkey == 'gwcandidateimage' or \
+					   transientkey == 'non_detect_instrument': continue
+
+					if not isinstance(Transient._meta.get_field(transientkey), ForeignKey):
+						transientdict[transientkey] = transient[transientkey]
 					else:
-						fk = fkmodel.objects.filter(name=transient[transientkey])
-					if not len(fk):
-						fk = fkmodel.objects.filter(name='Unknown')
-						print("Sending email to: %s" % user.username)
-						html_msg = "Alert : YSE_PZ Failed to upload transient %s "
-						html_msg += "\nError : %s value doesn\'t exist in transient.%s FK relationship"
-						sendemail(from_addr, user.email, subject,
-								  html_msg%(transient['name'],transient[transientkey],transientkey),
-								  djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
-
-					transientdict[transientkey] = fk[0]
-
-			dbtransient = Transient.objects.filter(name=transient['name'])
-			if not len(dbtransient):
-				# ra/dec box query
-				sc = SkyCoord(transient['ra'],transient['dec'],frame="fk5",unit=u.deg)
-				ramin,ramax,decmin,decmax = getRADecBox(sc.ra.deg,sc.dec.deg,size=5/3600.)
-				dbtransient = Transient.objects.filter(Q(ra__gte = ramin) & Q(ra__lte = ramax) & Q(dec__gte = decmin) & Q(dec__lte = decmax))
-				if len(dbtransient) > 1: dbtransient = dbtransient[0]
-				elif len(dbtransient): dbtransient = dbtransient[0]
+						fkmodel = Transient._meta.get_field(transientkey).remote_field.model
+						if transientkey == 'non_detect_band' and 'non_detect_instrument' in transient.keys():
+							fk = get_band_pk(transient[transientkey],transient['non_detect_instrument'],default_name=None)
+							if fk is None:
+								fk = get_pk(fkmodel,transient[transientkey])
+						else:
+							fk = get_pk(fkmodel,transient[transientkey])
+						if fk is None:
+							fk = get_pk(fkmodel,'Unknown')
+							failures.add(transient['name'],"%s value doesn't exist in transient.%s FK relationship"%(
+								transient[transientkey],transientkey),field='transient.%s'%transientkey,value=transient[transientkey])
+
+						transientdict['%s_id'%transientkey] = fk
+
+				# update() below skips Transient.save(), which keeps healpix in step with ra/dec
+				if 'ra' in transientdict and 'dec' in transientdict:
+					transientdict['healpix'] = healpix_or_none(transientdict['ra'],transientdict['dec'])
+
+				dbtransient = Transient.objects.filter(name=transient['name'])
+				if not len(dbtransient):
+					# nearest transient within 2.5 arcsec
+					sc = SkyCoord(transient['ra'],transient['dec'],frame="fk5",unit=u.deg)
+					matches = cone_search(Transient.objects.all(),sc.ra.deg,sc.dec.deg,2.5/3600.)
+					if len(matches): dbtransient = matches[0][0]
+					else:
+						dbtransient = Transient.objects.create(**transientdict)
 				else:
-					dbtransient = Transient.objects.create(**transientdict)
-			else:
-				if 'noupdatestatus' in transient_data.keys() and not transient_data['noupdatestatus']:
-					if dbtransient[0].status.name == 'Ignore': dbtransient[0].status = TransientStatus.objects.filter(name='New')[0]
-					else: transientdict['status'] = dbtransient[0].status
-				else: transientdict['status'] = dbtransient[0].status
-				dbtransient.update(**transientdict)
-				dbtransient = dbtransient[0]
-			if 'tags' in transientkeys:
-				for tag in transient['tags']:
-					dbtransient.tags.add(tags=transient['tags'])
-				dbtransient.save()
+					if noupdatestatus is not None and not noupdatestatus:
+						if dbtransient[0].status.name == 'Ignore': dbtransient[0].status_id = get_pk(TransientStatus,'New')
+						else: transientdict['status_id'] = dbtransient[0].status_id
+					else: transientdict['status_id'] = dbtransient[0].status_id
+					dbtransient.update(**transientdict)
+					dbtransient = dbtransient[0]
+					updated_ids.add(dbtransient.id)
+					stale_status_ids.add(dbtransient.status_id)
+				if 'tags' in transientkeys:
+					for tag in transient['tags']:
+						dbtransient.tags.add(tags=transient['tags'])
+					dbtransient.save()
 			
-			if 'transientphotometry' in transientkeys:
-				# do photometry
-				add_transient_phot_util(transient['transientphotometry'],dbtransient,user)
+				if 'transientphotometry' in transientkeys:
+					# do photometry
+					add_transient_phot_util(transient['transientphotometry'],dbtransient,user)
 			
-			if 'transientspectra' in transientkeys:
-				# spectrum
-				add_transient_spec_util(transient['transientspectra'],dbtransient,user)
+				if 'transientspectra' in transientkeys:
+					# spectrum
+					add_transient_spec_util(transient['transientspectra'],dbtransient,user)
 		
-			if 'host' in transientkeys:
-				# host galaxy
-				add_transient_host_util(transient['host'],dbtransient,user)
-
-			if 'gwcandidate' in transientkeys:
-				# GW candidate info
-				add_gw_candidate_util(transient['gwcandidate'],dbtransient,user)
-				gwtag = TransientTag.objects.get(name='GW Candidate')
-				dbtransient.tags.add(gwtag)
-				dbtransient.save()
+				if 'host' in transientkeys:
+					# host galaxy
+					add_transient_host_util(transient['host'],dbtransient,user)
+
+				if 'gwcandidate' in transientkeys:
+					# GW candidate info
+					add_gw_candidate_util(transient['gwcandidate'],dbtransient,user)
+					gwtag = TransientTag.objects.get(name='GW Candidate')
+					dbtransient.tags.add(gwtag)
+					dbtransient.save()
+
+				if progress: progress(transient['name'],None)
 				
-		except Exception as e:
-			print('Transient %s failed!'%transient['name'])
-			print("Sending email to: %s" % user.username)
-			html_msg = "Alert : YSE_PZ Failed to upload transient %s with error %s"
-			sendemail(from_addr, user.email, subject, html_msg%(transient['name'],e),
-                      djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
-			# sending SMS is too scary for now
-			#sendsms(from_addr, phone_email, subject, txt_msg%transient['name'],
-            #        djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
+			except Exception as e:
+				print('Transient %s failed!'%transient['name'])
+				if progress: progress(transient['name'],str(e))
+				failures.add(transient['name'],str(e))
+
+		index_transients(updated_ids)
+		forget_statuses(stale_status_ids)
+		forget_transients(updated_ids)
+		forget_transient_details(updated_ids)
 			
-	return_dict = {"message":"success"}
 
-	return JsonResponse(return_dict)
 
+# transients stored (and read back by the ingest worker) per query
+ingest_item_chunk_size = 50
+
+def queue_ingest_job(kind,transient_data,user):
+
+	# each transient is stored as its own IngestJobItem as soon as it's parsed,
+	# a chunk at a time, so the upload is never all in memory at once.  the job
+	# only becomes visible to the workers once all of its items are in
+	with transaction.atomic():
+		job = IngestJob.objects.create(kind=kind,created_by_id=user.id,modified_by_id=user.id)
+		items,n_items = [],0
+		for transientlistkey,transient in transient_data:
+			if transientlistkey == 'noupdatestatus':
+				job.noupdatestatus = bool(transient)
+				continue
+			# reject obviously broken uploads now, everything else is up to the worker
+			if 'name' not in transient.keys():
+				transaction.set_rollback(True)
+				return_dict = {"message":"Error : Transient name not provided for transient %s!"%transientlistkey}
+				return JsonResponse(return_dict)
+			n_items += 1
+			items += [IngestJobItem(ingest_job=job,position=n_items,key=transientlistkey,payload=json.dumps(transient),
+									created_by_id=user.id,modified_by_id=user.id)]
+			if len(items) == ingest_item_chunk_size:
+				IngestJobItem.objects.bulk_create(items)
+				items = []
+		IngestJobItem.objects.bulk_create(items)
+		IngestJob.objects.filter(id=job.id).update(n_items=n_items,noupdatestatus=job.noupdatestatus)
+
+	return_dict = {"message":"queued ingest job %i"%job.id,"job_id":job.id,
+				   "status_url":reverse('ingest_job',args=(job.id,))}
+	return JsonResponse(return_dict,status=202)
+
+@login_or_basic_auth_required
+def ingest_job(request, job_id):
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
+
+	job = get_object_or_404(IngestJob, pk=job_id)
+	if job.created_by_id != user.id and not user.is_staff:
+		return JsonResponse({"message":"ingest job %s belongs to another user"%job_id},status=403)
+
+	# what the worker has made of each transient so far
+	results = list(IngestJobItem.objects.filter(ingest_job=job,status__isnull=False).\
+				   order_by('position').values_list('name','status','message'))
+	return_dict = {"job_id":job.id,"kind":job.kind,"status":job.status,
+				   "n_items":job.n_items,"n_done":job.n_done,"n_failed":job.n_failed,
+				   "succeeded":[name for name,status,message in results if status == 'success'],
+				   "failed":{name:message for name,status,message in results if status == 'failed'},
+				   "error":job.error,"created_date":job.created_date,
+				   "started_date":job.started_date,"finished_date":job.finished_date}
+	return JsonResponse(return_dict)
 
 def add_gw_candidate_util(gwdict,transient,user):
 	
@@ -251,21 +339,12 @@ def add_gw_candidate_util(gwdict,transient,user):
 				dbgwdict[gwkey] = gwdict[gwkey]
 		else:
 			fkmodel = GWCandidate._meta.get_field(gwkey).remote_field.model
-			fk = fkmodel.objects.filter(name=gwdict[gwkey])
-			if not len(fk):
-				# ready to send error emails
-				smtpserver = "%s:%s" % (djangoSettings.SMTP_HOST, djangoSettings.SMTP_PORT)
-				from_addr = "%s@gmail.com" % djangoSettings.SMTP_LOGIN
-				subject = "TNS Transient Upload Failure"
-				html_msg = "Alert : YSE_PZ Failed to upload transient %s "
-				txt_msg = "Alert : YSE_PZ Failed to upload transient %s "
-				html_msg += "\nError : %s value doesn\'t exist in GWCandidate.%s FK relationship"
-				print("Sending email to: %s" % user.username)
-				sendemail(from_addr, user.email, subject,
-						  html_msg%(gwdict['name'],gwdict[gwkey],gwkey),
-						  djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
+			fk = get_pk(fkmodel,gwdict[gwkey])
+			if fk is None:
+				report_ingest_failure(user,transient.name,"%s value doesn't exist in GWCandidate.%s FK relationship"%(
+					gwdict[gwkey],gwkey),field='GWCandidate.%s'%gwkey,value=gwdict[gwkey])
 				
-			gwdict[gwkey] = fk[0]
+			dbgwdict['%s_id'%gwkey] = fk
 
 	dbgwdict['transient'] = transient
 	dbgw = GWCandidate.objects.filter(name=dbgwdict['name'])
@@ -283,26 +362,19 @@ def add_gw_candidate_util(gwdict,transient,user):
 			else:
 				fkmodel = GWCandidateImage._meta.get_field(gwkey).remote_field.model
 				if gwkey == 'image_filter':
-					fk = fkmodel.objects.filter(name=gwdict['gwcandidateimage'][gwtopkey][gwkey].split(' - ')[1]).filter(instrument__name=gwdict['gwcandidateimage'][gwtopkey][gwkey].split(' - ')[0])
-					if not len(fk):
-						fk = fkmodel.objects.filter(name=gwdict['gwcandidateimage'][gwtopkey][gwkey])
+					fk = get_band_pk(gwdict['gwcandidateimage'][gwtopkey][gwkey].split(' - ')[1],
+									 gwdict['gwcandidateimage'][gwtopkey][gwkey].split(' - ')[0],default_name=None)
+					if fk is None:
+						fk = get_pk(fkmodel,gwdict['gwcandidateimage'][gwtopkey][gwkey])
 				else:
-					fk = fkmodel.objects.filter(name=gwdict['gwcandidateimage'][gwtopkey][gwkey])
-
-				if not len(fk):
-					# ready to send error emails
-					smtpserver = "%s:%s" % (djangoSettings.SMTP_HOST, djangoSettings.SMTP_PORT)
-					from_addr = "%s@gmail.com" % djangoSettings.SMTP_LOGIN
-					subject = "TNS Transient Upload Failure"
-					html_msg = "Alert : YSE_PZ Failed to upload transient %s "
-					txt_msg = "Alert : YSE_PZ Failed to upload transient %s "
-					html_msg += "\nError : %s value doesn\'t exist in transient.%s FK relationship"
-					print("Sending email to: %s" % user.username)
-					sendemail(from_addr, user.email, subject,
-							  html_msg%(gwdict['name'],gwdict['gwcandidateimage'][gwtopkey],gwdict['gwcandidateimage'][gwtopkey][gwkey]),
-							  djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
-
-				dbgwimagedict[gwkey] = fk[0]
+					fk = get_pk(fkmodel,gwdict['gwcandidateimage'][gwtopkey][gwkey])
+
+				if fk is None:
+					report_ingest_failure(user,transient.name,"%s value doesn't exist in GWCandidateImage.%s FK relationship"%(
+						gwdict['gwcandidateimage'][gwtopkey][gwkey],gwkey),field='GWCandidateImage.%s'%gwkey,
+						value=gwdict['gwcandidateimage'][gwtopkey][gwkey])
+
+				dbgwimagedict['%s_id'%gwkey] = fk
 					
 		dbgwimagedict['gw_candidate'] = dbgw
 		dbgwimage = GWCandidateImage.objects.filter(gw_candidate=dbgw).filter(image_filename=dbgwimagedict['image_filename'])
@@ -311,7 +383,9 @@ def add_gw_candidate_util(gwdict,transient,user):
 		else: #if clobber:
 			dbgwimage.update(**dbgwimagedict)
 			dbgwimage = dbgwimage[0]
-			
+
+	# the update()s above send no signals, so the detail pages aren't told otherwise
+	forget_transient_details(gw_candidate_transient_ids(dbgw))
 	return_dict = {"message":"GW success"}
 	return JsonResponse(return_dict)		
 
@@ -330,26 +404,23 @@ def add_transient_host_util(hostdict,transient,user):
 			fkmodel = Host._meta.get_field(hostkey).remote_field.model
 			fk = fkmodel.objects.filter(name=hostdict[hostkey])
 			if not len(fk):
-				# ready to send error emails
-				smtpserver = "%s:%s" % (djangoSettings.SMTP_HOST, djangoSettings.SMTP_PORT)
-				from_addr = "%s@gmail.com" % djangoSettings.SMTP_LOGIN
-				subject = "TNS Transient Upload Failure"
-				html_msg = "Alert : YSE_PZ Failed to upload transient %s "
-				txt_msg = "Alert : YSE_PZ Failed to upload transient %s "
-				html_msg += "\nError : %s value doesn\'t exist in transient.%s FK relationship"
-				print("Sending email to: %s" % user.username)
-				sendemail(from_addr, user.email, subject,
-						  html_msg%(transient['name'],transient[transientkey],transientkey),
-						  djangoSettings.SMTP_LOGIN, djangoSettings.SMTP_PASSWORD, smtpserver)
+				report_ingest_failure(user,transient.name,"%s value doesn't exist in Host.%s FK relationship"%(
+					hostdict[hostkey],hostkey),field='Host.%s'%hostkey,value=hostdict[hostkey])
 				
 			hostdict[hostkey] = fk[0]
 
+	# update() below skips Host.save(), which keeps healpix in step with ra/dec
+	if 'ra' in dbhostdict and 'dec' in dbhostdict:
+		dbhostdict['healpix'] = healpix_or_none(dbhostdict['ra'],dbhostdict['dec'])
+
 	dbhost = Host.objects.filter(name=dbhostdict['name'])
 	if not len(dbhost):
 		dbhost = Host.objects.create(**dbhostdict)
 	else: #if clobber:
 		dbhost.update(**dbhostdict)
 		dbhost = dbhost[0]
+		# the host's name and redshift are searchable on all its transients
+		index_transients(Transient.objects.filter(host_id=dbhost.id).values_list('id',flat=True))
 
 	transient.host = dbhost
 	transient.save()
@@ -363,83 +434,19 @@ def add_transient_phot_util(photdict,transient,user):
 		if k == 'clobber' or k == 'mjdmatchmin': continue
 		photometry = photdict[k]
 		
-		instrument = Instrument.objects.filter(name=photometry['instrument'])
-		if not len(instrument):
-			instrument = Instrument.objects.filter(name='Unknown')
-		instrument = instrument[0]
+		instrument_id = get_pk(Instrument,photometry['instrument'],'Unknown')
 
-		obs_group = ObservationGroup.objects.filter(name=photometry['obs_group'])
-		if not len(obs_group):
-			obs_group = ObservationGroup.objects.filter(name='Unknown')
-		obs_group = obs_group[0]
+		obs_group_id = get_pk(ObservationGroup,photometry['obs_group'],'Unknown')
 
-		transientphot = TransientPhotometry.objects.filter(transient=transient).filter(instrument=instrument).filter(obs_group=obs_group)
+		transientphot = TransientPhotometry.objects.filter(transient=transient).filter(instrument_id=instrument_id).filter(obs_group_id=obs_group_id)
 		if not len(transientphot):
 			transientphot = TransientPhotometry.objects.create(
-				instrument=instrument,obs_group=obs_group,transient=transient,
+				instrument_id=instrument_id,obs_group_id=obs_group_id,transient=transient,
 				created_by_id=user.id,modified_by_id=user.id)
 		else: transientphot = transientphot[0]
-		existingphot = TransientPhotData.objects.filter(photometry=transientphot)
-
-		existingphot = TransientPhotData.objects.filter(photometry=transientphot)
-		
-		for k in photometry['photdata']:
-			p = photometry['photdata'][k]
-
-			pmjd = Time(p['obs_date'],format='isot').mjd
-
-			band = PhotometricBand.objects.filter(name=p['band']).filter(instrument__name=photometry['instrument'])
-			if len(band): band = band[0]
-			else: band = PhotometricBand.objects.filter(name='Unknown')[0]
-			
-			obsExists = False
-			for e in existingphot:
-				if e.photometry.id == transientphot.id:
-					if e.band == band:
-						try:
-							mjd = Time(e.obs_date.isoformat().split('+')[0],format='isot').mjd
-						except:
-							mjd = Time(e.obs_date,format='isot').mjd
-						if np.abs(mjd - pmjd) < photdict['mjdmatchmin']:
-							obsExists = True
-							if photdict['clobber']:
-								if p['data_quality']:
-									dq = DataQuality.objects.filter(name=p['data_quality'])
-									if not dq:
-										dq = DataQuality.objects.filter(name='Bad')
-									dq = dq[0]
-								else: dq = None
-								
-								e.obs_date = p['obs_date']
-								e.flux = p['flux']
-								e.flux_err = p['flux_err']
-								e.flux_zero_point = p['flux_zero_point']
-								e.mag = p['mag']
-								e.mag_err = p['mag_err']
-								e.forced = p['forced']
-								e.diffim = p['diffim']
-								e.data_quality = dq
-								e.photometry = transientphot
-								e.discovery_point = p['discovery_point']
-								e.band = band
-								e.modified_by_id = user.id
-								e.save()
-
-			if not obsExists:
-				if p['data_quality']:
-					dq = DataQuality.objects.filter(name=p['data_quality'])
-					if not dq:
-						dq = DataQuality.objects.filter(name='Bad')
-					dq = dq[0]
-				else: dq = None
-				TransientPhotData.objects.create(
-					obs_date=p['obs_date'],flux=p['flux'],flux_err=p['flux_err'],
-					mag=p['mag'],mag_err=p['mag_err'],forced=p['forced'],
-					diffim=p['diffim'],
-					data_quality=dq,photometry=transientphot,
-					flux_zero_point=p['flux_zero_point'],
-					discovery_point=p['discovery_point'],band=band,
-					created_by_id=user.id,modified_by_id=user.id)
+		photdata = [photometry['photdata'][k] for k in photometry['photdata']]
+		merge_transient_phot(transientphot, points_to_columns(photdata), photometry['instrument'], user,
+							 mjdmatchmin=photdict['mjdmatchmin'], clobber=photdict['clobber'])
 
 	return_dict = {"message":"successfully added phot data"}
 	return JsonResponse(return_dict)
@@ -451,76 +458,65 @@ def add_transient_spec_util(specdict,transient,user):
 		if k == 'clobber': continue
 		spectrum = specdict[k]
 		# get all the foreign keys we need
-		instrument = Instrument.objects.filter(name=spectrum['instrument'])
-		if not len(instrument):
-			instrument = Instrument.objects.filter(name='Unknown')
-		instrument = instrument[0]
-
-		obs_group = ObservationGroup.objects.filter(name=spectrum['obs_group'])
-		if not len(obs_group):
-			obs_group = ObservationGroup.objects.filter(name='Unknown')
-		obs_group = obs_group[0]
+		instrument_id = get_pk(Instrument,spectrum['instrument'],'Unknown')
+
+		obs_group_id = get_pk(ObservationGroup,spectrum['obs_group'],'Unknown')
 		
 		allgroups = []
 		if 'groups' in spectrum.keys() and spectrum['groups']:
 			for specgroup in spectrum['groups'].split(','):
-				group = Group.objects.filter(name=specgroup)
-				if not len(group):
-					return_dict = {"message":"group %s is not in DB"%hd['groups']}
+				group_id = get_pk(Group,specgroup)
+				if group_id is None:
+					return_dict = {"message":"group %s is not in DB"%spectrum['groups']}
 					return JsonResponse(return_dict)
-				group = group[0]
-				allgroups += [group]
-
-		if 'data_quality' in spectrum.keys() and spectrum['data_quality']:
-			dq = DataQuality.objects.filter(name=spectrum['data_quality'])
-			if not dq:
-				dq = DataQuality.objects.filter(name='Bad')
-				dq = dq[0]
-			else: dq = None
-			spectrum['data_quality'] = dq
-
-		spectrum['instrument'] = instrument
-		spectrum['obs_group'] = obs_group
+				allgroups += [group_id]
+
+		if 'data_quality' in spectrum.keys():
+			if spectrum['data_quality']:
+				spectrum['data_quality_id'] = get_pk(DataQuality,spectrum['data_quality'],'Bad')
+			del spectrum['data_quality']
+		if 'groups' in spectrum.keys(): del spectrum['groups']
+
+		del spectrum['instrument']
+		del spectrum['obs_group']
+		spectrum['instrument_id'] = instrument_id
+		spectrum['obs_group_id'] = obs_group_id
 	
 		# get the spectrum
 		transientspec = TransientSpectrum.objects.filter(transient=transient).\
-			filter(instrument=instrument).filter(obs_group=obs_group).filter(obs_date=spectrum['obs_date'])
+			filter(instrument_id=instrument_id).filter(obs_group_id=obs_group_id).filter(obs_date=spectrum['obs_date'])
 		spectrum['created_by_id'] = user.id
 		spectrum['modified_by_id'] = user.id
 		spectrum['transient'] = transient
 		spectrum_copy = spectrum.copy()
 		del spectrum_copy['specdata']
 
+		specdata = [spectrum['specdata'][k] for k in spectrum['specdata'].keys()]
+		wavelength,flux,flux_err = [s['wavelength'] for s in specdata],[s['flux'] for s in specdata],[s['flux_err'] for s in specdata]
+		content_hash = fingerprint({k:spectrum_copy[k] for k in spectrum_copy.keys()
+									if k not in ('transient','created_by_id','modified_by_id')},
+								   allgroups,wavelength,flux,flux_err)
+
 		if not len(transientspec):
 			transientspec = TransientSpectrum.objects.create(**spectrum_copy)
 		else:
 			transientspec = transientspec[0]
+			# exactly what was uploaded last time, nothing to write
+			if transientspec.content_hash == content_hash: continue
 			if specdict['clobber']:
-				transientspec.update(**spectrum_copy)
-				transientspec.save()
+				for key in spectrum_copy.keys():
+					setattr(transientspec,key,spectrum_copy[key])
 
 		if len(allgroups):
-			for group in allgroups:
-				if group not in transientspec.groups.all():
-					transientspec.groups.add(group)
-					transientspec.save()
+			transientspec.groups.add(*allgroups)
 
 		# add the spec data
-		existingspec = TransientSpecData.objects.filter(spectrum=transientspec)
-		# loop through new, comp against existing
-		if len(existingspec) and specdict['clobber']:
-			for e in existingspec: e.delete()
-		elif len(existingspec):
+		if transientspec.spec_data and not specdict['clobber']:
 			return_dict = {"message":"spectrum exists.  Not clobbering"}
 			return JsonResponse(return_dict)
 
-		specdata = spectrum['specdata']
-		for k in specdata.keys():
-			s = specdata[k]
-
-			TransientSpecData.objects.create(spectrum=transientspec,wavelength=s['wavelength'],
-											 flux=s['flux'],flux_err=s['flux_err'],
-											 created_by_id=user.id,modified_by_id=user.id)
+		transientspec.set_spec_data(wavelength,flux,flux_err=flux_err)
+		transientspec.save(content_hash=content_hash)
 	
 	return_dict = {"message":"successfully added spec data"}
 	return JsonResponse(return_dict)
@@ -528,12 +524,26 @@ def add_transient_spec_util(specdict,transient,user):
 @csrf_exempt
 @login_or_basic_auth_required
 def add_transient_phot(request):
-	phot_data = JSONParser().parse(request)
 
-	auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-	credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-	username, password = credentials.split(':', 1)
-	user = auth.authenticate(username=username, password=password)
+	if is_columnar_upload(request):
+		# an .npz of columns, see common/phot_columns.py
+		try:
+			phot_data,columns,mjd = read_phot_npz(columnar_upload_data(request))
+		except Exception as e:
+			return JsonResponse({"message":"could not read the photometry: %s"%e},status=400)
+	else:
+		# the points are collected straight into columns as the body is read,
+		# see common/json_stream.py
+		phot_data,columns,mjd = {},{f:[] for f in point_fields},None
+		for key,value in iter_json_object(request):
+			if key in ('header','transient','photheader'):
+				phot_data[key] = value
+			else:
+				for f in point_fields:
+					columns[f] += [value[f]]
+
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
 	
 	if 'header' in phot_data.keys() and 'transient' in phot_data.keys() and 'photheader' in phot_data.keys():
 		hd = phot_data['header']
@@ -544,137 +554,254 @@ def add_transient_phot(request):
 		return JsonResponse(return_dict)
 
 	# get all the foreign keys we need
-	instrument = Instrument.objects.filter(name=ph['instrument'])
-	if not len(instrument):
-		instrument = Instrument.objects.filter(name='Unknown')
-	instrument = instrument[0]
-
-	obs_group = ObservationGroup.objects.filter(name=ph['obs_group'])
-	if not len(obs_group):
-		obs_group = ObservationGroup.objects.filter(name='Unknown')
-	obs_group = obs_group[0]
-
-	status = TransientStatus.objects.filter(name=tr['status'])
-	if not len(status):
+	instrument_id = get_pk(Instrument,ph['instrument'],'Unknown')
+
+	obs_group_id = get_pk(ObservationGroup,ph['obs_group'],'Unknown')
+
+	status_id = get_pk(TransientStatus,tr['status'])
+	if status_id is None:
 		return_dict = {"message":"status %s is not in DB"%tr['status']}
 		return JsonResponse(return_dict)
-	status = status[0]
 
 	allgroups = []
 	if ph['groups']:
 		for photgroup in ph['groups'].split(','):
-			group = Group.objects.filter(name=photgroup)
-			if not len(group):
+			group_id = get_pk(Group,photgroup)
+			if group_id is None:
 				return_dict = {"message":"group %s is not in DB"%ph['groups']}
 				return JsonResponse(return_dict)
-			group = group[0]
-			allgroups += [group]
+			allgroups += [group_id]
 
 	# get or create transient
 	transient = Transient.objects.filter(name=tr['name'])
 	if not len(transient):
 		transient = Transient.objects.create(name=tr['name'],ra=tr['ra'],dec=tr['dec'],
-											 status=status,created_by_id=user.id,
-											 obs_group=obs_group,
+											 status_id=status_id,created_by_id=user.id,
+											 obs_group_id=obs_group_id,
 											 modified_by_id=user.id)
 	else: transient = transient[0]
 	# get all existing photometry
-	transientphot = TransientPhotometry.objects.filter(transient=transient).filter(instrument=instrument).filter(obs_group=obs_group)
+	transientphot = TransientPhotometry.objects.filter(transient=transient).filter(instrument_id=instrument_id).filter(obs_group_id=obs_group_id)
 	if not len(transientphot):
 		transientphot = TransientPhotometry.objects.create(
-			instrument=instrument,obs_group=obs_group,transient=transient,
+			instrument_id=instrument_id,obs_group_id=obs_group_id,transient=transient,
 			created_by_id=user.id,modified_by_id=user.id)
 	else:
 		transientphot = transientphot[0]
 		if hd['clobber']:
-			transientphot.instrument = instrument
-			transientphot.obs_group = obs_group
+			transientphot.instrument_id = instrument_id
+			transientphot.obs_group_id = obs_group_id
 			transientphot.modified_by_id = user.id
 			transientphot.save()
 
 	if len(allgroups):
-		for group in allgroups:
-			if group not in transientphot.groups.all():
-				transientphot.groups.add(group)
-				transientphot.save()
+		transientphot.groups.add(*allgroups)
 		
-	existingphot = TransientPhotData.objects.filter(photometry=transientphot)
 	#if hd['delete']:
-	#	for e in existingphot:
-	#		if e.photometry.id == transientphot.id:
-	#			e.delete()
-	#existingphot = TransientPhotData.objects.filter(photometry=transientphot)
-				
-	# loop through new, comp against existing
-	for k in phot_data.keys():
-		if k == 'header' or k == 'transient' or k == 'photheader': continue
-		p = phot_data[k]
-		pmjd = Time(p['obs_date'],format='isot').mjd
-		band = PhotometricBand.objects.filter(name=p['band']).filter(instrument__name=ph['instrument'])
-		if len(band): band = band[0]
-		else: band = PhotometricBand.objects.filter(name='Unknown')[0]
-
-		obsExists = False
-		for e in existingphot:
-			if e.photometry.id == transientphot.id:
-				if e.band == band:
-					try:
-						mjd = Time(e.obs_date.isoformat().split('+')[0],format='isot').mjd
-					except:
-						mjd = Time(e.obs_date,format='isot').mjd
-					if np.abs(mjd - pmjd) < hd['mjdmatchmin']:
-						obsExists = True
-						if hd['clobber']:
-							if p['data_quality']:
-								dq = DataQuality.objects.filter(name=p['data_quality'])
-								if not dq:
-									dq = DataQuality.objects.filter(name='Bad')
-								dq = dq[0]
-							else: dq = None
-								
-							e.obs_date = p['obs_date']
-							e.flux = p['flux']
-							e.flux_err = p['flux_err']
-							e.flux_zero_point = p['flux_zero_point']
-							e.mag = p['mag']
-							e.mag_err = p['mag_err']
-							e.forced = p['forced']
-							e.diffim = p['diffim']
-							e.data_quality = dq
-							e.photometry = transientphot
-							e.discovery_point = p['discovery_point']
-							e.band = band
-							e.modified_by_id = user.id
-							e.save()
-
-		if not obsExists:
-			if p['data_quality']:
-				dq = DataQuality.objects.filter(name=p['data_quality'])
-				if not dq:
-					dq = DataQuality.objects.filter(name='Bad')
-				dq = dq[0]
-			else: dq = None
-			TransientPhotData.objects.create(obs_date=p['obs_date'],flux=p['flux'],flux_err=p['flux_err'],
-											 mag=p['mag'],mag_err=p['mag_err'],forced=p['forced'],
-											 diffim=p['diffim'],
-											 data_quality=dq,photometry=transientphot,
-											 flux_zero_point=p['flux_zero_point'],
-											 discovery_point=p['discovery_point'],band=band,
-											 created_by_id=user.id,modified_by_id=user.id)
+	#	TransientPhotData.objects.filter(photometry=transientphot).delete()
+
+	# compare new against existing and write everything in one transaction
+	merge_transient_phot(transientphot, columns, ph['instrument'], user,
+						 mjdmatchmin=hd['mjdmatchmin'], clobber=hd['clobber'], mjd=mjd)
 
 	return_dict = {"message":"success"}
 
 	return JsonResponse(return_dict)
 
+# transients resolved and merged together, in one transaction, by add_transient_phot_batch
+phot_batch_chunk_size = 200
+
+@csrf_exempt
+@login_or_basic_auth_required
+def add_transient_phot_batch(request):
+	"""
+	photometry for many transients and instruments in one POST:
+	{"header":{"clobber":false,"mjdmatchmin":0.01},
+	 "<name>":{"transient":{"name":..,"ra":..,"dec":..,"status":..,"obs_group":..},
+			   "photometry":{"<key>":{"instrument":..,"obs_group":..,"groups":"a,b",
+									  "photdata":{"<key>":<point as in add_transient_phot>,...}},...}},...}
+	the body is read one transient at a time and merged in chunks of
+	phot_batch_chunk_size, so the header has to come first.  unknown transients
+	are created (status is required for those).  returns a result per transient;
+	one that fails doesn't stop the rest.
+
+	or an .npz of columns (see common/phot_columns.py) with a transient column
+	and a header {"header":{..},"transients":{"<name>":{..}},"photheader":{..}}
+	giving the instrument, obs_group and groups of rows that have no instrument
+	or obs_group column
+	"""
+	if request.method != 'POST':
+		return JsonResponse({"message":"POST the photometry to add"},status=405)
+
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
+
+	header,results,chunk = {'clobber':False,'mjdmatchmin':0.01},{},[]
+	if is_columnar_upload(request):
+		try:
+			entries,npz_header = columnar_phot_entries(columnar_upload_data(request))
+		except Exception as e:
+			return JsonResponse({"message":"could not read the photometry: %s"%e},status=400)
+		header.update(npz_header)
+		for i in range(0,len(entries),phot_batch_chunk_size):
+			results.update(merge_phot_chunk(entries[i:i+phot_batch_chunk_size],user,header['clobber'],header['mjdmatchmin']))
+		entries = []
+	else: entries = iter_json_object(request)
+
+	for key,value in entries:
+		if key == 'header':
+			header.update(value)
+			continue
+		chunk += [(value['transient']['name'] if 'name' in value.get('transient',{}) else key,value)]
+		if len(chunk) >= phot_batch_chunk_size:
+			results.update(merge_phot_chunk(chunk,user,header['clobber'],header['mjdmatchmin']))
+			chunk = []
+	if len(chunk):
+		results.update(merge_phot_chunk(chunk,user,header['clobber'],header['mjdmatchmin']))
+
+	return_dict = {"message":"success","n_transients":len(results),
+				   "n_failed":len([r for r in results.values() if r['message'] != 'success']),
+				   "results":results}
+	return JsonResponse(return_dict)
+
+def columnar_phot_entries(data):
+	"""the (name, entry) pairs of add_transient_phot_batch from a columnar .npz upload"""
+	npz_header,columns,mjd = read_phot_npz(data)
+	if 'transient' not in columns: raise ValueError('column transient is required')
+	transients,photheader = npz_header.get('transients',{}),npz_header.get('photheader',{})
+	npoints = len(mjd)
+	instrument = columns['instrument'] if 'instrument' in columns else np.full(npoints,photheader.get('instrument'),dtype=object)
+	obs_group = columns['obs_group'] if 'obs_group' in columns else np.full(npoints,photheader.get('obs_group'),dtype=object)
+
+	# one photometry block per (transient, instrument, obs_group)
+	keys = np.array(['%s\x00%s\x00%s'%k for k in zip(columns['transient'],instrument,obs_group)])
+	unique_keys,inverse = np.unique(keys,return_inverse=True)
+	order = np.argsort(inverse,kind='mergesort')
+	bounds = np.searchsorted(inverse[order],np.arange(len(unique_keys)+1))
+
+	entries = {}
+	for i,key in enumerate(unique_keys):
+		name,inst,group = key.split('\x00')
+		rows = order[bounds[i]:bounds[i+1]]
+		if name not in entries:
+			entries[name] = {'transient':dict(transients.get(name,{}),name=name),'photometry':{}}
+		entries[name]['photometry']['%s_%s'%(inst,group)] = {
+			'instrument':inst,'obs_group':group,'groups':photheader.get('groups'),
+			'columns':take_rows(columns,rows),'mjd':mjd[rows]}
+	return list(entries.items()),npz_header.get('header',{})
+
+def merge_phot_chunk(entries,user,clobber,mjdmatchmin):
+	"""
+	add_transient_phot_batch for a list of (name, entry).  the transients, their
+	TransientPhotometry and the existing points of all of them are each read
+	with one query; each transient is merged in its own savepoint so a bad one
+	rolls back alone
+	"""
+	results = {}
+	transients = {t.name:t for t in Transient.objects.filter(name__in=[name for name,entry in entries])}
+
+	# (name, TransientPhotometry key, photometry dict) for everything that resolved
+	todo = []
+	for name,entry in entries:
+		try:
+			tr,photometry = entry.get('transient',{}),entry['photometry']
+			keys = []
+			for k,phot in photometry.items():
+				instrument_id = get_pk(Instrument,phot['instrument'],'Unknown')
+				obs_group_id = get_pk(ObservationGroup,phot['obs_group'],'Unknown')
+				group_ids = []
+				if phot.get('groups'):
+					for photgroup in phot['groups'].split(','):
+						group_id = get_pk(Group,photgroup)
+						if group_id is None: raise ValueError("group %s is not in DB"%photgroup)
+						group_ids += [group_id]
+				keys += [(instrument_id,obs_group_id,group_ids,phot)]
+
+			if name not in transients:
+				status_id = get_pk(TransientStatus,tr.get('status'))
+				if status_id is None: raise ValueError("status %s is not in DB"%tr.get('status'))
+				obs_group_id = get_pk(ObservationGroup,tr['obs_group'],'Unknown') if 'obs_group' in tr else \
+							   (keys[0][1] if len(keys) else get_pk(ObservationGroup,'Unknown'))
+				transients[name] = Transient.objects.create(
+					name=name,ra=tr['ra'],dec=tr['dec'],status_id=status_id,obs_group_id=obs_group_id,
+					created_by_id=user.id,modified_by_id=user.id)
+			todo += [(name,transients[name].id,keys)]
+		except Exception as e:
+			results[name] = {"message":str(e) if isinstance(e,ValueError) else "%s: %s"%(e.__class__.__name__,e)}
+
+	# the TransientPhotometry for every (transient, instrument, obs group), creating what's missing
+	transient_ids = [t for name,t,keys in todo]
+	def read_containers():
+		return {(tp.transient_id,tp.instrument_id,tp.obs_group_id):tp for tp in
+				TransientPhotometry.objects.filter(transient_id__in=transient_ids).order_by('-id')}
+	containers = read_containers()
+	missing = set((t,i,o) for name,t,keys in todo for i,o,g,p in keys) - set(containers.keys())
+	if len(missing):
+		TransientPhotometry.objects.bulk_create(
+			[TransientPhotometry(transient_id=t,instrument_id=i,obs_group_id=o,
+								 created_by_id=user.id,modified_by_id=user.id) for t,i,o in missing])
+		containers = read_containers()
+
+	Through = TransientPhotometry.groups.through
+	group_pairs = set((containers[(t,i,o)].id,g) for name,t,keys in todo for i,o,groups,p in keys for g in groups)
+	if len(group_pairs):
+		existing_pairs = set(Through.objects.filter(transientphotometry_id__in=[c for c,g in group_pairs]).\
+							 values_list('transientphotometry_id','group_id'))
+		Through.objects.bulk_create([Through(transientphotometry_id=c,group_id=g) for c,g in group_pairs - existing_pairs])
+
+	existing = {}
+	for photometry_id,id,band_id,obs_date in TransientPhotData.objects.filter(
+			photometry_id__in=[tp.id for tp in containers.values()]).values_list('photometry_id','id','band_id','obs_date'):
+		existing.setdefault(photometry_id,[]).append((id,band_id,obs_date))
+
+	with transaction.atomic():
+		merged = set()
+		summary_updates = SummaryUpdates()
+		for name,transient_id,keys in todo:
+			try:
+				n_inserted,n_updated = 0,0
+				# the light curve summaries are written once for the chunk, leaving out anything rolled back
+				transient_updates = SummaryUpdates()
+				with transaction.atomic():
+					for instrument_id,obs_group_id,groups,phot in keys:
+						tp = containers[(transient_id,instrument_id,obs_group_id)]
+						if 'columns' in phot:
+							columns,mjd = phot['columns'],phot['mjd']
+						else:
+							points = phot['photdata'].values() if isinstance(phot['photdata'],dict) else phot['photdata']
+							columns,mjd = points_to_columns(points),None
+						# a second upload to the same TransientPhotometry has to see the first one's points
+						n_ins,n_upd = merge_transient_phot(tp, columns, phot['instrument'], user,
+														   mjdmatchmin=mjdmatchmin, clobber=clobber, mjd=mjd,
+														   existing=None if tp.id in merged else existing.get(tp.id,[]),
+														   summary_updates=transient_updates)
+						merged.add(tp.id)
+						n_inserted += n_ins; n_updated += n_upd
+				summary_updates.extend(transient_updates)
+				results[name] = {"message":"success","inserted":n_inserted,"updated":n_updated}
+			except Exception as e:
+				results[name] = {"message":"%s: %s"%(e.__class__.__name__,e)}
+		summary_updates.apply()
+
+	return results
+
 @csrf_exempt
 @login_or_basic_auth_required
 def add_transient_spec(request):
-	spec_data = JSONParser().parse(request)
 
-	auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-	credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-	username, password = credentials.split(':', 1)
-	user = auth.authenticate(username=username, password=password)
+	# the spectrum is collected straight into columns as the body is read,
+	# see common/json_stream.py
+	spec_data,wavelength,flux,flux_err = {},[],[],[]
+	for key,value in iter_json_object(request):
+		if key in ('header','transient'):
+			spec_data[key] = value
+		else:
+			wavelength += [value['wavelength']]
+			flux += [value['flux']]
+			flux_err += [value['flux_err']]
+
+	# login_or_basic_auth_required has already authenticated the request
+	user = request.user
 	
 	if 'header' in spec_data.keys() and 'transient' in spec_data.keys():
 		hd = spec_data['header']
@@ -684,25 +811,18 @@ def add_transient_spec(request):
 		return JsonResponse(return_dict)
 
 	# get all the foreign keys we need
-	instrument = Instrument.objects.filter(name=hd['instrument'])
-	if not len(instrument):
-		instrument = Instrument.objects.filter(name='Unknown')
-	instrument = instrument[0]
+	instrument_id = get_pk(Instrument,hd['instrument'],'Unknown')
 
-	obs_group = ObservationGroup.objects.filter(name=hd['obs_group'])
-	if not len(obs_group):
-		obs_group = ObservationGroup.objects.filter(name='Unknown')
-	obs_group = obs_group[0]
+	obs_group_id = get_pk(ObservationGroup,hd['obs_group'],'Unknown')
 
 	allgroups = []
 	if hd['groups']:
 		for specgroup in hd['groups'].split(','):
-			group = Group.objects.filter(name=specgroup)
-			if not len(group):
+			group_id = get_pk(Group,specgroup)
+			if group_id is None:
 				return_dict = {"message":"group %s is not in DB"%hd['groups']}
 				return JsonResponse(return_dict)
-			group = group[0]
-			allgroups += [group]
+			allgroups += [group_id]
 
 	# get or create transient
 	transient = Transient.objects.filter(name=tr['name'])
@@ -712,26 +832,28 @@ def add_transient_spec(request):
 	else: transient = transient[0]
 
 	if hd['data_quality']:
-		dq = DataQuality.objects.filter(name=hd['data_quality'])
-		if not dq:
-			dq = DataQuality.objects.filter(name='Bad')
-			dq = dq[0]
-	else: dq = None
+		dq_id = get_pk(DataQuality,hd['data_quality'],'Bad')
+	else: dq_id = None
 
 	
+	content_hash = fingerprint(hd,tr,wavelength,flux,flux_err)
+
 	# get the spectrum
-	transientspec = TransientSpectrum.objects.filter(transient=transient).filter(instrument=instrument).filter(obs_group=obs_group).filter(obs_date=hd['obs_date'])
+	transientspec = TransientSpectrum.objects.filter(transient=transient).filter(instrument_id=instrument_id).filter(obs_group_id=obs_group_id).filter(obs_date=hd['obs_date'])
+	if len(transientspec) and transientspec[0].content_hash == content_hash:
+		return_dict = {"message":"spectrum unchanged"}
+		return JsonResponse(return_dict)
 	if not len(transientspec):
 		transientspec = TransientSpectrum.objects.create(
-			ra=hd['ra'],dec=hd['dec'],instrument=instrument,obs_group=obs_group,transient=transient,
+			ra=hd['ra'],dec=hd['dec'],instrument_id=instrument_id,obs_group_id=obs_group_id,transient=transient,
 			rlap=hd['rlap'],redshift=hd['redshift'],redshift_err=hd['redshift_err'],
 			redshift_quality=hd['redshift_quality'],spectrum_notes=hd['spectrum_notes'],
-			spec_phase=hd['spec_phase'],obs_date=hd['obs_date'],data_quality=dq,
+			spec_phase=hd['spec_phase'],obs_date=hd['obs_date'],data_quality_id=dq_id,
 			created_by_id=user.id,modified_by_id=user.id)
 	else:
 		transientspec = transientspec[0]
 		if hd['clobber']:
-			transientspec.data_quality = dq
+			transientspec.data_quality_id = dq_id
 			transientspec.ra = hd['ra']
 			transientspec.dec = hd['dec']
 			transientspec.rlap = hd['rlap']
@@ -743,27 +865,15 @@ def add_transient_spec(request):
 			transientspec.modified_by_id = user.id
 			transientspec.save()
 	if len(allgroups):
-		for group in allgroups:
-			if group not in transientspec.groups.all():
-				transientspec.groups.add(group)
-				transientspec.save()
+		transientspec.groups.add(*allgroups)
 				
 	# add the spec data
-	existingspec = TransientSpecData.objects.filter(spectrum=transientspec)
-	# loop through new, comp against existing
-	if len(existingspec) and hd['clobber']:
-		for e in existingspec: e.delete()
-	elif len(existingspec):
+	if transientspec.spec_data and not hd['clobber']:
 		return_dict = {"message":"spectrum exists.  Not clobbering"}
 		return JsonResponse(return_dict)
 
-	for k in spec_data.keys():
-		if k == 'header' or k == 'transient': continue
-		s = spec_data[k]
-
-		TransientSpecData.objects.create(spectrum=transientspec,wavelength=s['wavelength'],
-										 flux=s['flux'],flux_err=s['flux_err'],
-										 created_by_id=user.id,modified_by_id=user.id)
+	transientspec.set_spec_data(wavelength,flux,flux_err=flux_err)
+	transientspec.save(content_hash=content_hash)
 	
 	return_dict = {"message":"success"}
 	return JsonResponse(return_dict)
@@ -783,13 +893,9 @@ def get_transient(request, slug):
 
 def find_separation(host_queryset, query_coord, sep_threshold):
 
-	ra,dec = [],[]
-	for host in host_queryset:
-		ra += [host.ra]; dec += [host.dec]
-	host_coords = SkyCoord(ra, dec, unit=(u.deg, u.deg))
-	sep = host_coords.separation(query_coord)
-	for idx in np.where(sep.arcminute <= sep_threshold)[0]:
-		yield host_queryset[int(idx)],sep.arcminute[idx]
+	# sep_threshold and the separations are in arcmin
+	for host,sep in cone_search(host_queryset, query_coord.ra.deg, query_coord.dec.deg, sep_threshold/60.):
+		yield host,sep*60.
 
 @login_or_basic_auth_required		
 def get_host(request, ra, dec, sep):
@@ -811,3 +917,70 @@ def get_host(request, ra, dec, sep):
 				   "host candidates":serialized_hosts }
 
 	return JsonResponse(return_dict)
+
+def read_crossmatch_positions(kind, data, radius):
+	"""
+	ra, dec, radius arrays (deg, deg, arcsec) from a crossmatch upload.  kind is
+	json, csv or npy; radius is the default for positions that don't give one
+	"""
+	if kind == 'json':
+		body = json.loads(data.decode('utf-8'))
+		radius = float(body.get('radius',radius))
+		positions = []
+		for p in body['positions']:
+			if isinstance(p,dict): positions += [(p['ra'],p['dec'],p.get('radius',radius))]
+			else: positions += [tuple(p) if len(p) == 3 else (p[0],p[1],radius)]
+		positions = np.array(positions,dtype=float).reshape(-1,3)
+	elif kind == 'csv':
+		rows = np.atleast_1d(np.genfromtxt(io.StringIO(data.decode('utf-8')),delimiter=',',names=True,dtype=float))
+		positions = np.column_stack([rows['ra'],rows['dec'],
+									 rows['radius'] if 'radius' in rows.dtype.names else np.full(len(rows),radius)])
+	elif kind == 'npy':
+		rows = np.load(io.BytesIO(data),allow_pickle=False)
+		if rows.dtype.names:
+			positions = np.column_stack([rows['ra'],rows['dec'],
+										 rows['radius'] if 'radius' in rows.dtype.names else np.full(len(rows),radius)])
+		else:
+			rows = np.asarray(rows,dtype=float).reshape(len(rows),-1)
+			positions = rows if rows.shape[1] == 3 else np.column_stack([rows[:,:2],np.full(len(rows),radius)])
+	else:
+		raise ValueError('unknown upload type %s'%kind)
+
+	if not np.all(np.isfinite(positions)) or np.any(np.abs(positions[:,1]) > 90) or np.any(positions[:,2] <= 0):
+		raise ValueError('ra/dec must be finite with |dec| <= 90 and radius positive')
+	return positions[:,0],positions[:,1],positions[:,2]
+
+@csrf_exempt
+@login_or_basic_auth_required
+def crossmatch_transients(request):
+	"""
+	which of these positions are already transients?  POST a JSON body
+	{"radius":5,"positions":[[ra,dec],[ra,dec,radius],{"ra":..,"dec":..,"radius":..}]},
+	a CSV with an ra,dec[,radius] header line, or a .npy array of (ra,dec[,radius])
+	rows, either as the body or as a "file" upload.  ra/dec in deg, radius in arcsec
+	(default 5, or ?radius=).  results are in the order of the positions
+	"""
+	if request.method != 'POST':
+		return JsonResponse({"message":"POST the positions to match"},status=405)
+
+	if 'file' in request.FILES:
+		upload = request.FILES['file']
+		kind,data = upload.name.split('.')[-1].lower(),upload.read()
+	else:
+		content_type = request.content_type.lower()
+		if 'csv' in content_type: kind = 'csv'
+		elif 'octet-stream' in content_type or 'npy' in content_type: kind = 'npy'
+		else: kind = 'json'
+		data = request.body
+
+	try:
+		ra,dec,radius = read_crossmatch_positions(kind,data,float(request.GET.get('radius',5)))
+	except Exception as e:
+		return JsonResponse({"message":"could not read the positions: %s"%e},status=400)
+
+	matches = crossmatch(ra,dec,radius/3600.)
+	results = [{"ra":float(r),"dec":float(d),"radius":float(rad),"matches":m}
+			   for r,d,rad,m in zip(ra,dec,radius,matches)]
+	return_dict = {"message":"success","n_positions":len(results),
+				   "n_matched":len([r for r in results if len(r['matches'])]),"results":results}
+	return JsonResponse(return_dict)
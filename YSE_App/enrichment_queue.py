@@ -0,0 +1,136 @@
+import datetime
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Transient, TransientTag, TransientEnrichment
+from .enrichments import get_enrichments
+from .common.fk_resolver import get_pk
+from .common.transient_search import index_transients
+from .common.dashboard_cache import forget_statuses, forget_transients
+from .common.detail_cache import forget_transient_details
+
+class EnrichmentTimeout(Exception):
+	pass
+
+@contextmanager
+def time_limit(seconds):
+	# SIGALRM only works in the main thread; anywhere else the batch just runs to completion
+	if not seconds or threading.current_thread() is not threading.main_thread():
+		yield
+		return
+
+	def timed_out(signum, frame):
+		raise EnrichmentTimeout('timed out after %s s'%seconds)
+	old_handler = signal.signal(signal.SIGALRM, timed_out)
+	signal.setitimer(signal.ITIMER_REAL, seconds)
+	try:
+		yield
+	finally:
+		signal.setitimer(signal.ITIMER_REAL, 0)
+		signal.signal(signal.SIGALRM, old_handler)
+
+def worker_name():
+	return '%s:%i'%(socket.gethostname(),os.getpid())
+
+def claim_batch(enrichment, worker):
+	"""flip up to batch_size due Pending rows of this enrichment to Running and return them"""
+	now = timezone.now()
+	ids = list(TransientEnrichment.objects.filter(enrichment=enrichment.name,status='Pending').\
+			   filter(Q(next_attempt_date__isnull=True) | Q(next_attempt_date__lte=now)).\
+			   order_by('id').values_list('id',flat=True)[:enrichment.batch_size])
+	if not len(ids): return []
+	TransientEnrichment.objects.filter(id__in=ids,status='Pending').update(
+		status='Running',worker=worker,started_date=now,modified_date=now)
+	return list(TransientEnrichment.objects.filter(id__in=ids,status='Running',worker=worker).\
+				select_related('transient'))
+
+def requeue_stale(minutes):
+	# rows left Running by a worker that died
+	cutoff = timezone.now() - datetime.timedelta(minutes=minutes)
+	return TransientEnrichment.objects.filter(status='Running',started_date__lt=cutoff).update(
+		status='Pending',worker=None,modified_date=timezone.now())
+
+def add_tags(tag_names):
+	"""{transient id: [tag names]} -> one bulk insert into the tags M2M table"""
+	Through = Transient.tags.through
+	pairs = set()
+	for transient_id,names in tag_names.items():
+		for name in names:
+			# unknown tags were silently skipped before too
+			tag_id = get_pk(TransientTag,name)
+			if tag_id is not None: pairs.add((transient_id,tag_id))
+	if not len(pairs): return 0
+
+	# an id range rather than a (possibly huge) IN list
+	transient_ids,tag_ids = [p[0] for p in pairs],set(p[1] for p in pairs)
+	existing = set(Through.objects.filter(transient_id__gte=min(transient_ids),transient_id__lte=max(transient_ids),
+										  transienttag_id__in=tag_ids).values_list('transient_id','transienttag_id'))
+	Through.objects.bulk_create([Through(transient_id=t,transienttag_id=tag)
+								 for t,tag in pairs - existing])
+	return len(pairs - existing)
+
+def run_batch(enrichment, rows):
+	transients = [r.transient for r in rows]
+	try:
+		with time_limit(enrichment.timeout):
+			results = enrichment.run(transients)
+	except Exception as e:
+		print('%s batch failed: %s'%(enrichment.name,traceback.format_exc()))
+		results = {t.id:e for t in transients}
+
+	now = timezone.now()
+	done,tag_names = [],{}
+	for row in rows:
+		result = results.get(row.transient_id,RuntimeError('no result returned'))
+		if isinstance(result,Exception):
+			# back off 1x, 2x, 4x ... retry_minutes
+			attempts = row.attempts+1
+			if attempts >= enrichment.max_attempts: status,next_attempt = 'Failed',None
+			else: status,next_attempt = 'Pending',now + datetime.timedelta(
+					minutes=enrichment.retry_minutes*2**(attempts-1))
+			TransientEnrichment.objects.filter(id=row.id).update(
+				status=status,attempts=attempts,next_attempt_date=next_attempt,message=str(result),
+				worker=None,modified_date=now,finished_date=now if status == 'Failed' else None)
+			continue
+
+		tag_names[row.transient_id] = result.tags
+		if result.fields:
+			# update() so the transient's post_save doesn't run again
+			Transient.objects.filter(id=row.transient_id).update(**result.fields)
+		done += [row.id]
+
+	add_tags(tag_names)
+	# neither the update() above nor add_tags sends the signals that keep the
+	# search index, the dashboard and the detail pages current; an update may have moved a
+	# transient out of its old status's table too
+	index_transients(tag_names.keys())
+	forget_statuses([r.transient.status_id for r in rows if r.transient_id in tag_names])
+	forget_transients(tag_names.keys())
+	forget_transient_details(tag_names.keys())
+	TransientEnrichment.objects.filter(id__in=done).update(
+		status='Done',attempts=F('attempts')+1,message=None,worker=None,
+		modified_date=now,finished_date=now)
+	return len(done),len(rows)-len(done)
+
+def work(once=False, poll_seconds=30, stale_minutes=60):
+	"""run batches of every enrichment until nothing is due (once=True) or forever"""
+	worker = worker_name()
+	enrichments = get_enrichments()
+	while True:
+		requeue_stale(stale_minutes)
+		ran = False
+		for name,enrichment in enrichments.items():
+			rows = claim_batch(enrichment,worker)
+			if not len(rows): continue
+			ran = True
+			n_done,n_failed = run_batch(enrichment,rows)
+			print('%s: %s batch of %i, %i done, %i failed'%(worker,name,len(rows),n_done,n_failed))
+		if not ran:
+			if once: return
+			time.sleep(poll_seconds)
@@ -0,0 +1,111 @@
+"""
+enrichments run on every new transient, off the request path.  creating a
+Transient only queues a TransientEnrichment row per enrichment; the worker
+(YSE_App.enrichment_queue, manage.py run_enrichments) claims them in batches
+and hands each batch to the enrichment's run().
+
+to add one, subclass Enrichment and list it in settings.TRANSIENT_ENRICHMENTS
+"""
+import abc
+from django.conf import settings
+from django.utils.module_loading import import_string
+from YSE_App.models import TransientEnrichment
+from YSE_App.common.alert import IsK2Pixel
+from YSE_App.common.tess_obs import tess_obs_batch
+from YSE_App.common.survey_footprint import footprint_tags
+from YSE_App.common.utilities import date_to_mjd
+
+default_enrichments = ['YSE_App.enrichments.TESSEnrichment',
+					   'YSE_App.enrichments.ThacherEnrichment']
+
+class EnrichmentResult(object):
+	"""what an enrichment found for one transient: tags to add and fields to set"""
+	def __init__(self, tags=(), fields=None, message=None):
+		self.tags = list(tags)
+		self.fields = fields or {}
+		self.message = message
+
+def transient_jd(transients):
+	"""JD of discovery (or of the last save, if there is no disc_date) for each transient"""
+	return date_to_mjd([t.disc_date if t.disc_date else t.modified_date for t in transients])+2400000.5
+
+class Enrichment(metaclass=abc.ABCMeta):
+	"""
+	run() gets a list of Transients and returns {transient id: EnrichmentResult}.
+	an Exception in place of a result fails just that transient; raising
+	(or running past timeout seconds) fails the whole batch.  failures are
+	retried after retry_minutes, doubling each time, up to max_attempts
+	"""
+	name = None
+	batch_size = 100
+	timeout = 300
+	max_attempts = 3
+	retry_minutes = 10
+
+	@abc.abstractmethod
+	def run(self, transients):
+		"""{transient id: EnrichmentResult or Exception} for transients"""
+
+class TESSEnrichment(Enrichment):
+	"""tag transients that TESS observed around discovery"""
+	name = 'tess'
+	# the footprint is computed locally, for the whole batch at once
+	batch_size = 5000
+	timeout = 60
+
+	def run(self, transients):
+		if not len(transients): return {}
+		observed = tess_obs_batch([t.ra for t in transients],[t.dec for t in transients],
+								  transient_jd(transients))
+		return {t.id:EnrichmentResult(tags=['TESS'] if obs else []) for t,obs in zip(transients,observed)}
+
+class FootprintEnrichment(Enrichment):
+	"""tag transients inside the fields of every survey in survey_footprint.footprints"""
+	name = 'footprints'
+	batch_size = 5000
+	timeout = 60
+	# tag names to check, None for all of them
+	footprints = None
+
+	def run(self, transients):
+		if not len(transients): return {}
+		inside = footprint_tags([t.ra for t in transients],[t.dec for t in transients],self.footprints)
+		return {t.id:EnrichmentResult(tags=[name for name in inside if inside[name][i]])
+				for i,t in enumerate(transients)}
+
+class ThacherEnrichment(FootprintEnrichment):
+	"""tag transients in the Thacher galaxy fields"""
+	name = 'thacher'
+	footprints = ['Thacher']
+
+class K2Enrichment(Enrichment):
+	"""tag transients on K2 C16/C17/C19 silicon.  not in the default list"""
+	name = 'k2'
+	batch_size = 20
+	campaigns = ('16','17','19')
+
+	def run(self, transients):
+		results = {}
+		for t in transients:
+			results[t.id] = EnrichmentResult()
+			for campaign in self.campaigns:
+				is_k2,msg = IsK2Pixel(t.ra,t.dec,campaign)
+				if is_k2:
+					results[t.id] = EnrichmentResult(tags=['K2 C%s'%campaign],
+													 fields={'k2_validated':True,'k2_msg':msg})
+					break
+		return results
+
+def get_enrichments():
+	"""{name: enrichment} for everything in settings.TRANSIENT_ENRICHMENTS"""
+	enrichments = [import_string(path)() for path in
+				   getattr(settings,'TRANSIENT_ENRICHMENTS',default_enrichments)]
+	return {e.name:e for e in enrichments}
+
+def queue_enrichments(transients, names=None):
+	"""queue every enrichment (or just names) for each of transients, one insert for the lot"""
+	if names is None: names = get_enrichments().keys()
+	TransientEnrichment.objects.bulk_create(
+		[TransientEnrichment(transient_id=t.id,enrichment=name,
+							 created_by_id=t.created_by_id,modified_by_id=t.modified_by_id)
+		 for t in transients for name in names])
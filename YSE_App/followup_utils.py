@@ -0,0 +1,60 @@
+from django.db.models import Q
+from django_tables2 import RequestConfig
+from .models import Telescope, TransientFollowup
+from .table_utils import FollowupTable, FollowupFilter, PageData, page_ids
+from .dashboard_utils import reads_database
+
+# everything a followup table row shows besides the followup itself
+followup_related = ('transient','transient__status','transient__lightcurve_summary','status',
+					'too_resource','classical_resource','queued_resource')
+followup_resources = ('too_resource','classical_resource','queued_resource')
+followup_page_size = 10
+
+def telescope_followups(telescope):
+	"""the followups on any of telescope's resources, newest first"""
+	return TransientFollowup.objects.filter(Q(too_resource__telescope=telescope) |
+											Q(classical_resource__telescope=telescope) |
+											Q(queued_resource__telescope=telescope)).order_by('-id')
+
+def followup_ids():
+	"""{telescope id: [ids of the followups on its resources, newest first]}, in one query"""
+	ids = {}
+	for row in TransientFollowup.objects.filter(Q(too_resource__isnull=False) |
+												Q(classical_resource__isnull=False) |
+												Q(queued_resource__isnull=False)).order_by('-id').\
+		values_list('id',*[r+'__telescope_id' for r in followup_resources]):
+		# a followup with two resources on one telescope is listed once
+		for telescope_id in set(row[1:]) - set([None]):
+			ids.setdefault(telescope_id,[]).append(row[0])
+	return ids
+
+def followup_tables(request):
+	"""
+	[(telescope name, table, anchor, number of followups, filter)] for the
+	followup page.  a table that's sorted or searched queries the database
+	itself.  the rest show a page of followups that, for all the tables
+	together, are read in one query after one more that lists every
+	telescope's followup ids
+	"""
+	telescopes = list(Telescope.objects.all())
+	ids = followup_ids()
+	pages = {t.id:page_ids(request,t.name,ids[t.id],followup_page_size) for t in telescopes
+			 if t.id in ids and not reads_database(request,t.name)}
+	followups = TransientFollowup.objects.select_related(*followup_related).\
+		in_bulk([i for rows,offset in pages.values() for i in rows])
+
+	tables = []
+	for t in telescopes:
+		prefix = t.name
+		count = len(ids.get(t.id,[]))
+		followupfilter = FollowupFilter(request.GET, queryset=telescope_followups(t), prefix=prefix)
+		if not count: data = []
+		elif reads_database(request,prefix): data = followupfilter.qs.select_related(*followup_related)
+		else:
+			rows,offset = pages[t.id]
+			data = PageData([followups[i] for i in rows],count,offset)
+
+		table = FollowupTable(data,prefix=prefix)
+		RequestConfig(request, paginate={'per_page': followup_page_size}).configure(table)
+		tables += [(t.name,table,t.name.replace(' ','_'),count,followupfilter)]
+	return tables
@@ -0,0 +1,94 @@
+import datetime
+import json
+import os
+import socket
+import time
+import traceback
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import IngestJob, IngestJobItem
+from .data_utils import ingest_transients, ingest_gw_candidates, ingest_item_chunk_size
+
+# job kind -> the data_utils function that ingests its payload
+ingest_functions = {'add_transient':ingest_transients,
+					'add_gw_candidate':ingest_gw_candidates}
+
+def worker_name():
+	return '%s:%i'%(socket.gethostname(),os.getpid())
+
+def claim_job(worker):
+	"""flip the oldest Queued job to Running, or return None if there is nothing left to claim"""
+	for job_id in IngestJob.objects.filter(status='Queued').order_by('id').values_list('id',flat=True)[:10]:
+		claimed = IngestJob.objects.filter(id=job_id,status='Queued').update(
+			status='Running',worker=worker,started_date=timezone.now(),modified_date=timezone.now())
+		if claimed: return IngestJob.objects.get(id=job_id)
+	return None
+
+def requeue_stale_jobs(minutes):
+	# a job whose worker died leaves it Running; the worker touches
+	# modified_date after every transient, so a long silence means it's gone.
+	# n_done/n_failed still count the items it finished, which aren't run again
+	cutoff = timezone.now() - datetime.timedelta(minutes=minutes)
+	return IngestJob.objects.filter(status='Running',modified_date__lt=cutoff).update(
+		status='Queued',worker=None,modified_date=timezone.now())
+
+class JobItems:
+	"""
+	(key, transient) for the noupdatestatus and then each transient of job
+	that hasn't been ingested yet, read a chunk of IngestJobItems at a time
+	and decoded one at a time.  position is that of the last one given out
+	"""
+	def __init__(self, job, chunk_size=ingest_item_chunk_size):
+		self.job,self.chunk_size = job,chunk_size
+		self.position = None
+
+	def __iter__(self):
+		if self.job.noupdatestatus is not None: yield 'noupdatestatus',self.job.noupdatestatus
+		position = 0
+		while True:
+			chunk = list(IngestJobItem.objects.filter(ingest_job=self.job,position__gt=position,status=None).\
+						 order_by('position').values_list('position','key','payload')[:self.chunk_size])
+			if not len(chunk): return
+			for position,key,payload in chunk:
+				self.position = position
+				yield key,json.loads(payload)
+
+def run_job(job):
+	items = JobItems(job)
+	def progress(name, error):
+		# the ingest functions report each transient before they read the next
+		with transaction.atomic():
+			IngestJobItem.objects.filter(ingest_job=job,position=items.position).update(
+				name=name,status='success' if error is None else 'failed',message=error)
+			IngestJob.objects.filter(id=job.id).update(
+				n_done=F('n_done')+1,n_failed=F('n_failed')+int(error is not None),
+				modified_date=timezone.now())
+
+	try:
+		ingest = ingest_functions[job.kind]
+		ingest(items,job.created_by,progress=progress,ingest_job=job)
+		status,error = 'Done',None
+	except Exception as e:
+		status,error = 'Failed',traceback.format_exc()
+
+	IngestJob.objects.filter(id=job.id).update(
+		status=status,error=error,finished_date=timezone.now(),modified_date=timezone.now())
+	job.refresh_from_db()
+	return job
+
+def work(once=False, poll_seconds=5, stale_minutes=60):
+	"""claim and run jobs until there are none left (once=True) or forever"""
+	worker = worker_name()
+	while True:
+		requeue_stale_jobs(stale_minutes)
+		job = claim_job(worker)
+		if job is None:
+			if once: return
+			time.sleep(poll_seconds)
+			continue
+
+		print('%s: running %s'%(worker,job))
+		job = run_job(job)
+		print('%s: %s finished, %i/%i done, %i failed'%(
+			worker,job,job.n_done,job.n_items,job.n_failed))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from YSE_App.models import Transient
+from YSE_App.common.tess_obs import tess_obs_batch
+from YSE_App.common.utilities import date_to_mjd
+from YSE_App.enrichment_queue import add_tags
+
+class Command(BaseCommand):
+	help = 'Tag every transient TESS observed around discovery, from the local sector footprint'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--chunk-size', type=int, default=50000,
+							help='transients read and tagged per batch')
+		parser.add_argument('--dry-run', action='store_true', default=False,
+							help='count the matches without adding any tags')
+
+	def handle(self, *args, **options):
+		rows = Transient.objects.order_by('id').values_list('id','ra','dec','disc_date','modified_date')
+		n_checked,n_observed,n_tagged = 0,0,0
+		last_id = 0
+		while True:
+			chunk = list(rows.filter(id__gt=last_id)[:options['chunk_size']])
+			if not len(chunk): break
+			last_id = chunk[-1][0]
+
+			ids,ra,dec,disc_date,modified_date = zip(*chunk)
+			jd = date_to_mjd([d if d else m for d,m in zip(disc_date,modified_date)])+2400000.5
+			observed = tess_obs_batch(ra,dec,jd)
+			n_checked += len(chunk)
+			n_observed += int(observed.sum())
+			if not options['dry_run']:
+				n_tagged += add_tags({id:['TESS'] for id,obs in zip(ids,observed) if obs})
+
+		print('%i transients checked, %i observed by TESS, %i newly tagged'%(n_checked,n_observed,n_tagged))
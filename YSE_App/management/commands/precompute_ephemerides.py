@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from YSE_App.models import Telescope
+from YSE_App.common.ephemeris import precompute_ephemerides, night_date
+
+class Command(BaseCommand):
+	help = 'Store the sun and moon ephemerides of every telescope\'s nights for the months ahead'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--months', type=int, default=3,
+							help='months ahead to store, from --start')
+		parser.add_argument('--start', default=None,
+							help='first night, YYYY-MM-DD (default: today)')
+		parser.add_argument('--telescope', action='append', default=None,
+							help='name of a telescope to store, can be repeated (default: all)')
+
+	def handle(self, *args, **options):
+		telescopes = Telescope.objects.order_by('id')
+		if options['telescope']: telescopes = telescopes.filter(name__in=options['telescope'])
+		start = night_date(options['start']) if options['start'] else None
+		n_nights = precompute_ephemerides(telescopes,start=start,ndays=options['months']*31)
+		print('%i site nights stored'%n_nights)
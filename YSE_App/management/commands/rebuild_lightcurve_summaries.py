@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from YSE_App.models import Transient
+from YSE_App.common.lightcurve_summary import rebuild_summaries
+
+class Command(BaseCommand):
+	help = 'Recompute every transient\'s light curve summary (latest/discovery/peak mag) from its photometry'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--chunk-size', type=int, default=2000,
+							help='transients recomputed per transaction')
+		parser.add_argument('--transient', action='append', default=None,
+							help='name of a transient to recompute, can be repeated (default: all)')
+
+	def handle(self, *args, **options):
+		rows = Transient.objects.order_by('id').values_list('id',flat=True)
+		if options['transient']: rows = rows.filter(name__in=options['transient'])
+		n_summaries,last_id = 0,0
+		while True:
+			ids = list(rows.filter(id__gt=last_id)[:options['chunk_size']])
+			if not len(ids): break
+			last_id = ids[-1]
+			with transaction.atomic():
+				n_summaries += rebuild_summaries(ids)
+
+		print('%i light curve summaries rebuilt'%n_summaries)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from YSE_App.models import Transient
+from YSE_App.common.transient_search import index_transients
+
+class Command(BaseCommand):
+	help = 'Bring the search box index of every transient up to date, e.g. after renaming a status or class'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--chunk-size', type=int, default=2000,
+							help='transients indexed per transaction')
+
+	def handle(self, *args, **options):
+		rows = Transient.objects.order_by('id').values_list('id',flat=True)
+		n_checked,n_indexed,last_id = 0,0,0
+		while True:
+			ids = list(rows.filter(id__gt=last_id)[:options['chunk_size']])
+			if not len(ids): break
+			last_id = ids[-1]
+			with transaction.atomic():
+				n_indexed += index_transients(ids)
+			n_checked += len(ids)
+
+		print('%i transients checked, %i reindexed'%(n_checked,n_indexed))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from YSE_App.common.user_query_cache import refresh_due_results, user_query_time_limit
+
+class Command(BaseCommand):
+	help = 'Rerun the personal dashboard queries that are due, as the cron job does'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--all', action='store_true', default=False,
+							help='rerun every dashboard query, due or not')
+		parser.add_argument('--time-limit', type=float, default=user_query_time_limit,
+							help='seconds a query may run before it is cut off')
+
+	def handle(self, *args, **options):
+		n_refreshed = refresh_due_results(max_age=0 if options['all'] else None,
+										  time_limit=options['time_limit'])
+		print('refreshed %i dashboard queries'%n_refreshed)
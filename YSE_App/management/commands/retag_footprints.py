@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from YSE_App.models import Transient, TransientTag
+from YSE_App.common.survey_footprint import footprints, footprint_tags
+from YSE_App.enrichment_queue import add_tags
+
+class Command(BaseCommand):
+	help = 'Re-tag every transient with the survey footprints (Thacher, ...) it falls in'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--footprint', action='append', default=None,
+							help='tag name of a footprint to check, can be repeated (default: all)')
+		parser.add_argument('--remove', action='store_true', default=False,
+							help='also remove the tag from transients outside the footprint')
+		parser.add_argument('--chunk-size', type=int, default=50000,
+							help='transients read and tagged per batch')
+
+	def handle(self, *args, **options):
+		names = options['footprint'] or list(footprints.keys())
+		for name in names:
+			if name not in footprints:
+				raise CommandError('no footprint %s, choose from %s'%(name,', '.join(footprints.keys())))
+		Through = Transient.tags.through
+		tag_ids = dict(TransientTag.objects.filter(name__in=names).values_list('name','id'))
+
+		rows = Transient.objects.order_by('id').values_list('id','ra','dec')
+		n_tagged,n_removed,last_id = 0,0,0
+		while True:
+			chunk = list(rows.filter(id__gt=last_id)[:options['chunk_size']])
+			if not len(chunk): break
+			last_id = chunk[-1][0]
+
+			ids,ra,dec = zip(*chunk)
+			inside = footprint_tags(ra,dec,names)
+			tag_names = {}
+			for name in names:
+				for id in [id for id,i in zip(ids,inside[name]) if i]:
+					tag_names.setdefault(id,[]).append(name)
+				if options['remove'] and name in tag_ids:
+					# few transients are inside, so exclude those rather than listing the rest
+					n_removed += Through.objects.filter(transienttag_id=tag_ids[name],transient_id__gte=ids[0],transient_id__lte=ids[-1]).\
+								 exclude(transient_id__in=[id for id,i in zip(ids,inside[name]) if i]).delete()[0]
+			n_tagged += add_tags(tag_names)
+
+		print('%i tags added, %i removed'%(n_tagged,n_removed))
@@ -0,0 +1,33 @@
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from YSE_App import ingest_queue
+
+def _work(once, poll_seconds, stale_minutes):
+	ingest_queue.work(once=once, poll_seconds=poll_seconds, stale_minutes=stale_minutes)
+
+class Command(BaseCommand):
+	help = 'Drain the add_transient/add_gw_candidate ingest job queue'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--processes', type=int, default=1,
+							help='number of worker processes')
+		parser.add_argument('--once', action='store_true', default=False,
+							help='exit once the queue is empty instead of polling')
+		parser.add_argument('--poll-seconds', type=float, default=5,
+							help='how long an idle worker waits before checking the queue again')
+		parser.add_argument('--stale-minutes', type=float, default=60,
+							help='requeue Running jobs that have made no progress for this long')
+
+	def handle(self, *args, **options):
+		args = (options['once'], options['poll_seconds'], options['stale_minutes'])
+		if options['processes'] <= 1:
+			_work(*args)
+			return
+
+		# forked children must not share the parent's database connection
+		connections.close_all()
+		workers = [multiprocessing.Process(target=_work, args=args)
+				   for i in range(options['processes'])]
+		for w in workers: w.start()
+		for w in workers: w.join()
@@ -0,0 +1,65 @@
+# Generated by Django 2.0.4 on 2019-10-01 18:12
+
+import numpy as np
+from django.db import migrations, models
+
+# frozen copy of YSE_App.common.spec_data.spec_dtype
+spec_dtype = np.dtype([('wavelength','<f8'),('flux','<f8'),
+					   ('wavelength_err','<f8'),('flux_err','<f8')])
+
+def _float(x):
+	if x is None: return np.nan
+	return x
+
+def pack_spec_data(apps, spectrum_model, specdata_model):
+	Spectrum = apps.get_model('YSE_App', spectrum_model)
+	SpecData = apps.get_model('YSE_App', specdata_model)
+	for spectrum_id in SpecData.objects.values_list('spectrum_id',flat=True).distinct():
+		rows = SpecData.objects.filter(spectrum_id=spectrum_id).order_by('wavelength','id').\
+			   values_list('wavelength','flux','wavelength_err','flux_err')
+		spec = np.array([tuple(_float(x) for x in r) for r in rows],dtype=spec_dtype)
+		Spectrum.objects.filter(id=spectrum_id).update(spec_data=spec.tobytes())
+		SpecData.objects.filter(spectrum_id=spectrum_id).delete()
+
+def unpack_spec_data(apps, spectrum_model, specdata_model):
+	Spectrum = apps.get_model('YSE_App', spectrum_model)
+	SpecData = apps.get_model('YSE_App', specdata_model)
+	for spectrum in Spectrum.objects.filter(spec_data__isnull=False).iterator():
+		spec = np.frombuffer(spectrum.spec_data,dtype=spec_dtype)
+		SpecData.objects.bulk_create(
+			[SpecData(spectrum_id=spectrum.id,wavelength=s['wavelength'],flux=s['flux'],
+					  wavelength_err=None if np.isnan(s['wavelength_err']) else s['wavelength_err'],
+					  flux_err=None if np.isnan(s['flux_err']) else s['flux_err'],
+					  created_by_id=spectrum.created_by_id,modified_by_id=spectrum.modified_by_id)
+			 for s in spec],batch_size=1000)
+
+def migrate_data_forward(apps, schema_editor):
+	pack_spec_data(apps, 'TransientSpectrum', 'TransientSpecData')
+	pack_spec_data(apps, 'HostSpectrum', 'HostSpecData')
+
+def migrate_data_backward(apps, schema_editor):
+	unpack_spec_data(apps, 'TransientSpectrum', 'TransientSpecData')
+	unpack_spec_data(apps, 'HostSpectrum', 'HostSpecData')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('YSE_App', '0033_auto_20190925_2043'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostspectrum',
+            name='spec_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transientspectrum',
+            name='spec_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+		migrations.RunPython(
+			migrate_data_forward,
+			migrate_data_backward,
+			),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.0.4 on 2019-10-03 21:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0034_spectrum_spec_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(max_length=64)),
+                ('payload', models.TextField()),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], db_index=True, default='Queued', max_length=16)),
+                ('n_items', models.IntegerField(default=0)),
+                ('n_done', models.IntegerField(default=0)),
+                ('n_failed', models.IntegerField(default=0)),
+                ('results', models.TextField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=128, null=True)),
+                ('started_date', models.DateTimeField(blank=True, null=True)),
+                ('finished_date', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestjob_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestjob_modified_by', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.0.4 on 2019-10-03 14:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0035_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestFailure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('run_id', models.CharField(db_index=True, max_length=64)),
+                ('transient_name', models.CharField(max_length=128)),
+                ('message', models.TextField()),
+                ('notified', models.BooleanField(db_index=True, default=False)),
+                ('field', models.CharField(blank=True, max_length=64, null=True)),
+                ('value', models.TextField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestfailure_created_by', to=settings.AUTH_USER_MODEL)),
+                ('ingest_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='YSE_App.IngestJob')),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestfailure_modified_by', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
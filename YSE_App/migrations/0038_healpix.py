@@ -0,0 +1,43 @@
+# Generated by Django 2.0.4 on 2019-10-07 16:40
+
+import healpy as hp
+import numpy as np
+from django.db import migrations, models
+
+# frozen copy of YSE_App.common.cone_search.healpix_order
+healpix_nside = 2**16
+
+def fill_healpix(apps, model_name):
+	Model = apps.get_model('YSE_App', model_name)
+	rows = np.array(list(Model.objects.values_list('id','ra','dec')),dtype=float).reshape(-1,3)
+	good = np.isfinite(rows[:,1]) & np.isfinite(rows[:,2]) & (np.abs(rows[:,2]) <= 90)
+	pix = hp.ang2pix(healpix_nside, rows[good,1], rows[good,2], nest=True, lonlat=True)
+	for id,p in zip(rows[good,0],pix):
+		Model.objects.filter(id=int(id)).update(healpix=int(p))
+
+def migrate_data_forward(apps, schema_editor):
+	fill_healpix(apps, 'Transient')
+	fill_healpix(apps, 'Host')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('YSE_App', '0037_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='host',
+            name='healpix',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transient',
+            name='healpix',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+		migrations.RunPython(
+			migrate_data_forward,
+			migrations.RunPython.noop,
+			),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.0.4 on 2019-10-08 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0038_healpix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransientEnrichment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('enrichment', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], db_index=True, default='Pending', max_length=16)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_date', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=128, null=True)),
+                ('started_date', models.DateTimeField(blank=True, null=True)),
+                ('finished_date', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientenrichment_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientenrichment_modified_by', to=settings.AUTH_USER_MODEL)),
+                ('transient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='YSE_App.Transient')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='transientenrichment',
+            unique_together={('transient', 'enrichment')},
+        ),
+    ]
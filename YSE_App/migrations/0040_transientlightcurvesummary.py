@@ -0,0 +1,38 @@
+# Generated by Django 2.0.4 on 2019-10-09 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0039_transientenrichment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransientLightCurveSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('n_detections', models.IntegerField(default=0)),
+                ('recent_mag', models.FloatField(blank=True, db_index=True, null=True)),
+                ('recent_magdate', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('disc_mag', models.FloatField(blank=True, null=True)),
+                ('disc_magdate', models.DateTimeField(blank=True, null=True)),
+                ('peak_mag', models.FloatField(blank=True, null=True)),
+                ('peak_magdate', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientlightcurvesummary_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientlightcurvesummary_modified_by', to=settings.AUTH_USER_MODEL)),
+                ('recent_mag_band', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='YSE_App.PhotometricBand')),
+                ('transient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lightcurve_summary', to='YSE_App.Transient')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.0.4 on 2019-10-11 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0040_transientlightcurvesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransientSearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('text', models.TextField(blank=True, default='')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientsearchdocument_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transientsearchdocument_modified_by', to=settings.AUTH_USER_MODEL)),
+                ('transient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='YSE_App.Transient')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TransientSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=16)),
+                ('term', models.CharField(db_index=True, max_length=64)),
+                ('transient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='YSE_App.Transient')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='transientsearchterm',
+            index_together={('field', 'term')},
+        ),
+    ]
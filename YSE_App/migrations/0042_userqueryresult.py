@@ -0,0 +1,39 @@
+# Generated by Django 2.0.4 on 2019-10-14 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('explorer', '0007_querylog_connection'),
+        ('YSE_App', '0041_transientsearch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserQueryResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], db_index=True, default='Pending', max_length=16)),
+                ('n_rows', models.IntegerField(default=0)),
+                ('fingerprint', models.CharField(blank=True, max_length=64, null=True)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('started_date', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_date', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='userqueryresult_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='userqueryresult_modified_by', to=settings.AUTH_USER_MODEL)),
+                ('query', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_result', to='explorer.Query')),
+                ('transients', models.ManyToManyField(blank=True, related_name='dashboard_query_results', to='YSE_App.Transient')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.0.4 on 2019-10-15 10:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0042_userqueryresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteNightEphemeris',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField(db_index=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('elevation', models.FloatField()),
+                ('moon_illumination', models.FloatField()),
+                ('moon_ra', models.FloatField()),
+                ('moon_dec', models.FloatField()),
+                ('sun_evening', models.DateTimeField(blank=True, null=True)),
+                ('sun_morning', models.DateTimeField(blank=True, null=True)),
+                ('civil_evening', models.DateTimeField(blank=True, null=True)),
+                ('civil_morning', models.DateTimeField(blank=True, null=True)),
+                ('nautical_evening', models.DateTimeField(blank=True, null=True)),
+                ('nautical_morning', models.DateTimeField(blank=True, null=True)),
+                ('astronomical_evening', models.DateTimeField(blank=True, null=True)),
+                ('astronomical_morning', models.DateTimeField(blank=True, null=True)),
+                ('night_start', models.DateTimeField(blank=True, null=True)),
+                ('night_end', models.DateTimeField(blank=True, null=True)),
+                ('moonrise', models.DateTimeField(blank=True, null=True)),
+                ('moonset', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sitenightephemeris_created_by', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sitenightephemeris_modified_by', to=settings.AUTH_USER_MODEL)),
+                ('telescope', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='YSE_App.Telescope')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='sitenightephemeris',
+            unique_together={('telescope', 'date')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.0.4 on 2019-10-16 09:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('YSE_App', '0043_sitenightephemeris'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='hostspecdata',
+            name='created_by',
+        ),
+        migrations.RemoveField(
+            model_name='hostspecdata',
+            name='modified_by',
+        ),
+        migrations.RemoveField(
+            model_name='hostspecdata',
+            name='spectrum',
+        ),
+        migrations.RemoveField(
+            model_name='transientspecdata',
+            name='created_by',
+        ),
+        migrations.RemoveField(
+            model_name='transientspecdata',
+            name='modified_by',
+        ),
+        migrations.RemoveField(
+            model_name='transientspecdata',
+            name='spectrum',
+        ),
+        migrations.DeleteModel(
+            name='HostSpecData',
+        ),
+        migrations.DeleteModel(
+            name='TransientSpecData',
+        ),
+    ]
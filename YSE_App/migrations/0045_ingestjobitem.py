@@ -0,0 +1,77 @@
+# Generated by Django 2.0.4 on 2019-10-16 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+
+def split_payloads(apps, schema_editor):
+	IngestJob = apps.get_model('YSE_App', 'IngestJob')
+	IngestJobItem = apps.get_model('YSE_App', 'IngestJobItem')
+	for job_id in IngestJob.objects.values_list('id',flat=True):
+		job = IngestJob.objects.get(id=job_id)
+		items,position = [],0
+		for key,transient in json.loads(job.payload).items():
+			if key == 'noupdatestatus':
+				IngestJob.objects.filter(id=job.id).update(noupdatestatus=bool(transient))
+				continue
+			position += 1
+			items += [IngestJobItem(ingest_job_id=job.id,position=position,key=key,payload=json.dumps(transient),
+									created_by_id=job.created_by_id,modified_by_id=job.modified_by_id)]
+		IngestJobItem.objects.bulk_create(items,batch_size=100)
+
+def join_payloads(apps, schema_editor):
+	IngestJob = apps.get_model('YSE_App', 'IngestJob')
+	IngestJobItem = apps.get_model('YSE_App', 'IngestJobItem')
+	for job in IngestJob.objects.all():
+		items = ['%s:%s'%(json.dumps(key),payload) for key,payload in
+				 IngestJobItem.objects.filter(ingest_job_id=job.id).order_by('position').values_list('key','payload')]
+		if job.noupdatestatus is not None: items = ['"noupdatestatus":%s'%json.dumps(job.noupdatestatus)] + items
+		IngestJob.objects.filter(id=job.id).update(payload='{%s}'%','.join(items))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('YSE_App', '0044_remove_specdata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJobItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+                ('position', models.IntegerField()),
+                ('key', models.TextField()),
+                ('payload', models.TextField()),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestjobitem_created_by', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='noupdatestatus',
+            field=models.NullBooleanField(),
+        ),
+        migrations.AddField(
+            model_name='ingestjobitem',
+            name='ingest_job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='YSE_App.IngestJob'),
+        ),
+        migrations.AddField(
+            model_name='ingestjobitem',
+            name='modified_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestjobitem_modified_by', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingestjobitem',
+            unique_together={('ingest_job', 'position')},
+        ),
+        migrations.RunPython(split_payloads, join_payloads),
+        migrations.RemoveField(
+            model_name='ingestjob',
+            name='payload',
+        ),
+    ]
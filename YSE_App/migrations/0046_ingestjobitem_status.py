@@ -0,0 +1,32 @@
+# Generated by Django 2.0.4 on 2019-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('YSE_App', '0045_ingestjobitem'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ingestjob',
+            name='results',
+        ),
+        migrations.AddField(
+            model_name='ingestjobitem',
+            name='message',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingestjobitem',
+            name='name',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingestjobitem',
+            name='status',
+            field=models.CharField(blank=True, choices=[('success', 'success'), ('failed', 'failed')], max_length=16, null=True),
+        ),
+    ]
@@ -18,3 +18,8 @@ from YSE_App.models.telescope_resource_models import *
 from YSE_App.models.transient_models import *
 from YSE_App.models.tag_models import *
 from YSE_App.models.gw_models import *
+from YSE_App.models.ingest_models import *
+from YSE_App.models.enrichment_models import *
+from YSE_App.models.lightcurve_models import *
+from YSE_App.models.search_models import *
+from YSE_App.models.ephemeris_models import *
@@ -0,0 +1,37 @@
+from django.db import models
+from YSE_App.models.base import *
+from YSE_App.models.transient_models import *
+
+class TransientEnrichment(BaseModel):
+	"""
+	one enrichment (TESS, Thacher, K2, ...) still to be run, or already run, on
+	one transient.  a row per enrichment is queued when the transient is
+	created and the enrichment worker works through them in batches,
+	see YSE_App.enrichments and YSE_App.enrichment_queue
+	"""
+	STATUS_CHOICES = (('Pending','Pending'),('Running','Running'),
+					  ('Done','Done'),('Failed','Failed'))
+
+	class Meta:
+		unique_together = ('transient','enrichment')
+
+	### Entity relationships ###
+	# Required
+	transient = models.ForeignKey(Transient, on_delete=models.CASCADE)
+
+	### Properties ###
+	# Required
+	enrichment = models.CharField(max_length=64, db_index=True)
+	status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='Pending', db_index=True)
+	attempts = models.IntegerField(default=0)
+
+	# Optional
+	# a failed attempt is retried no earlier than this
+	next_attempt_date = models.DateTimeField(null=True, blank=True, db_index=True)
+	message = models.TextField(null=True, blank=True)
+	worker = models.CharField(max_length=128, null=True, blank=True)
+	started_date = models.DateTimeField(null=True, blank=True)
+	finished_date = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s: %s (%s)' % (self.transient.name, self.enrichment, self.status)
@@ -0,0 +1,52 @@
+from django.db import models
+from YSE_App.models.base import *
+from YSE_App.models.telescope_models import *
+
+class SiteNightEphemeris(BaseModel):
+	"""
+	the sun and moon at a telescope's site for one observing night: sunset,
+	sunrise, the twilights, the dark night and the moon's rise, set,
+	illumination and position.  as on the observing night pages, the times
+	are the last before 0h UT on date.  rows are added the first time a
+	night is asked about or ahead of time by manage.py precompute_ephemerides,
+	see YSE_App/common/ephemeris.py
+	"""
+	class Meta:
+		unique_together = ('telescope','date')
+
+	### Entity relationships ###
+	# Required
+	telescope = models.ForeignKey(Telescope, on_delete=models.CASCADE)
+
+	### Properties ###
+	# Required
+	date = models.DateField(db_index=True)
+	# where the telescope was when this was worked out
+	latitude = models.FloatField()
+	longitude = models.FloatField()
+	elevation = models.FloatField()
+	moon_illumination = models.FloatField()
+	moon_ra = models.FloatField()
+	moon_dec = models.FloatField()
+
+	# Optional
+	# None at sites where the sun or the moon didn't rise or set that day
+	sun_evening = models.DateTimeField(null=True, blank=True)
+	sun_morning = models.DateTimeField(null=True, blank=True)
+	civil_evening = models.DateTimeField(null=True, blank=True)
+	civil_morning = models.DateTimeField(null=True, blank=True)
+	nautical_evening = models.DateTimeField(null=True, blank=True)
+	nautical_morning = models.DateTimeField(null=True, blank=True)
+	astronomical_evening = models.DateTimeField(null=True, blank=True)
+	astronomical_morning = models.DateTimeField(null=True, blank=True)
+	night_start = models.DateTimeField(null=True, blank=True)
+	night_end = models.DateTimeField(null=True, blank=True)
+	moonrise = models.DateTimeField(null=True, blank=True)
+	moonset = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s: %s' % (self.telescope.name, self.date)
+
+	def same_site(self, telescope):
+		return (self.latitude,self.longitude,self.elevation) == \
+			(telescope.latitude,telescope.longitude,telescope.elevation)
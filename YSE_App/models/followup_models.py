@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.telescope_resource_models import *
@@ -63,3 +64,9 @@ class HostFollowup(Followup):
 
 	def __str__(self):
 		return "Host Followup: [%s]; Valid: %s to %s" % (self.host.HostString(), self.valid_start.strftime('%m/%d/%Y'), self.valid_stop.strftime('%m/%d/%Y'))
+
+@receiver(models.signals.post_save, sender=TransientFollowup)
+@receiver(models.signals.post_delete, sender=TransientFollowup)
+def forget_followup_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details([instance.transient_id])
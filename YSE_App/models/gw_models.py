@@ -38,3 +38,21 @@ class GWCandidateImage(BaseModel):
 	image_filename = models.CharField(max_length=256)
 	image_filter = models.ForeignKey(PhotometricBand, on_delete=models.CASCADE)
 	dophot_class = models.IntegerField(null=True, blank=True)
+
+def gw_candidate_transient_ids(gw_candidate):
+	"""the transients whose detail page shows gw_candidate: its own, and any of the same name"""
+	return set([gw_candidate.transient_id]) | \
+		set(Transient.objects.filter(name=gw_candidate.name).values_list('id',flat=True))
+
+@receiver(models.signals.post_save, sender=GWCandidate)
+@receiver(models.signals.post_delete, sender=GWCandidate)
+def forget_gw_candidate_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details(gw_candidate_transient_ids(instance))
+
+@receiver(models.signals.post_save, sender=GWCandidateImage)
+@receiver(models.signals.post_delete, sender=GWCandidateImage)
+def forget_gw_image_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	gw_candidate = GWCandidate.objects.filter(id=instance.gw_candidate_id).first()
+	if gw_candidate is not None: forget_transient_details(gw_candidate_transient_ids(gw_candidate))
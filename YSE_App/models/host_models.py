@@ -3,6 +3,7 @@ from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.photometric_band_models import *
 from YSE_App.common.utilities import *
+from YSE_App.common.cone_search import healpix_or_none
 
 class HostSED(BaseModel):
 	### Entity relationships ###
@@ -65,6 +66,12 @@ class Host(BaseModel):
 	photo_z_err = models.FloatField(null=True, blank=True)
 	photo_z_source = models.CharField(max_length=64, null=True, blank=True)
 	transient_host_rank = models.IntegerField(null=True, blank=True)
+	# nested HEALPix pixel of ra/dec for cone searches, see YSE_App.common.cone_search
+	healpix = models.BigIntegerField(null=True, blank=True, db_index=True)
+
+	def save(self, *args, **kwargs):
+		self.healpix = healpix_or_none(self.ra, self.dec)
+		super(Host, self).save(*args, **kwargs)
 
 	def HostString(self):
 		ra_str, dec_str = GetSexigesimalString(self.ra, self.dec)
@@ -0,0 +1,87 @@
+from django.db import models
+from YSE_App.models.base import *
+
+class IngestJob(BaseModel):
+	"""
+	an add_transient/add_gw_candidate upload waiting to be (or being) ingested.
+	the table is the queue: workers claim the oldest Queued job by flipping
+	it to Running, see YSE_App.ingest_queue
+	"""
+	STATUS_CHOICES = (('Queued','Queued'),('Running','Running'),
+					  ('Done','Done'),('Failed','Failed'))
+
+	### Properties ###
+	# Required
+	kind = models.CharField(max_length=64)
+	status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='Queued', db_index=True)
+	n_items = models.IntegerField(default=0)
+	n_done = models.IntegerField(default=0)
+	n_failed = models.IntegerField(default=0)
+
+	# Optional
+	# the upload's noupdatestatus, if it had one; its transients are IngestJobItems
+	noupdatestatus = models.NullBooleanField(blank=True)
+	error = models.TextField(null=True, blank=True)
+	worker = models.CharField(max_length=128, null=True, blank=True)
+	started_date = models.DateTimeField(null=True, blank=True)
+	finished_date = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self):
+		return 'IngestJob %s: %s (%s)' % (self.id, self.kind, self.status)
+
+class IngestJobItem(BaseModel):
+	"""
+	one transient of an IngestJob's upload, stored as its own row so the
+	upload is never held in memory whole, neither when it's queued nor when
+	the worker reads it back a chunk at a time.  the worker marks each one
+	as it goes, so a job it didn't finish is picked up where it stopped
+	"""
+	STATUS_CHOICES = (('success','success'),('failed','failed'))
+
+	class Meta:
+		unique_together = ('ingest_job','position')
+
+	### Entity relationships ###
+	# Required
+	ingest_job = models.ForeignKey(IngestJob, on_delete=models.CASCADE)
+
+	### Properties ###
+	# Required
+	# the order of the transient in the upload, from 1
+	position = models.IntegerField()
+	key = models.TextField()
+	# the transient's JSON
+	payload = models.TextField()
+
+	# Optional
+	# filled in once the worker has ingested the transient
+	name = models.CharField(max_length=64, null=True, blank=True)
+	status = models.CharField(max_length=16, choices=STATUS_CHOICES, null=True, blank=True)
+	message = models.TextField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s: %s' % (self.ingest_job, self.key)
+
+class IngestFailure(BaseModel):
+	"""
+	one problem found while ingesting an upload.  failures are written in bulk
+	at the end of a run and mailed to the uploader as a single digest later,
+	see YSE_App.common.ingest_errors
+	"""
+	### Entity relationships ###
+	# Optional
+	ingest_job = models.ForeignKey(IngestJob, null=True, blank=True, on_delete=models.SET_NULL)
+
+	### Properties ###
+	# Required
+	run_id = models.CharField(max_length=64, db_index=True)
+	transient_name = models.CharField(max_length=128)
+	message = models.TextField()
+	notified = models.BooleanField(default=False, db_index=True)
+
+	# Optional
+	field = models.CharField(max_length=64, null=True, blank=True)
+	value = models.TextField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s: %s' % (self.transient_name, self.message)
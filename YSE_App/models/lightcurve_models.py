@@ -0,0 +1,58 @@
+from django.db import models
+from YSE_App.models.base import *
+from YSE_App.models.photometric_band_models import *
+from YSE_App.models.transient_models import *
+from YSE_App.models.phot_models import *
+from django.dispatch import receiver
+
+class TransientLightCurveSummary(BaseModel):
+	"""
+	the latest, discovery and peak magnitudes of a transient's detections
+	(points with a mag and no data quality flag), kept up to date as photometry
+	comes in so the tables can show and sort by them through a join instead of
+	a few queries per row.  see YSE_App/common/lightcurve_summary.py;
+	manage.py rebuild_lightcurve_summaries recomputes them from scratch
+	"""
+	### Entity relationships ###
+	# Required
+	transient = models.OneToOneField(Transient, related_name='lightcurve_summary', on_delete=models.CASCADE)
+
+	# Optional
+	recent_mag_band = models.ForeignKey(PhotometricBand, null=True, blank=True, on_delete=models.SET_NULL)
+
+	### Properties ###
+	# Required
+	n_detections = models.IntegerField(default=0)
+
+	# Optional
+	recent_mag = models.FloatField(null=True, blank=True, db_index=True)
+	recent_magdate = models.DateTimeField(null=True, blank=True, db_index=True)
+	disc_mag = models.FloatField(null=True, blank=True)
+	disc_magdate = models.DateTimeField(null=True, blank=True)
+	peak_mag = models.FloatField(null=True, blank=True)
+	peak_magdate = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s: %s' % (self.transient.name, self.recent_mag)
+
+# ingestion writes points in bulk and updates the summaries itself,
+# these catch the points added or edited one at a time and the points
+# deleted, which QuerySet.delete() hands over together (see PointDeletions)
+@receiver(models.signals.post_save, sender=TransientPhotData)
+def update_lightcurve_summary(sender, instance, created, raw=False, *args, **kwargs):
+	if raw: return
+	from YSE_App.common.lightcurve_summary import SummaryUpdates, photometry_transient_id
+	updates = SummaryUpdates()
+	if created: updates.add(photometry_transient_id(instance.photometry_id), [instance])
+	else: updates.change(photometry_transient_id(instance.photometry_id))
+	updates.apply()
+
+@receiver(models.signals.post_delete, sender=TransientPhotData)
+def remove_from_lightcurve_summary(sender, instance, *args, **kwargs):
+	from YSE_App.common.lightcurve_summary import point_deleted
+	point_deleted(instance)
+
+@receiver(models.signals.post_delete, sender=TransientPhotometry)
+def remove_photometry_from_lightcurve_summary(sender, instance, *args, **kwargs):
+	from YSE_App.common.lightcurve_summary import photometry_deleted
+	photometry_deleted(instance)
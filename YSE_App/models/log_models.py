@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 from YSE_App.models.base import *
 from YSE_App.models.spectra_models import *
 from YSE_App.models.phot_models import *
@@ -43,4 +44,11 @@ class Log(BaseModel):
 
 	def __str__(self):
 		limit = 20
-		return (self.comment[:limit] + '...') if len(self.comment) > limit else self.comment
\ No newline at end of file
+		return (self.comment[:limit] + '...') if len(self.comment) > limit else self.comment
+
+# comments are shown on the transient detail page
+@receiver(models.signals.post_save, sender=Log)
+@receiver(models.signals.post_delete, sender=Log)
+def forget_log_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details([instance.transient_id])
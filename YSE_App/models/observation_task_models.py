@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.instrument_models import *
@@ -46,4 +47,10 @@ class HostObservationTask(ObservationalTask):
 							self.instrument_config.instrument.name,
 							self.instrument_config.name,
 							self.followup.valid_start.strftime('%m/%d/%Y'),
-							self.followup.valid_stop.strftime('%m/%d/%Y'))
\ No newline at end of file
+							self.followup.valid_stop.strftime('%m/%d/%Y'))
+
+@receiver(models.signals.post_save, sender=TransientObservationTask)
+@receiver(models.signals.post_delete, sender=TransientObservationTask)
+def forget_task_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details(TransientFollowup.objects.filter(id=instance.followup_id).values_list('transient_id',flat=True))
@@ -7,6 +7,7 @@ from YSE_App.models.transient_models import *
 from YSE_App.models.host_models import *
 from astropy.time import Time
 from django.contrib.auth.models import Group
+from django.dispatch import receiver
 
 class Photometry(BaseModel):
 
@@ -18,9 +19,25 @@ class Photometry(BaseModel):
 	instrument = models.ForeignKey(Instrument, on_delete=models.CASCADE)
 	obs_group = models.ForeignKey(ObservationGroup, on_delete=models.CASCADE)
 	groups = models.ManyToManyField(Group, blank=True)
+
+	### Properties ###
+	# Optional
+	# fingerprint of the last upload merged into this set, see YSE_App.common.phot_merge
+	content_hash = models.CharField(max_length=64, null=True, blank=True)
 		
 
+class PointDeletionQuerySet(models.QuerySet):
+
+	def delete(self):
+		# the summaries, content hashes and detail pages of the points deleted,
+		# directly or along with their photometry, are updated once for the lot
+		from YSE_App.common.lightcurve_summary import PointDeletions
+		with PointDeletions():
+			return super().delete()
+
 class TransientPhotometry(Photometry):
+	objects = PointDeletionQuerySet.as_manager()
+
 	### Entity relationships ###
 	# Required
 	transient = models.ForeignKey(Transient, on_delete=models.CASCADE)
@@ -32,6 +49,11 @@ class TransientPhotometry(Photometry):
 	def __str__(self):
 		return 'Transient Phot: %s' % (self.transient.name)
 
+	def delete(self, *args, **kwargs):
+		from YSE_App.common.lightcurve_summary import PointDeletions
+		with PointDeletions():
+			return super().delete(*args, **kwargs)
+
 	def natural_key(self):
 		return '%s - %s' % (self.obs_group.name,self.instrument.telescope.name)
 
@@ -79,6 +101,8 @@ class PhotData(BaseModel):
 
 
 class TransientPhotData(PhotData):
+	objects = PointDeletionQuerySet.as_manager()
+
 	# Entity relationships ###
 	# Required
 	photometry = models.ForeignKey(TransientPhotometry, on_delete=models.CASCADE)
@@ -94,6 +118,14 @@ class TransientPhotData(PhotData):
 		time = Time(self.obs_date,scale='utc')
 		return time.mjd
 
+@receiver(models.signals.post_save, sender=TransientPhotData)
+def clear_phot_content_hash(sender, instance, *args, **kwargs):
+	# ingestion writes points in bulk, which sends no signals, so anything
+	# that gets here is an edit made elsewhere and the next upload must be merged again.
+	# deleted points are dealt with in YSE_App.common.lightcurve_summary.points_deleted
+	TransientPhotometry.objects.filter(id=instance.photometry_id).\
+		exclude(content_hash=None).update(content_hash=None)
+
 class HostPhotData(PhotData):
 	# Entity relationships ###
 	# Required
@@ -130,3 +162,20 @@ class HostImage(Image):
 
 	def __str__(self):
 		return 'Img: %s - %s' % (self.phot_data.photometry.host.HostString(), self.phot_data.obs_date.strftime('%m/%d/%Y'))
+
+# the detail page shows the latest and discovery points the user may see.
+# new, edited and deleted points are taken care of with the light curve
+# summaries, see YSE_App/common/lightcurve_summary.py
+@receiver(models.signals.post_save, sender=TransientPhotometry)
+@receiver(models.signals.post_delete, sender=TransientPhotometry)
+def forget_photometry_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details([instance.transient_id])
+
+@receiver(models.signals.m2m_changed, sender=TransientPhotometry.groups.through)
+def forget_photometry_groups_transient_detail(sender, instance, action, reverse, pk_set, *args, **kwargs):
+	# who may see the photometry changed
+	if action not in ('post_add','post_remove','post_clear'): return
+	from YSE_App.common.detail_cache import forget_transient_details
+	if not reverse: forget_transient_details([instance.transient_id])
+	elif pk_set: forget_transient_details(TransientPhotometry.objects.filter(id__in=pk_set).values_list('transient_id',flat=True))
@@ -3,6 +3,9 @@ from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.telescope_models import *
 from explorer.models import *
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.dispatch import receiver
 
 class Profile(BaseModel):
 	### Entity relationships ###
@@ -30,6 +33,38 @@ class UserQuery(BaseModel):
 	def __str__(self):
 		return '%s %s: %s'%(self.user.first_name,self.user.last_name,self.query.title)
 
+class UserQueryResult(BaseModel):
+	"""
+	the transients an SQL Explorer query on a personal dashboard returned the
+	last time it ran.  the queries are rerun in the background by
+	YSE_App/common/user_query_cache.py, the dashboard only ever reads this
+	"""
+	STATUS_CHOICES = (('Pending','Pending'),('Running','Running'),
+					  ('Done','Done'),('Failed','Failed'))
+
+	### Entity relationships ###
+	# Required
+	query = models.OneToOneField(Query, related_name='dashboard_result', on_delete=models.CASCADE)
+
+	# Optional
+	transients = models.ManyToManyField('Transient', blank=True, related_name='dashboard_query_results')
+
+	### Properties ###
+	# Required
+	status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='Pending', db_index=True)
+	n_rows = models.IntegerField(default=0)
+
+	# Optional
+	# of the SQL and the modification times of the tables it reads
+	fingerprint = models.CharField(max_length=64, null=True, blank=True)
+	message = models.TextField(null=True, blank=True)
+	started_date = models.DateTimeField(null=True, blank=True)
+	refreshed_date = models.DateTimeField(null=True, blank=True)
+	duration = models.FloatField(null=True, blank=True)
+
+	def __str__(self):
+		return '%s (%s)' % (self.query.title, self.status)
+
 class UserTelescopeToFollow(BaseModel):
 
 	profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
@@ -37,3 +72,32 @@ class UserTelescopeToFollow(BaseModel):
 
 	def __str__(self):
 		return '%s: %s'%(self.profile.user,self.telescope.name)
+
+# group ids per user, cached for YSE_App/data/AuthorizationContext.py
+def user_groups_cache_key(user_id):
+	return 'user_group_ids:%s'%user_id
+
+def forget_user_groups(user_ids):
+	cache.delete_many([user_groups_cache_key(i) for i in user_ids])
+
+@receiver(models.signals.m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+	if action not in ('post_add','post_remove','pre_clear'): return
+	if not reverse:
+		# user.groups.add/remove/clear
+		forget_user_groups([instance.id])
+	elif action == 'pre_clear':
+		# group.user_set.clear(), the members aren't known afterwards
+		forget_user_groups(instance.user_set.values_list('id',flat=True))
+	else:
+		forget_user_groups(pk_set)
+
+@receiver(models.signals.pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+	forget_user_groups(instance.user_set.values_list('id',flat=True))
+
+# an edited query's result is out of date whatever the tables say
+@receiver(models.signals.post_save, sender=Query)
+def user_query_changed(sender, instance, raw=False, **kwargs):
+	if raw: return
+	UserQueryResult.objects.filter(query=instance).exclude(status='Running').update(status='Pending')
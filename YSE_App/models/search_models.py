@@ -0,0 +1,69 @@
+from django.db import models
+from YSE_App.models.base import *
+from YSE_App.models.host_models import *
+from YSE_App.models.transient_models import *
+from django.dispatch import receiver
+
+class TransientSearchDocument(BaseModel):
+	"""
+	what the search box matches a transient on (names, status, group, class,
+	host, tags, redshift, ...) as one "field:term" per line.  the terms are
+	indexed in TransientSearchTerm; see YSE_App/common/transient_search.py
+	"""
+	### Entity relationships ###
+	# Required
+	transient = models.OneToOneField(Transient, related_name='search_document', on_delete=models.CASCADE)
+
+	### Properties ###
+	# Required
+	text = models.TextField(blank=True, default='')
+
+	def __str__(self):
+		return 'Search: %s' % self.transient.name
+
+class TransientSearchTerm(models.Model):
+	"""
+	the inverted index of the search documents, one row per term of each
+	transient.  like an m2m through table there are no audit fields, the
+	rows are rewritten whenever the document changes
+	"""
+	class Meta:
+		index_together = (('field','term'),)
+
+	transient = models.ForeignKey(Transient, on_delete=models.CASCADE)
+	field = models.CharField(max_length=16)
+	term = models.CharField(max_length=64, db_index=True)
+
+	def __str__(self):
+		return '%s:%s' % (self.field, self.term)
+
+@receiver(models.signals.post_save, sender=Transient)
+def index_transient(sender, instance, raw=False, *args, **kwargs):
+	if raw: return
+	from YSE_App.common.transient_search import index_transients
+	index_transients([instance.id])
+
+@receiver(models.signals.post_save, sender=AlternateTransientNames)
+@receiver(models.signals.post_delete, sender=AlternateTransientNames)
+def index_alternate_name(sender, instance, raw=False, *args, **kwargs):
+	if raw: return
+	from YSE_App.common.transient_search import index_transients
+	index_transients([instance.transient_id])
+
+@receiver(models.signals.m2m_changed, sender=Transient.tags.through)
+def index_tags(sender, instance, action, reverse, pk_set, *args, **kwargs):
+	if reverse and action == 'pre_clear':
+		# a tag cleared of its transients, which are gone by post_clear
+		instance._search_transient_ids = list(instance.transient_set.values_list('id',flat=True))
+	if action not in ('post_add','post_remove','post_clear'): return
+	from YSE_App.common.transient_search import index_transients
+	if not reverse: index_transients([instance.id])
+	elif action == 'post_clear': index_transients(getattr(instance,'_search_transient_ids',[]))
+	elif pk_set: index_transients(pk_set)
+
+@receiver(models.signals.post_save, sender=Host)
+def index_host(sender, instance, created, raw=False, *args, **kwargs):
+	# the host's name and redshift are searchable on its transients
+	if raw or created: return
+	from YSE_App.common.transient_search import index_transients
+	index_transients(Transient.objects.filter(host_id=instance.id).values_list('id',flat=True))
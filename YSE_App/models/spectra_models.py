@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.instrument_models import *
@@ -6,6 +7,7 @@ from YSE_App.models.followup_models import *
 from YSE_App.models.transient_models import *
 from YSE_App.models.host_models import *
 from django.contrib.auth.models import Group
+from YSE_App.common.spec_data import pack_spectrum, unpack_spectrum
 
 class Spectrum(BaseModel):
 	class Meta:
@@ -32,9 +34,25 @@ class Spectrum(BaseModel):
 	spec_plot_file = models.CharField(max_length=512, null=True, blank=True)
 	spec_data_file = models.CharField(max_length=512, null=True, blank=True)
 	spectrum_notes = models.TextField(null=True, blank=True)
+	# packed wavelength/flux/errors, see YSE_App.common.spec_data
+	spec_data = models.BinaryField(null=True, blank=True)
+	# fingerprint of the upload that wrote this spectrum, cleared by any other save
+	content_hash = models.CharField(max_length=64, null=True, blank=True)
 
 	groups = models.ManyToManyField(Group, blank=True)
 
+	def set_spec_data(self, wavelength, flux, flux_err=None, wavelength_err=None):
+		self.spec_data = pack_spectrum(wavelength, flux, flux_err=flux_err, wavelength_err=wavelength_err)
+
+	def get_spec_data(self):
+		return unpack_spectrum(self.spec_data)
+
+	def save(self, *args, content_hash=None, **kwargs):
+		# only ingestion passes content_hash, so an edit from anywhere else
+		# means the next upload of this spectrum is written again
+		self.content_hash = content_hash
+		super(Spectrum, self).save(*args, **kwargs)
+
 class TransientSpectrum(Spectrum):
 	### Entity relationships ###
 	# Required
@@ -66,30 +84,15 @@ class HostSpectrum(Spectrum):
 		return 'Spectrum: %s - %s' % (self.host.HostString(), self.obs_date.strftime('%m/%d/%Y'))
 
 
-class SpecData(BaseModel):
-	class Meta:
-		abstract = True
-	### Properties ###
-	# Required
-	wavelength = models.FloatField()
-	flux = models.FloatField()
-
-	# Optional
-	wavelength_err = models.FloatField(null=True, blank=True)
-	flux_err = models.FloatField(null=True, blank=True)
-
-class TransientSpecData(SpecData):
-	### Entity relationships ###
-	# Required
-	spectrum = models.ForeignKey(TransientSpectrum, on_delete=models.CASCADE)
-
-	def __str__(self):
-		return '%s - %s' % (self.wavelength, self.flux)
+@receiver(models.signals.post_save, sender=TransientSpectrum)
+@receiver(models.signals.post_delete, sender=TransientSpectrum)
+def forget_spectrum_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details([instance.transient_id])
 
-class HostSpecData(SpecData):
-	### Entity relationships ###
-	# Required
-	spectrum = models.ForeignKey(HostSpectrum, on_delete=models.CASCADE)
-
-	def __str__(self):
-		return '%s - %s' % (self.wavelength, self.flux)
+@receiver(models.signals.m2m_changed, sender=TransientSpectrum.groups.through)
+def forget_spectrum_groups_transient_detail(sender, instance, action, reverse, pk_set, *args, **kwargs):
+	if action not in ('post_add','post_remove','post_clear'): return
+	from YSE_App.common.detail_cache import forget_transient_details
+	if not reverse: forget_transient_details([instance.transient_id])
+	elif pk_set: forget_transient_details(TransientSpectrum.objects.filter(id__in=pk_set).values_list('transient_id',flat=True))
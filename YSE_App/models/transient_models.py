@@ -1,5 +1,6 @@
 from django.db import models
 from django.db.models import Q
+from django.core.exceptions import ObjectDoesNotExist
 from YSE_App.models.base import *
 from YSE_App.models.enum_models import *
 from YSE_App.models.photometric_band_models import *
@@ -7,9 +8,8 @@ from YSE_App.models.host_models import *
 from YSE_App.models.tag_models import *
 from YSE_App.common.utilities import GetSexigesimalString
 from YSE_App.common.alert import IsK2Pixel, SendTransientAlert
-from YSE_App.common.thacher_transient_search import thacher_transient_search
-from YSE_App.common.tess_obs import tess_obs
 from YSE_App.common.utilities import date_to_mjd
+from YSE_App.common.cone_search import healpix_or_none
 from YSE_App import models as yse_models
 from django.dispatch import receiver
 from pytz import timezone
@@ -59,6 +59,12 @@ class Transient(BaseModel):
 	point_source_probability = models.FloatField(null=True, blank=True)
 
 	slug = AutoSlugField(null=True, default=None, unique=True, populate_from='name')
+	# nested HEALPix pixel of ra/dec for cone searches, see YSE_App.common.cone_search
+	healpix = models.BigIntegerField(null=True, blank=True, db_index=True)
+
+	def save(self, *args, **kwargs):
+		self.healpix = healpix_or_none(self.ra, self.dec)
+		super(Transient, self).save(*args, **kwargs)
 	
 	def CoordString(self):
 		return GetSexigesimalString(self.ra, self.dec)
@@ -82,44 +88,32 @@ class Transient(BaseModel):
 		date_format = '%m/%d/%Y'
 		return self.disc_date.strftime(date_format)
 
-	def disc_mag(self):
+	def lightcurve(self):
+		# the TransientLightCurveSummary, None until there's some photometry.
+		# select_related('lightcurve_summary') saves the query
+		try: return self.lightcurve_summary
+		except ObjectDoesNotExist: return None
 
-		transient_query = Q(transient=self.id)
-		all_phot = yse_models.TransientPhotometry.objects.filter(transient_query)
-		phot_ids = all_phot.values('id')
-		phot_data_query = Q(photometry__id__in=phot_ids)
-		disc_query = Q(discovery_point = 1)
-		disc_mag = yse_models.TransientPhotData.objects.exclude(data_quality__isnull=False).filter(phot_data_query & disc_query)
-		if len(disc_mag):
-			return disc_mag[0].mag
+	def disc_mag(self):
+		summary = self.lightcurve()
+		if summary is not None:
+			return summary.disc_mag
 		else:
 			return None
 
 	def recent_mag(self):
-		date_format = '%m/%d/%Y'
-
-		transient_query = Q(transient=self.id)
-		all_phot = yse_models.TransientPhotometry.objects.filter(transient_query)
-		phot_ids = all_phot.values('id')
-		phot_data_query = Q(photometry__id__in=phot_ids)
-		recent_mag = yse_models.TransientPhotData.objects.exclude(data_quality__isnull=False).filter(phot_data_query).order_by('-obs_date')
-
-		if len(recent_mag):
-			return '%.2f'%(recent_mag[0].mag)
+		summary = self.lightcurve()
+		if summary is not None and summary.recent_mag is not None:
+			return '%.2f'%(summary.recent_mag)
 		else:
 			return None
 
 	def recent_magdate(self):
 		date_format = '%m/%d/%Y'
 
-		transient_query = Q(transient=self.id)
-		all_phot = yse_models.TransientPhotometry.objects.filter(transient_query)
-		phot_ids = all_phot.values('id')
-		phot_data_query = Q(photometry__id__in=phot_ids)
-		recent_mag = yse_models.TransientPhotData.objects.exclude(data_quality__isnull=False).filter(phot_data_query).order_by('-obs_date')
-
-		if len(recent_mag):
-			return '%s'%(recent_mag[0].obs_date.strftime(date_format))
+		summary = self.lightcurve()
+		if summary is not None and summary.recent_magdate is not None:
+			return '%s'%(summary.recent_magdate.strftime(date_format))
 		else:
 			return None
 
@@ -144,71 +138,40 @@ class Transient(BaseModel):
 
 	def natural_key(self):
 		return self.name
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# the status it was loaded with, so a save can tell the dashboard
+		# about the status it left as well as the one it's in now
+		instance._loaded_status_id = instance.__dict__.get('status_id')
+		return instance
 	
 @receiver(models.signals.post_save, sender=Transient)
-def execute_after_save(sender, instance, created, *args, **kwargs):
+@receiver(models.signals.post_delete, sender=Transient)
+def forget_dashboard_tables(sender, instance, *args, **kwargs):
+	from YSE_App.common.dashboard_cache import forget_statuses
+	forget_statuses([instance.status_id, getattr(instance,'_loaded_status_id',None)])
+	instance._loaded_status_id = instance.status_id
+
+@receiver(models.signals.post_save, sender=Host)
+def forget_host_dashboard_tables(sender, instance, created, raw=False, *args, **kwargs):
+	# the tables show the host redshift when the transient has none
+	if raw or created: return
+	from YSE_App.common.dashboard_cache import forget_statuses
+	forget_statuses(Transient.objects.filter(host_id=instance.id).values_list('status_id',flat=True).distinct())
 
-	tag_K2 = False
+@receiver(models.signals.post_save, sender=Transient)
+def execute_after_save(sender, instance, created, *args, **kwargs):
 
 	if created:
 		print("Transient Created: %s" % instance.name)
 		print("Internal Survey: %s" % instance.internal_survey)
 
-		if tag_K2:
-			is_k2_C16_validated, C16_msg = IsK2Pixel(instance.ra, instance.dec, "16")
-			is_k2_C17_validated, C17_msg = IsK2Pixel(instance.ra, instance.dec, "17")
-			is_k2_C19_validated, C19_msg = IsK2Pixel(instance.ra, instance.dec, "19")
-
-			print("K2 C16 Val: %s; K2 Val Msg: %s" % (is_k2_C16_validated, C16_msg))
-			print("K2 C17 Val: %s; K2 Val Msg: %s" % (is_k2_C17_validated, C17_msg))
-			print("K2 C19 Val: %s; K2 Val Msg: %s" % (is_k2_C19_validated, C19_msg))
-
-			if is_k2_C16_validated:
-				k2c16tag = TransientTag.objects.get(name='K2 C16')
-				instance.k2_validated = True
-				instance.k2_msg = C16_msg
-				instance.tags.add(k2c16tag)
-			
-			elif is_k2_C17_validated:
-				k2c17tag = TransientTag.objects.get(name='K2 C17')
-				instance.k2_validated = True
-				instance.k2_msg = C17_msg
-				instance.tags.add(k2c17tag)
-
-			elif is_k2_C19_validated:
-				k2c19tag = TransientTag.objects.get(name='K2 C19')
-				instance.k2_validated = True
-				instance.k2_msg = C19_msg
-				instance.tags.add(k2c19tag)
-
-		print('Checking TESS')
-		if instance.disc_date:
-			TESSFlag = tess_obs(instance.ra,instance.dec,date_to_mjd(instance.disc_date)+2400000.5)
-			if TESSFlag:
-				try:
-					tesstag = TransientTag.objects.get(name='TESS')
-					instance.tags.add(tesstag)
-				except: pass
-		else:
-			TESSFlag = tess_obs(instance.ra,instance.dec,date_to_mjd(instance.modified_date)+2400000.5)
-			if TESSFlag:
-				try:
-					tesstag = TransientTag.objects.get(name='TESS')
-					instance.tags.add(tesstag)
-				except: pass
-
-		print('Checking Thacher')
-		if thacher_transient_search(instance.ra,instance.dec):
-			try:
-				thachertag = TransientTag.objects.get(name='Thacher')
-				instance.tags.add(thachertag)
-			except: pass
-			
-		instance.save()
-		#if is_k2_C19_validated:
-		#	coord_string = GetSexigesimalString(instance.ra, instance.dec)
-		#	coord_string = instance.CoordString()
-		#	SendTransientAlert(instance.id, instance.name, coord_string[0], coord_string[1])
+		# TESS/Thacher/K2 lookups are slow (some are HTTP calls), so they only
+		# get queued here and the enrichment worker runs them, see YSE_App/enrichments.py
+		from YSE_App.enrichments import queue_enrichments
+		queue_enrichments([instance])
 
 # Alternate Host names?
 class AlternateTransientNames(BaseModel):
@@ -228,3 +191,21 @@ class AlternateTransientNames(BaseModel):
 
 	def __str__(self):
 		return self.name
+
+# the names and tags are shown on the transient detail page
+@receiver(models.signals.post_save, sender=AlternateTransientNames)
+@receiver(models.signals.post_delete, sender=AlternateTransientNames)
+def forget_alternate_name_transient_detail(sender, instance, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	forget_transient_details([instance.transient_id])
+
+@receiver(models.signals.m2m_changed, sender=Transient.tags.through)
+def forget_tags_transient_detail(sender, instance, action, reverse, pk_set, *args, **kwargs):
+	from YSE_App.common.detail_cache import forget_transient_details
+	if not reverse and action in ('post_add','post_remove','post_clear'):
+		forget_transient_details([instance.id])
+	elif reverse and action in ('post_add','post_remove') and pk_set:
+		forget_transient_details(pk_set)
+	elif reverse and action == 'pre_clear':
+		# a tag cleared of its transients, which are gone by post_clear
+		forget_transient_details(instance.transient_set.values_list('id',flat=True))
@@ -14,6 +14,7 @@ class HostSerializer(serializers.HyperlinkedModelSerializer):
 	class Meta:
 		model = Host
 		fields = "__all__"
+		read_only_fields = ('healpix',)
 		extra_kwargs = {
 			'url': {'view_name': 'host-detail', 'lookup_field': 'id'}
 		}
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from YSE_App.models import *
+from YSE_App.common.fk_resolver import has_pk
 from django.contrib.auth.models import User, Group
 from rest_framework.exceptions import PermissionDenied
 from .auth_helpers import NotAuthorizedToAccessParent
@@ -42,10 +43,8 @@ class TransientPhotometrySerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exists():
-					g = group_result.first()
-					transient_photometry.groups.add(g)
+				if has_pk(Group, group.id):
+					transient_photometry.groups.add(group)
 
 			transient_photometry.save()
 
@@ -90,10 +89,8 @@ class TransientPhotometrySerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 
 		instance.save()
 
@@ -136,10 +133,8 @@ class HostPhotometrySerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exist():
-					g = group_result.first()
-					host_photometry.groups.add(g)
+				if has_pk(Group, group.id):
+					host_photometry.groups.add(group)
 
 			host_photometry.save()
 
@@ -183,10 +178,8 @@ class HostPhotometrySerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 
 		instance.save()
 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from YSE_App.models import *
+from YSE_App.common.fk_resolver import has_pk
 from django.contrib.auth.models import User
 
 class PrincipalInvestigatorSerializer(serializers.HyperlinkedModelSerializer):
@@ -19,10 +20,8 @@ class PrincipalInvestigatorSerializer(serializers.HyperlinkedModelSerializer):
 		pi.save()
 
 		for og in ogs:
-			og_result = ObservationGroup.objects.filter(pk=og.id)
-			if og_result.exists():
-				o = og_result.first()
-				pi.obs_group.add(o)
+			if has_pk(ObservationGroup, og.id):
+				pi.obs_group.add(og)
 		
 		pi.save()
 		return pi
@@ -35,10 +34,8 @@ class PrincipalInvestigatorSerializer(serializers.HyperlinkedModelSerializer):
 
 		ogs = validated_data.pop('obs_group')
 		for og in ogs:
-			og_result = ObservationGroup.objects.filter(pk=og.id)
-			if og_result.exists():
-				o = og_result.first()
-				instance.obs_group.add(o)
+			if has_pk(ObservationGroup, og.id):
+				instance.obs_group.add(og)
 
 		instance.name = validated_data.get('name', instance.name)
 		instance.phone = validated_data.get('phone', instance.phone)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from YSE_App.models import *
+from YSE_App.common.fk_resolver import has_pk
 from django.contrib.auth.models import User
 from rest_framework.exceptions import PermissionDenied
 from .auth_helpers import NotAuthorizedToAccessParent
@@ -18,7 +19,7 @@ class TransientSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 
 	class Meta:
 		model = TransientSpectrum
-		fields = "__all__"
+		exclude = ('spec_data',)
 		extra_kwargs = {
 			'url': {'view_name': 'transientspectrum-detail', 'lookup_field': 'id'}
 		}
@@ -41,10 +42,8 @@ class TransientSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exists():
-					g = group_result.first()
-					transient_spectrum.groups.add(g)
+				if has_pk(Group, group.id):
+					transient_spectrum.groups.add(group)
 
 			transient_spectrum.save()
 
@@ -105,10 +104,8 @@ class TransientSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 
 		instance.save()
 
@@ -128,7 +125,7 @@ class HostSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 
 	class Meta:
 		model = HostSpectrum
-		fields = "__all__"
+		exclude = ('spec_data',)
 		extra_kwargs = {
 			'url': {'view_name': 'hostspectrum-detail', 'lookup_field': 'id'}
 		}
@@ -151,10 +148,8 @@ class HostSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exist():
-					g = group_result.first()
-					host_spectrum.groups.add(g)
+				if has_pk(Group, group.id):
+					host_spectrum.groups.add(group)
 
 			host_spectrum.save()
 
@@ -212,102 +207,29 @@ class HostSpectrumSerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 
 		instance.save()
 
 		return instance
 
-class TransientSpecDataSerializer(serializers.HyperlinkedModelSerializer):
-	spectrum = serializers.HyperlinkedRelatedField(queryset=TransientSpectrum.objects.all(), view_name='transientspectrum-detail', lookup_field="id")
-
-	created_by = serializers.HyperlinkedRelatedField(read_only=True, view_name='user-detail')
-	modified_by = serializers.HyperlinkedRelatedField(read_only=True, view_name='user-detail')
-
-	class Meta:
-		model = TransientSpecData
-		fields = "__all__"
-
-	def create(self, validated_data):
-		transient_spec_data = TransientSpecData.objects.create(**validated_data)
-
-		parent_spectrum = TransientSpectrum.objects.get(pk=transient_spec_data.spectrum.id)
-		user_groups = self.context['request'].user.groups.all()
-
-		if NotAuthorizedToAccessParent(parent_spectrum, user_groups):
-			raise PermissionDenied(
-				{"message": "You don't have permission to create transient spectrum data point for",
-				 "transient_photometry_id": parent_spectrum.id})
-		else:
-			transient_spec_data.save()
-
-		return transient_spec_data
-
-	def update(self, instance, validated_data):
-		instance.spectrum_id = validated_data.get('spectrum', instance.spectrum)
-		instance.wavelength = validated_data.get('wavelength', instance.wavelength)
-		instance.flux = validated_data.get('flux', instance.flux)
-		instance.wavelength_err = validated_data.get('wavelength_err', instance.wavelength_err)
-		instance.flux_err = validated_data.get('flux_err', instance.flux_err)
-		instance.modified_by_id = validated_data.get('modified_by', instance.modified_by)
-
-		new_parent_spectrum = TransientSpectrum.objects.get(pk=instance.spectrum_id.id)
-		user_groups = self.context['request'].user.groups.all()
-
-		if NotAuthorizedToAccessParent(new_parent_spectrum, user_groups):
-			raise PermissionDenied(
-				{"message": "You don't have permission to modify transient spectrum data point for",
-				 "transient_spectrum_id": new_parent_spectrum.id})
-
-		instance.save()
-
-		return instance
-
-class HostSpecDataSerializer(serializers.HyperlinkedModelSerializer):
-	spectrum = serializers.HyperlinkedRelatedField(queryset=HostSpectrum.objects.all(), view_name='hostspectrum-detail', lookup_field="id")
-
+class SpecDataSerializer(serializers.Serializer):
+	# read-only view of one wavelength bin of a packed spectrum (see YSE_App.common.spec_data)
+	id = serializers.CharField(read_only=True)
 	created_by = serializers.HyperlinkedRelatedField(read_only=True, view_name='user-detail')
 	modified_by = serializers.HyperlinkedRelatedField(read_only=True, view_name='user-detail')
-
-	class Meta:
-		model = HostSpecData
-		fields = "__all__"
-
-	def create(self, validated_data):
-		host_spec_data = HostSpecData.objects.create(**validated_data)
-
-		parent_spectrum = HostSpectrum.objects.get(pk=host_spec_data.spectrum.id)
-		user_groups = self.context['request'].user.groups.all()
-
-		if NotAuthorizedToAccessParent(parent_spectrum, user_groups):
-			raise PermissionDenied(
-				{"message": "You don't have permission to create host spectrum data point for",
-				 "host_spectrum_id": parent_spectrum.id})
-		else:
-			host_spec_data.save()
-
-		return host_spec_data
-
-	def update(self, instance, validated_data):
-		instance.spectrum_id = validated_data.get('spectrum', instance.spectrum)
-		instance.wavelength = validated_data.get('wavelength', instance.wavelength)
-		instance.flux = validated_data.get('flux', instance.flux)
-		instance.wavelength_err = validated_data.get('wavelength_err', instance.wavelength_err)
-		instance.flux_err = validated_data.get('flux_err', instance.flux_err)
-		instance.modified_by_id = validated_data.get('modified_by', instance.modified_by)
-
-		new_parent_spectrum = HostSpectrum.objects.get(pk=instance.spectrum_id.id)
-		user_groups = self.context['request'].user.groups.all()
-
-		if NotAuthorizedToAccessParent(new_parent_spectrum, user_groups):
-			raise PermissionDenied(
-				{"message": "You don't have permission to modify host spectrum data point for",
-				 "host_spectrum_id": new_parent_spectrum.id})
-
-		instance.save()
-
-		return instance
-
+	created_date = serializers.DateTimeField(read_only=True)
+	modified_date = serializers.DateTimeField(read_only=True)
+	wavelength = serializers.FloatField(read_only=True)
+	flux = serializers.FloatField(read_only=True)
+	wavelength_err = serializers.FloatField(read_only=True)
+	flux_err = serializers.FloatField(read_only=True)
+
+class TransientSpecDataSerializer(SpecDataSerializer):
+	url = serializers.HyperlinkedIdentityField(view_name='transientspecdata-detail', lookup_field='id')
+	spectrum = serializers.HyperlinkedRelatedField(read_only=True, view_name='transientspectrum-detail', lookup_field="id")
+
+class HostSpecDataSerializer(SpecDataSerializer):
+	url = serializers.HyperlinkedIdentityField(view_name='hostspecdata-detail', lookup_field='id')
+	spectrum = serializers.HyperlinkedRelatedField(read_only=True, view_name='hostspectrum-detail', lookup_field="id")
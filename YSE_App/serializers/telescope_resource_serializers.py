@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from YSE_App.models import *
+from YSE_App.common.fk_resolver import has_pk
 from django.contrib.auth.models import User
 from rest_framework.exceptions import PermissionDenied
 from .auth_helpers import NotAuthorizedToAccessParent
@@ -33,10 +34,8 @@ class ToOResourceSerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exists():
-					g = group_result.first()
-					too_resource.groups.add(g)
+				if has_pk(Group, group.id):
+					too_resource.groups.add(group)
 
 			too_resource.save()
 
@@ -85,10 +84,8 @@ class ToOResourceSerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 		
 		instance.save()
 
@@ -124,10 +121,8 @@ class QueuedResourceSerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exists():
-					g = group_result.first()
-					queued_resource.groups.add(g)
+				if has_pk(Group, group.id):
+					queued_resource.groups.add(group)
 
 			queued_resource.save()
 
@@ -176,10 +171,8 @@ class QueuedResourceSerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 
 		instance.save()
 
@@ -217,10 +210,8 @@ class ClassicalResourceSerializer(serializers.HyperlinkedModelSerializer):
 
 		if groups_exist:
 			for group in groups:
-				group_result = Group.objects.filter(pk=group.id)
-				if group_result.exists():
-					g = group_result.first()
-					classical_resource.groups.add(g)
+				if has_pk(Group, group.id):
+					classical_resource.groups.add(group)
 
 			classical_resource.save()
 
@@ -267,10 +258,8 @@ class ClassicalResourceSerializer(serializers.HyperlinkedModelSerializer):
 					instance.groups.remove(user_group)
 
 				for member_group in member_groups:
-					group_result = Group.objects.filter(pk=member_group.id)
-					if group_result.exists():
-						g = group_result.first()
-						instance.groups.add(g)
+					if has_pk(Group, member_group.id):
+						instance.groups.add(member_group)
 		
 		instance.save()
 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from YSE_App.models import *
+from YSE_App.common.fk_resolver import has_pk
 from django.contrib.auth.models import User
 
 class TransientSerializer(serializers.HyperlinkedModelSerializer):
@@ -22,6 +23,7 @@ class TransientSerializer(serializers.HyperlinkedModelSerializer):
 	class Meta:
 		model = Transient
 		fields = "__all__"
+		read_only_fields = ('healpix',)
 
 	def create(self, validated_data):
 
@@ -35,10 +37,8 @@ class TransientSerializer(serializers.HyperlinkedModelSerializer):
 
 		if tags_exist:
 			for tag in transient_tags:
-				tag_result = TransientTag.objects.filter(pk=tag.id)
-				if tag_result.exists():
-					t = tag_result.first()
-					transient.tags.add(t)
+				if has_pk(TransientTag, tag.id):
+					transient.tags.add(tag)
 
 			transient.save()
 
@@ -85,10 +85,8 @@ class TransientSerializer(serializers.HyperlinkedModelSerializer):
 
 			transient_tags = validated_data.pop('tags')
 			for tag in transient_tags:
-				tag_result = TransientTag.objects.filter(pk=tag.id)
-				if tag_result.exists():
-					t = tag_result.first()
-					instance.tags.add(t)
+				if has_pk(TransientTag, tag.id):
+					instance.tags.add(tag)
 
 		instance.save()
 
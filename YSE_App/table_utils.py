@@ -8,11 +8,14 @@ from django.db.models.functions import Length, Substr
 from django.db.models import Count, Value, Max, Min
 from django.db.models.functions import Greatest, Coalesce
 from django_tables2 import A
+from django_tables2.data import TableListData
 from django.db import models
 from .data import PhotometryService
+from .common.transient_search import search_transients, search_followups
+from .common.observability import time_string
+from .common.ephemeris import stored_site_night
 import time
 import django_filters
-import itertools
 from astropy.coordinates import get_moon, SkyCoord
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -20,6 +23,51 @@ from matplotlib.dates import DateFormatter
 from matplotlib import rcParams
 rcParams['figure.figsize'] = (7,7)
 
+def with_lightcurve_summary(data, related='lightcurve_summary'):
+	# the magnitude columns read TransientLightCurveSummary, so join it in
+	# rather than looking it up row by row
+	if hasattr(data,'select_related'): return data.select_related(related)
+	return data
+
+class PageData(TableListData):
+	"""
+	the rows of one page of a table that has count rows in all, the first of
+	them row offset.  the paginator only asks for the length and slices out
+	the page it shows, so the other pages never have to be read
+	"""
+	def __init__(self, rows, count, offset):
+		super(PageData, self).__init__(list(rows))
+		self.count,self.offset = count,offset
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, key):
+		if isinstance(key, slice):
+			start = max((key.start or 0)-self.offset,0)
+			stop = None if key.stop is None else max(key.stop-self.offset,0)
+			return self.data[start:stop]
+		return self.data[key-self.offset]
+
+def table_page(request, prefix, count, per_page):
+	"""
+	(offset, limit) of the rows RequestConfig will show for a table of count
+	rows: the page and per_page it reads from the request, and the last page
+	for a page number out of range, as it does
+	"""
+	try: per_page = int(request.GET[prefix+'per_page'])
+	except (ValueError, KeyError): pass
+	try: page = int(request.GET[prefix+'page'])
+	except (ValueError, KeyError): page = 1
+	num_pages = -(-max(count,1)//per_page)
+	if page < 1 or page > num_pages: page = num_pages
+	return (page-1)*per_page,per_page
+
+def page_ids(request, prefix, ids, per_page):
+	"""(the ids on the page the request shows, offset) of a table whose rows have ids, in order"""
+	offset,limit = table_page(request,prefix,len(ids),per_page)
+	return ids[offset:offset+limit],offset
+
 class TransientTable(tables.Table):
 
 	name_string = tables.TemplateColumn("<a href=\"{% url 'transient_detail' record.slug %}\">{{ record.name }}</a>",
@@ -31,9 +79,9 @@ class TransientTable(tables.Table):
 	disc_date_string = tables.Column(accessor='disc_date_string',
 									 verbose_name='Disc. Date',orderable=True,order_by='disc_date')
 	recent_mag = tables.Column(accessor='recent_mag',
-							   verbose_name='Last Mag',orderable=True)
+							   verbose_name='Last Mag',orderable=True,order_by='lightcurve_summary__recent_mag')
 	recent_magdate = tables.Column(accessor='recent_magdate',
-							   verbose_name='Last Obs. Date',orderable=True)
+							   verbose_name='Last Obs. Date',orderable=True,order_by='lightcurve_summary__recent_magdate')
 	best_redshift = tables.Column(accessor='z_or_hostz',
 								  verbose_name='Redshift',orderable=True,order_by='host__redshift')
 	
@@ -64,8 +112,8 @@ class TransientTable(tables.Table):
 										  verbose_name='Status',orderable=True,order_by='status')
 
 	
-	def __init__(self, *args, **kwargs):
-		super().__init__(*args, **kwargs)
+	def __init__(self, data, *args, **kwargs):
+		super().__init__(with_lightcurve_summary(data), *args, **kwargs)
 
 		self.base_columns['best_spec_class'].verbose_name = 'Spec. Class'
 
@@ -77,28 +125,6 @@ class TransientTable(tables.Table):
 		return (queryset, True)
 
 	
-	def order_recent_mag(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_mag=Max('transientphotometry__transientphotdata__mag',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_mag')
-		return (queryset, True)
-
-	def order_recent_magdate(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_magdate=Max('transientphotometry__transientphotdata__obs_date',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_magdate')
-		return (queryset, True)
-	
 	
 	class Meta:
 		model = Transient
@@ -134,9 +160,9 @@ class NewTransientTable(tables.Table):
 	disc_date_string = tables.Column(accessor='disc_date_string',
 									 verbose_name='Disc. Date',orderable=True,order_by='disc_date')
 	recent_mag = tables.Column(accessor='recent_mag',
-							   verbose_name='Last Mag',orderable=True)
+							   verbose_name='Last Mag',orderable=True,order_by='lightcurve_summary__recent_mag')
 	recent_magdate = tables.Column(accessor='recent_magdate',
-							   verbose_name='Last Obs. Date',orderable=True)
+							   verbose_name='Last Obs. Date',orderable=True,order_by='lightcurve_summary__recent_magdate')
 	best_redshift = tables.Column(accessor='z_or_hostz',
 								  verbose_name='Redshift',orderable=True,order_by='host__redshift')
 	ps_score = tables.Column(accessor='point_source_probability',
@@ -169,8 +195,8 @@ class NewTransientTable(tables.Table):
 										  verbose_name='Status',orderable=True,order_by='status')
 
 	
-	def __init__(self, *args, **kwargs):
-		super().__init__(*args, **kwargs)
+	def __init__(self, data, *args, **kwargs):
+		super().__init__(with_lightcurve_summary(data), *args, **kwargs)
 
 		self.base_columns['best_spec_class'].verbose_name = 'Spec. Class'
 
@@ -182,28 +208,6 @@ class NewTransientTable(tables.Table):
 		return (queryset, True)
 
 	
-	def order_recent_mag(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_mag=Max('transientphotometry__transientphotdata__mag',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_mag')
-		return (queryset, True)
-
-	def order_recent_magdate(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_magdate=Max('transientphotometry__transientphotdata__obs_date',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_magdate')
-		return (queryset, True)
-	
 	
 	class Meta:
 		model = Transient
@@ -238,7 +242,7 @@ class FollowupTable(tables.Table):
 	dec_string = tables.Column(accessor='transient.CoordString.1',
 							   verbose_name='DEC',orderable=True,order_by='transient.dec')
 	recent_mag = tables.Column(accessor='transient.recent_mag',
-							   verbose_name='Recent Mag',orderable=True)
+							   verbose_name='Recent Mag',orderable=True,order_by='transient__lightcurve_summary__recent_mag')
 
 
 	observation_window = tables.Column(accessor='observation_window',
@@ -264,23 +268,12 @@ class FollowupTable(tables.Table):
 	#disc_mag = tables.Column(accessor='disc_mag',
 	#						 verbose_name='Disc. Mag',orderable=True)
 	
-	def __init__(self,*args, **kwargs):
-		super().__init__(*args, **kwargs)
+	def __init__(self, data, *args, **kwargs):
+		super().__init__(with_lightcurve_summary(data,'transient__lightcurve_summary'), *args, **kwargs)
 
 		self.base_columns['transient.status'].verbose_name = 'Transient Status'
 		#self.base_columns['status'].verbose_name = 'Followup Status'
 
-	def order_recent_mag(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__transientfollowup__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transient__transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_magdate=Max('transient__transientphotometry__transientphotdata__obs_date',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_magdate')
-		return (queryset, True)
-		
 	class Meta:
 		model = TransientFollowup
 		fields = ('name_string','ra_string','dec_string','recent_mag','transient.status','observation_window','action')
@@ -310,7 +303,7 @@ class ObsNightFollowupTable(tables.Table):
 	dec_string = tables.Column(accessor='transient.CoordString.1',
 							   verbose_name='DEC',orderable=True,order_by='transient.dec')
 	recent_mag = tables.Column(accessor='transient.recent_mag',
-							   verbose_name='Recent Mag',orderable=True)
+							   verbose_name='Recent Mag',orderable=True,order_by='transient__lightcurve_summary__recent_mag')
 
 
 	#observation_window = tables.Column(accessor='observation_window',
@@ -337,59 +330,41 @@ class ObsNightFollowupTable(tables.Table):
 	#disc_mag = tables.Column(accessor='disc_mag',
 	#						 verbose_name='Disc. Mag',orderable=True)
 	
-	def __init__(self,*args, classical_obs_date=None, **kwargs):
-		super().__init__(*args, **kwargs)
+	def __init__(self, data, *args, classical_obs_date=None, **kwargs):
+		super().__init__(with_lightcurve_summary(data,'transient__lightcurve_summary'), *args, **kwargs)
 
 		self.base_columns['transient.status'].verbose_name = 'Transient Status'
 		#self.base_columns['status'].verbose_name = 'Followup Status'
 
-		location = EarthLocation.from_geodetic(
-			classical_obs_date[0].resource.telescope.longitude*u.deg,classical_obs_date[0].resource.telescope.latitude*u.deg,
-			classical_obs_date[0].resource.telescope.elevation*u.m)
-		self.tel = Observer(location=location, timezone="UTC")
-		self.tme = Time(str(classical_obs_date[0].obs_date).split()[0])
-		
-	def render_rise_time(self, value):
-		sc = SkyCoord('%s %s'%(value[0],value[1]),unit=(u.hourangle,u.deg))
-		target_rise_time = self.tel.target_rise_time(self.tme,sc,horizon=18*u.deg,which="previous")
-
-		if target_rise_time:
-			risetime = target_rise_time.isot.split('T')[-1].split('.')[0]
-		else:
-			risetime = None
-		
-		return risetime
+		self.site_night = stored_site_night(classical_obs_date[0].resource.telescope,classical_obs_date[0].obs_date)
+		self._observability = None
 
-	def render_set_time(self, value):
-		sc = SkyCoord('%s %s'%(value[0],value[1]),unit=(u.hourangle,u.deg))
-		target_set_time = self.tel.target_set_time(self.tme,sc,horizon=18*u.deg,which="previous")
+	def observability(self, record):
+		# worked out for every row on the page the first time any of them is rendered
+		if self._observability is None:
+			rows = self.page.object_list if hasattr(self,'page') else self.rows
+			transients = [row.record.transient for row in rows]
+			self._observability = dict(zip([t.id for t in transients],self.site_night.targets(
+				[t.ra for t in transients],[t.dec for t in transients]).summary()))
+		if record.transient_id not in self._observability:
+			self._observability[record.transient_id] = self.site_night.targets(
+				record.transient.ra,record.transient.dec).summary()[0]
+		return self._observability[record.transient_id]
 
-		if target_set_time:
-			settime = target_set_time.isot.split('T')[-1].split('.')[0]
-		else:
-			settime = None
-		
-		return settime
+	def render_rise_time(self, record):
+		risetime = time_string(self.observability(record)['rise_time'])
+		return risetime.split('.')[0] if risetime else None
+
+	def render_set_time(self, record):
+		settime = time_string(self.observability(record)['set_time'])
+		return settime.split('.')[0] if settime else None
 
-	def render_moon_angle(self, value):
-		mooncoord = get_moon(self.tme)
-		sc = SkyCoord('%s %s'%(value[0],value[1]),unit=(u.hourangle,u.deg))
-		return('%.1f'%sc.separation(mooncoord).deg)
+	def render_moon_angle(self, record):
+		return '%.1f'%self.observability(record)['moon_angle']
 	
 	def render_airmass(self, value):
 		from astroplan.plots import plot_airmass
 	
-	def order_recent_mag(self, queryset, is_descending):
-
-		all_phot = TransientPhotometry.objects.values('transient').filter(transient__transientfollowup__in = queryset)
-		phot_ids = all_phot.values('id')
-		
-		phot_data_query = Q(transient__transientphotometry__id__in=phot_ids)
-		queryset = queryset.annotate(
-			recent_magdate=Max('transient__transientphotometry__transientphotdata__obs_date',filter=phot_data_query), #,filter=phot_data_query
-		).order_by(('-' if is_descending else '') + 'recent_magdate')
-		return (queryset, True)
-		
 	class Meta:
 		model = TransientFollowup
 		fields = ('name_string','ra_string','dec_string','recent_mag','rise_time','set_time','moon_angle','transient.status')
@@ -411,34 +386,13 @@ class ObsNightFollowupTable(tables.Table):
 		}
 
 		
-def annotate_with_disc_mag(qs):
-
-	all_phot = TransientPhotometry.objects.values('transient')#.filter(transient__in = queryset)
-	phot_ids = all_phot.values('id')
-	
-	phot_data_query = Q(transientphotometry__id__in=phot_ids)
-	disc_query = Q(transientphotometry__transientphotdata__discovery_point = 1)
-	
-	qs = qs.annotate(
-		disc_mag=Min('transientphotometry__transientphotdata__mag',filter=phot_data_query & disc_query),
-	)
-	
-	qs = qs.annotate(
-		obs_group_name=Min('obs_group__name'),
-		host_redshift=Min('host__redshift'),
-		spec_class=Min('best_spec_class__name'),
-		status_name=Min('status__name'))
-	return qs
-	
 class TransientFilter(django_filters.FilterSet):
 
 	#name_string = django_filters.CharFilter(name='name',lookup_expr='icontains',
 	#										label='Name')
 	
+	# see YSE_App/common/transient_search.py for what the box understands
 	ex = django_filters.CharFilter(method='filter_ex',label='Search')
-	search_fields = ['name','ra','dec','disc_date','disc_mag','obs_group_name',
-					 'spec_class','redshift','host_redshift',
-					 'status_name']
 
 	class Meta:
 		model = Transient
@@ -446,30 +400,12 @@ class TransientFilter(django_filters.FilterSet):
 	
 	def filter_ex(self, qs, name, value):
 		if value:
-			
-			qs = annotate_with_disc_mag(qs)
-
-			q_parts = value.split()
-
-
-			list1=self.search_fields
-			list2=q_parts
-			perms = [zip(x,list2) for x in itertools.permutations(list1,len(list2))]
-
-			q_totals = Q()
-			for perm in perms:
-				q_part = Q()
-				for p in perm:
-					q_part = q_part & Q(**{p[0]+'__icontains': p[1]})
-				q_totals = q_totals | q_part
-
-			qs = qs.filter(q_totals)
+			qs = search_transients(qs, value)
 		return qs
 
 class FollowupFilter(django_filters.FilterSet):
 	
 	ex = django_filters.CharFilter(method='filter_ex',label='Search')
-	search_fields = ['transient__name','transient__status__name','status__name','valid_start','valid_stop']
 
 	class Meta:
 		model = TransientFollowup
@@ -477,26 +413,12 @@ class FollowupFilter(django_filters.FilterSet):
 	
 	def filter_ex(self, qs, name, value):
 		if value:
-			q_parts = value.split()
-
-			list1=self.search_fields
-			list2=q_parts
-			perms = [zip(x,list2) for x in itertools.permutations(list1,len(list2))]
-
-			q_totals = Q()
-			for perm in perms:
-				q_part = Q()
-				for p in perm:
-					q_part = q_part & Q(**{p[0]+'__icontains': p[1]})
-				q_totals = q_totals | q_part
-
-			qs = qs.filter(q_totals)
+			qs = search_followups(qs, value)
 		return qs
 
 class ObsNightFollowupFilter(django_filters.FilterSet):
 	
 	ex = django_filters.CharFilter(method='filter_ex',label='Search')
-	search_fields = ['transient__name','transient__status__name','status__name','valid_start','valid_stop']
 
 	class Meta:
 		model = TransientFollowup
@@ -504,20 +426,7 @@ class ObsNightFollowupFilter(django_filters.FilterSet):
 	
 	def filter_ex(self, qs, name, value):
 		if value:
-			q_parts = value.split()
-
-			list1=self.search_fields
-			list2=q_parts
-			perms = [zip(x,list2) for x in itertools.permutations(list1,len(list2))]
-
-			q_totals = Q()
-			for perm in perms:
-				q_part = Q()
-				for p in perm:
-					q_part = q_part & Q(**{p[0]+'__icontains': p[1]})
-				q_totals = q_totals | q_part
-
-			qs = qs.filter(q_totals)
+			qs = search_followups(qs, value)
 		return qs
 
 	
@@ -3,6 +3,8 @@ from django.utils import timezone
 from astropy.coordinates import EarthLocation
 from astropy.coordinates import get_moon, SkyCoord, FK5
 from astroplan import Observer
+from ..common.observability import SiteNight, time_string, moon_separation
+from ..common.ephemeris import stored_site_night
 from astropy.time import Time
 import astropy.units as u
 from django import template
@@ -33,103 +35,42 @@ def galcoordsb(coordstring):
 def replace_space(object):
 	return(object.name.replace(' ','_'))
 
-@register.filter(name='rise_time')
-def rise_time(obsnight,coords,tel=None):
-
-	import time
-	tstart = time.time()
-	
-	tme = Time(str(obsnight.obs_date).split()[0])
+def coord_degrees(coords):
 	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
+	return sc.ra.deg,sc.dec.deg
 
+def obsnight_targets(obsnight,coords):
+	site_night = stored_site_night(obsnight.resource.telescope,obsnight.obs_date)
+	return site_night.targets(*coord_degrees(coords))
 
-	location = EarthLocation.from_geodetic(
-		obsnight.resource.telescope.longitude*u.deg,obsnight.resource.telescope.latitude*u.deg,
-		obsnight.resource.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
+def tonight_targets(too_resource,coords):
+	site_night = SiteNight.for_telescope(too_resource.telescope,Time(datetime.datetime.now()))
+	return site_night.targets(*coord_degrees(coords))
 
-	target_rise_time = tel.target_rise_time(tme,sc,horizon=18*u.deg,which="previous")
-
-	if target_rise_time:
-		returnstarttime = target_rise_time.isot.split('T')[-1]
-	else: returnstarttime = None
-
-	print(time.time()-tstart)
-	
-	return(returnstarttime)
+@register.filter(name='rise_time')
+def rise_time(obsnight,coords,tel=None):
+	return(time_string(obsnight_targets(obsnight,coords).rise_times()[0]))
 
 @register.filter(name='set_time')
 def set_time(obsnight,coords):
-	
-	time = Time(str(obsnight.obs_date).split()[0])
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.resource.telescope.longitude*u.deg,obsnight.resource.telescope.latitude*u.deg,
-		obsnight.resource.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_set_time = tel.target_set_time(time,sc,horizon=18*u.deg,which="previous")
-
-	if target_set_time:
-		returnendtime = target_set_time.isot.split('T')[-1]
-	else: returnendtime = None
-
-	return(returnendtime)
+	return(time_string(obsnight_targets(obsnight,coords).set_times()[0]))
 
 @register.filter(name='tonight_rise_time')
 def tonight_rise_time(obsnight,coords):
-	
-	time = Time(datetime.datetime.now())
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.telescope.longitude*u.deg,obsnight.telescope.latitude*u.deg,
-		obsnight.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_rise_time = tel.target_rise_time(time,sc,horizon=18*u.deg,which="previous")
-
-	if target_rise_time:
-		returnstarttime = target_rise_time.isot.split('T')[-1]
-	else: returnstarttime = None
-
-	return(returnstarttime)
+	return(time_string(tonight_targets(obsnight,coords).rise_times()[0]))
 
 @register.filter(name='tonight_set_time')
 def tonight_set_time(obsnight,coords):
-
-	time = Time(datetime.datetime.now())
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.telescope.longitude*u.deg,obsnight.telescope.latitude*u.deg,
-		obsnight.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_set_time = tel.target_set_time(time,sc,horizon=18*u.deg,which="previous")
-
-	if target_set_time:
-		returnendtime = target_set_time.isot.split('T')[-1]
-	else: returnendtime = None
-
-	return(returnendtime)
+	return(time_string(tonight_targets(obsnight,coords).set_times()[0]))
 
 @register.filter(name='moon_angle')
 def moon_angle(obsnight,coords):
-
-	obstime = Time(str(obsnight.obs_date).split()[0],scale='utc')
-
-	mooncoord = get_moon(obstime)
-	cs = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-	return('%.1f'%cs.separation(mooncoord).deg)
+	return('%.1f'%obsnight_targets(obsnight,coords).moon_angles()[0])
 
 @register.filter(name='too_moon_angle')
 def too_moon_angle(too_resource,coords):
 	obstime = Time(datetime.datetime.now())
-	mooncoord = get_moon(obstime)
-	cs = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-	return('%.1f'%cs.separation(mooncoord).deg)
+	return('%.1f'%moon_separation(get_moon(obstime),*coord_degrees(coords)))
 
 @register.filter(name='get_ps1_image')
 def get_ps1_image(transient):
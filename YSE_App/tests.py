@@ -1,8 +1,759 @@
+import datetime
+import io
+import re
+import json
+import tracemalloc
+import itertools
+from unittest import mock
+import numpy as np
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.contrib.auth.models import Group
 from .models import *
+from django.utils import timezone
+from .data import PhotometryService, SpectraService, ObservingResourceService
+from .data.AuthorizationContext import AuthorizationContext, GetUserGroupIds
+from .transient_detail_utils import cached_detail_bundle
+from .common.ephemeris import get_ephemeris, precompute_ephemerides
+from .common.json_stream import iter_json_object
+from .data_utils import queue_ingest_job, ingest_transients
+from .ingest_queue import JobItems, claim_job, run_job, requeue_stale_jobs
+from .common import fk_resolver, tess_obs
+from .common.phot_merge import merge_transient_phot, points_to_columns
+from .common.lightcurve_summary import rebuild_summaries
+from .common.transient_search import parse_query, search_transients
+from .enrichments import Enrichment, EnrichmentResult
+from .enrichment_queue import claim_batch, run_batch
 
 # Create your tests here.
+class YSETestCase(TestCase):
+	"""an empty cache and a logged in user, observer, who creates everything"""
+
+	def setUp(self):
+		cache.clear()
+		fk_resolver.invalidate()
+		self.user = User.objects.create_user(username='observer', password='pw')
+		self.kw = {'created_by':self.user, 'modified_by':self.user}
+		self.client.login(username='observer', password='pw')
+
+	def create_telescope(self, name='Keck I'):
+		"""a telescope at the Keck observatory, created the first time it's needed"""
+		observatory = Observatory.objects.get_or_create(name='Keck', defaults=dict(utc_offset=-10, tz_name='HST', **self.kw))[0]
+		return Telescope.objects.create(name=name, observatory=observatory,
+										latitude=19.8, longitude=-155.5, elevation=4000., **self.kw)
+
 class TransientTests(TestCase):
 
 	def test1(self):
 		pass
+
+class AuthorizationContextTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.other = User.objects.create_user(username='other', password='pw')
+		kw = self.kw
+		self.yse = Group.objects.create(name='YSE')
+		self.private = Group.objects.create(name='Private')
+		self.user.groups.add(self.yse)
+
+		status = TransientStatus.objects.create(name='New', **kw)
+		obs_group = ObservationGroup.objects.create(name='YSE', **kw)
+		instrument = Instrument.objects.create(name='LRIS', telescope=self.create_telescope(), **kw)
+		self.transient = Transient.objects.create(name='2019abc', ra=10., dec=-20., status=status,
+												  obs_group=obs_group, **kw)
+
+		# one public, one for the user's group, one the user can't see
+		self.phot = []
+		for groups in [[],[self.yse],[self.private]]:
+			phot = TransientPhotometry.objects.create(transient=self.transient, instrument=instrument,
+													  obs_group=obs_group, **kw)
+			phot.groups.add(*groups)
+			self.phot += [phot]
+
+	def test_group_ids_cached(self):
+		with self.assertNumQueries(1):
+			self.assertEqual(GetUserGroupIds(self.user), [self.yse.id])
+		with self.assertNumQueries(0):
+			self.assertEqual(GetUserGroupIds(self.user), [self.yse.id])
+
+	def test_group_cache_invalidation(self):
+		GetUserGroupIds(self.user)
+		self.user.groups.add(self.private)
+		self.assertEqual(sorted(GetUserGroupIds(self.user)), sorted([self.yse.id, self.private.id]))
+		self.private.user_set.remove(self.user)
+		self.assertEqual(GetUserGroupIds(self.user), [self.yse.id])
+		self.yse.user_set.clear()
+		self.assertEqual(GetUserGroupIds(self.user), [])
+
+		self.other.groups.add(self.private)
+		GetUserGroupIds(self.other)
+		self.private.delete()
+		self.assertEqual(GetUserGroupIds(self.other), [])
+
+	def test_allowed_photometry(self):
+		allowed = PhotometryService.GetAuthorizedTransientPhotometry_ByUser_ByTransient(self.user, self.transient.id)
+		self.assertEqual(sorted(p.id for p in allowed), sorted([self.phot[0].id, self.phot[1].id]))
+		allowed = PhotometryService.GetAuthorizedTransientPhotometry_ByUser(self.other)
+		self.assertEqual([p.id for p in allowed], [self.phot[0].id])
+
+	def test_services_share_context(self):
+		# the group lookup happens once, every service call after that is its own query
+		context = AuthorizationContext(self.user)
+		with self.assertNumQueries(5):
+			len(PhotometryService.GetAuthorizedTransientPhotometry_ByUser_ByTransient(context, self.transient.id))
+			len(PhotometryService.GetAuthorizedTransientPhotData_ByUser_ByTransient(context, self.transient.id))
+			len(SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(context, self.transient.id))
+			len(ObservingResourceService.GetAuthorizedToOResource_ByUser(context))
+		with self.assertNumQueries(4):
+			len(PhotometryService.GetAuthorizedTransientPhotometry_ByUser_ByTransient(context, self.transient.id))
+			len(PhotometryService.GetAuthorizedTransientPhotData_ByUser_ByTransient(context, self.transient.id))
+			len(SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(context, self.transient.id))
+			len(ObservingResourceService.GetAuthorizedToOResource_ByUser(context))
+
+	def test_download_data_queries(self):
+		url = '/download_data/%s/'%self.transient.slug
+		self.assertEqual(self.client.get(url).status_code, 200)
+		# the user's groups are cached by now, so no request looks them up again
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(url)
+		self.assertEqual(len(response.json()['2019abc']['photometry']), 2)
+		self.assertFalse([q for q in queries.captured_queries if 'auth_user_groups' in q['sql']])
+
+class FKResolverTests(YSETestCase):
+
+	def test_other_process(self):
+		tag = TransientTag.objects.create(name='TESS', **self.kw)
+		self.assertEqual(fk_resolver.get_pk(TransientTag,'TESS'), tag.id)
+		# renamed without signals, as another process's change looks from here
+		TransientTag.objects.filter(id=tag.id).update(name='TESS2')
+		with mock.patch.object(fk_resolver, 'version_check_seconds', 0):
+			self.assertEqual(fk_resolver.get_pk(TransientTag,'TESS'), tag.id)
+			# until that process bumps the table's version in the shared cache
+			cache.incr(fk_resolver.version_key(TransientTag))
+			self.assertIsNone(fk_resolver.get_pk(TransientTag,'TESS'))
+			self.assertEqual(fk_resolver.get_pk(TransientTag,'TESS2'), tag.id)
+
+class DashboardTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		kw = self.kw
+		self.statuses = {name:TransientStatus.objects.create(name=name, **kw) for name in
+						 ['New','FollowupRequested','Following','Watch','FollowupFinished','NeedsTemplate']}
+		obs_group = ObservationGroup.objects.create(name='YSE', **kw)
+		spec_class = TransientClass.objects.create(name='SN Ia', **kw)
+		host = Host.objects.create(ra=10., dec=-20., redshift=0.05, **kw)
+		self.transients = []
+		for i in range(60):
+			status = list(self.statuses.values())[i % 6]
+			self.transients += [Transient.objects.create(
+				name='2019a%02i'%i, ra=10.+i, dec=-20., status=status, obs_group=obs_group,
+				best_spec_class=spec_class, host=host if i % 2 else None, **kw)]
+
+	def transient_queries(self, queries):
+		# the table name is quoted differently by each database
+		return [q for q in queries.captured_queries if re.search(r'\bFROM\W+YSE_App_transient\b', q['sql'])]
+
+	def test_dashboard_queries(self):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/dashboard/')
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, '2019a00')
+		self.assertLess(len(queries.captured_queries), 20)
+		# the ids of every table's transients, then the transients on their first pages
+		transient_queries = self.transient_queries(queries)
+		self.assertEqual(len(transient_queries), 2)
+
+		# every table is cached now
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get('/dashboard/')
+		self.assertFalse(self.transient_queries(queries))
+
+	def test_dashboard_invalidation(self):
+		self.client.get('/dashboard/')
+		transient = self.transients[0]
+		transient.status = self.statuses['Watch']
+		transient.save()
+
+		# the New and Watch tables are rendered again, the others come from the cache
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get('/dashboard/')
+		transient_queries = self.transient_queries(queries)
+		self.assertEqual(len(transient_queries), 2)
+		self.assertIn('IN (%i, %i)'%tuple(sorted([self.statuses['New'].id,self.statuses['Watch'].id])),
+					  transient_queries[0]['sql'])
+		# the eleventh transient watched, and the oldest, is on the second page
+		self.assertNotContains(response, '2019a00<')
+		self.assertContains(self.client.get('/dashboard/?watchpage=2'), '2019a00<')
+
+	def test_ingest_update(self):
+		self.assertNotContains(self.client.get('/dashboard/'), 'SN II')
+		TransientClass.objects.create(name='SN II', **self.kw)
+		ingest_transients({'t0':{'name':'2019a00','best_spec_class':'SN II'}}, self.user)
+		self.assertContains(self.client.get('/dashboard/'), 'SN II')
+
+	def test_dashboard_pages(self):
+		for i in range(15):
+			Transient.objects.create(name='2019n%02i'%i, ra=10., dec=-20., status=self.statuses['New'],
+									 obs_group=self.transients[0].obs_group, **self.kw)
+		names = list(Transient.objects.filter(status=self.statuses['New']).order_by('-disc_date','-id').\
+					 values_list('name',flat=True))
+		self.assertEqual(len(names), 25)
+		# the last page, however it's asked for
+		for page in ['3','9','0']:
+			response = self.client.get('/dashboard/?newpage=%s'%page)
+			for name in names[20:]: self.assertContains(response, name+'<')
+			for name in names[:20]: self.assertNotContains(response, name+'<')
+		response = self.client.get('/dashboard/?newpage=2&newper_page=5')
+		for name in names[5:10]: self.assertContains(response, name+'<')
+		self.assertNotContains(response, names[10]+'<')
+
+		# the same order as a sorted table, which the database pages itself
+		response = self.client.get('/dashboard/?newpage=2&newsort=-disc_date')
+		for name in names[10:20]: self.assertContains(response, name+'<')
+
+class FollowupPageTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.status = FollowupStatus.objects.create(name='Requested', **self.kw)
+		transient_status = TransientStatus.objects.create(name='Following', **self.kw)
+		obs_group = ObservationGroup.objects.create(name='YSE', **self.kw)
+		self.transients = [Transient.objects.create(name='2019b%02i'%i, ra=10.+i, dec=-20., status=transient_status,
+													obs_group=obs_group, **self.kw) for i in range(20)]
+		self.n_telescopes = 0
+
+	def add_telescopes(self, n):
+		start,stop = timezone.now(),timezone.now()+datetime.timedelta(days=1)
+		for i in range(n):
+			telescope = self.create_telescope('Telescope %i'%self.n_telescopes)
+			self.n_telescopes += 1
+			resources = {'classical_resource':ClassicalResource.objects.create(
+							telescope=telescope, begin_date_valid=start, end_date_valid=stop, **self.kw),
+						 'too_resource':ToOResource.objects.create(
+							telescope=telescope, begin_date_valid=start, end_date_valid=stop,
+							awarded_too_hours=10, used_too_hours=0, **self.kw)}
+			for j,transient in enumerate(self.transients):
+				resource = 'classical_resource' if j % 2 else 'too_resource'
+				TransientFollowup.objects.create(transient=transient, status=self.status, valid_start=start,
+												 valid_stop=stop, **{resource:resources[resource]}, **self.kw)
+
+	def test_followup_queries(self):
+		# however many telescopes there are: the session, the user, the
+		# telescopes, every telescope's followup ids, the followups on the
+		# pages shown and the followup statuses
+		self.add_telescopes(3)
+		with self.assertNumQueries(6):
+			response = self.client.get('/followup/')
+		self.assertContains(response, 'Telescope 2')
+		self.assertContains(response, '2019b19<', count=3)
+
+		self.add_telescopes(7)
+		with self.assertNumQueries(6):
+			response = self.client.get('/followup/')
+		self.assertContains(response, 'Telescope 9')
+		self.assertContains(response, '2019b19<', count=10)
+		self.assertNotContains(response, '2019b09<')
+
+	def test_followup_order(self):
+		# a table searched for every followup lists them in the same order as one that isn't
+		self.add_telescopes(2)
+		names = lambda response: re.findall(r'2019b\d\d<', response.content.decode())
+		for query in ['','Telescope 1page=2']:
+			searched = '&'.join(q for q in [query,'Telescope 1-ex=2019b'] if q)
+			cached = names(self.client.get('/followup/?'+query))
+			self.assertEqual(len(cached), 20)
+			self.assertEqual(cached, names(self.client.get('/followup/?'+searched)))
+
+	def test_followup_search(self):
+		self.add_telescopes(2)
+		response = self.client.get('/followup/?Telescope 1-ex=2019b07')
+		self.assertContains(response, '2019b07')
+		self.assertNotContains(response, '2019b08<')
+
+class TransientDetailTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		for name in ['New','Following','Watch','Ignore']:
+			TransientStatus.objects.get_or_create(name=name, defaults=self.kw)
+		followup_status = FollowupStatus.objects.get_or_create(name='Requested', defaults=self.kw)[0]
+		task_status = TaskStatus.objects.get_or_create(name='Requested', defaults=self.kw)[0]
+		obs_group = ObservationGroup.objects.create(name='YSE', **self.kw)
+		telescope = self.create_telescope()
+		instrument = Instrument.objects.create(name='LRIS', telescope=telescope, **self.kw)
+		band = PhotometricBand.objects.create(name='r', instrument=instrument, **self.kw)
+		config = InstrumentConfig.objects.create(name='long slit', instrument=instrument, **self.kw)
+		self.transient = Transient.objects.create(name='2019xyz', ra=10., dec=-20., obs_group=obs_group,
+												  status=TransientStatus.objects.get(name='New'), **self.kw)
+
+		start,stop = timezone.now(),timezone.now()+datetime.timedelta(days=1)
+		resource = ToOResource.objects.create(telescope=telescope, begin_date_valid=start, end_date_valid=stop,
+											  awarded_too_hours=10, used_too_hours=0, **self.kw)
+		for i in range(3):
+			followup = TransientFollowup.objects.create(transient=self.transient, status=followup_status,
+														too_resource=resource, valid_start=start, valid_stop=stop, **self.kw)
+			for j in range(3):
+				TransientObservationTask.objects.create(followup=followup, instrument_config=config, status=task_status,
+														exposure_time=300, number_of_exposures=2, desired_obs_date=start, **self.kw)
+			Log.objects.create(transient=self.transient, comment='comment %i'%i, **self.kw)
+			AlternateTransientNames.objects.create(transient=self.transient, name='alt%i'%i, **self.kw)
+
+		self.instrument,self.obs_group,self.band = instrument,obs_group,band
+		photometry = TransientPhotometry.objects.create(transient=self.transient, instrument=instrument,
+														obs_group=obs_group, **self.kw)
+		TransientPhotData.objects.bulk_create([TransientPhotData(
+			photometry=photometry, band=band, obs_date=start-datetime.timedelta(hours=i), mag=18+i/5000.,
+			mag_err=0.05, discovery_point=False, **self.kw) for i in range(5000)])
+
+	def test_detail_queries(self):
+		url = '/transient_detail/%s/'%self.transient.slug
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(url)
+		self.assertContains(response, 'comment 2')
+		self.assertContains(response, '18.0')
+		# the photometry table comes later, on its own
+		self.assertNotContains(response, '18.2468')
+		self.assertLessEqual(len(queries.captured_queries), 35)
+
+		# the bundle is cached now
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(url)
+		self.assertFalse([q for q in queries.captured_queries if 'YSE_App_transientobservationtask' in q['sql']
+						  or 'YSE_App_transientphotdata' in q['sql']])
+
+		# a new comment shows up right away
+		Log.objects.create(transient=self.transient, comment='comment 3', **self.kw)
+		self.assertContains(self.client.get(url), 'comment 3')
+
+	def test_spectra_deferred(self):
+		spectrum = TransientSpectrum(transient=self.transient, instrument=self.instrument, obs_group=self.obs_group,
+									 ra=10., dec=-20., obs_date=timezone.now(), **self.kw)
+		spectrum.set_spec_data(np.linspace(3000,9000,20000), np.ones(20000))
+		spectrum.save()
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.client.get('/transient_detail/%s/'%self.transient.slug).status_code, 200)
+		self.assertFalse([q for q in queries.captured_queries if re.search(r'\bspec_data\b', q['sql'])])
+
+		# the cached bundle lists the spectrum without its data, which is read when it's asked for
+		spectrum, = cached_detail_bundle(self.transient, AuthorizationContext(self.user))['all_transient_spectra']
+		self.assertIn('spec_data', spectrum.get_deferred_fields())
+		self.assertEqual(len(spectrum.get_spec_data()['flux']), 20000)
+
+	def test_ingest_update(self):
+		# the cached spectra carry the transient they belong to
+		TransientSpectrum.objects.create(transient=self.transient, instrument=self.instrument, obs_group=self.obs_group,
+										 ra=10., dec=-20., obs_date=timezone.now(), **self.kw)
+		url = '/transient_detail/%s/'%self.transient.slug
+		self.assertIsNone(self.client.get(url).context['all_transient_spectra'][0].transient.redshift)
+		ingest_transients({'t0':{'name':'2019xyz','redshift':0.3}}, self.user)
+		self.assertEqual(self.client.get(url).context['all_transient_spectra'][0].transient.redshift, 0.3)
+
+	def test_enrichment_update(self):
+		TransientTag.objects.create(name='TESS', **self.kw)
+		url = '/transient_detail/%s/'%self.transient.slug
+		self.assertEqual(self.client.get(url).context['assigned_transient_tags'], [])
+		enrichment = RedshiftEnrichment()
+		self.assertEqual(run_batch(enrichment, claim_batch(enrichment,'test')), (1,0))
+		self.assertEqual([t.name for t in self.client.get(url).context['assigned_transient_tags']], ['TESS'])
+
+	def test_gw_candidate(self):
+		url = '/transient_detail/%s/'%self.transient.slug
+		self.transient.tags.add(TransientTag.objects.create(name='GW Candidate', **self.kw))
+		gw_candidate = GWCandidate.objects.create(field_name='f1', candidate_id='c1', name='2019xyz', transient=self.transient,
+												  websniff_url='http://example.org/old', **self.kw)
+		self.assertContains(self.client.get(url), 'http://example.org/old')
+
+		gw_candidate.websniff_url = 'http://example.org/new'
+		gw_candidate.save()
+		self.assertContains(self.client.get(url), 'http://example.org/new')
+		GWCandidateImage.objects.create(gw_candidate=gw_candidate, image_filename='http://example.org/img.png',
+										image_filter=self.band, **self.kw)
+		self.assertContains(self.client.get(url), 'http://example.org/img.png')
+
+	def test_photometry_panel(self):
+		with self.assertNumQueries(5):
+			response = self.client.get('/transient_detail/%s/photometry/'%self.transient.slug)
+		self.assertContains(response, '<td>LRIS</td>', count=5000)
+
+class ObservabilityTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		status = TransientStatus.objects.get_or_create(name='New', defaults=self.kw)[0]
+		self.obs_group = ObservationGroup.objects.create(name='YSE', **self.kw)
+		self.night_type = ClassicalNightType.objects.create(name='Full', **self.kw)
+		self.transient = Transient.objects.create(name='2019xyz', ra=10., dec=-20., obs_group=self.obs_group,
+												  status=status, **self.kw)
+
+	def add_telescope(self, name):
+		# three observing nights coming up and two ToO resources, one of them used up
+		telescope = self.create_telescope(name)
+		now = timezone.now()
+		start,stop = now-datetime.timedelta(days=10),now+datetime.timedelta(days=10)
+		resource = ClassicalResource.objects.create(telescope=telescope, begin_date_valid=start, end_date_valid=stop, **self.kw)
+		for days in range(3):
+			ClassicalObservingDate.objects.create(resource=resource, night_type=self.night_type,
+												  obs_date=now+datetime.timedelta(days=days), **self.kw)
+		for used in [0,10]:
+			ToOResource.objects.create(telescope=telescope, begin_date_valid=start, end_date_valid=stop,
+									   awarded_too_hours=10, used_too_hours=used, **self.kw)
+
+	def test_one_request(self):
+		self.add_telescope('Keck I')
+		url = '/observability/?transients=%i'%self.transient.id
+		# the user's groups are cached after the first request
+		self.client.get(url)
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(url)
+		n_queries = len(queries.captured_queries)
+
+		# 25 resources in all, in the same number of queries
+		for i in range(4):
+			self.add_telescope('Keck %i'%(i+2))
+		# the new nights' ephemerides are stored by the first request to ask about them
+		self.client.get(url)
+		with self.assertNumQueries(n_queries):
+			response = self.client.get(url)
+		payload = response.json()
+		transient = payload['transients'][str(self.transient.id)]
+		self.assertEqual(len(transient['obs_nights']), 15)
+		self.assertEqual(len(transient['too_resources']), 5)
+		self.assertEqual(len(payload['too_resources']), 5)
+		for row in list(transient['obs_nights'].values()) + list(transient['too_resources'].values()):
+			self.assertEqual(sorted(row), ['min_airmass','moon_angle','observable','rise_time','set_time'])
+
+	def test_bad_transients(self):
+		self.assertEqual(self.client.get('/observability/?transients=x').status_code, 400)
+		self.assertEqual(self.client.get('/observability/?transients=0').status_code, 404)
+
+class EphemerisTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.telescope = self.create_telescope()
+
+	def test_precompute(self):
+		start = datetime.date(2019,10,20)
+		self.assertEqual(precompute_ephemerides(start=start, ndays=3), 3)
+		self.assertEqual(precompute_ephemerides(start=start, ndays=3), 0)
+		ephemeris = get_ephemeris(self.telescope, '2019-10-21 00:00:00+00:00')
+		self.assertEqual(ephemeris.date, datetime.date(2019,10,21))
+		self.assertTrue(ephemeris.sun_evening < ephemeris.night_start < ephemeris.night_end < ephemeris.sun_morning)
+
+		# a telescope that moves gets its nights worked out again
+		self.telescope.latitude = -30.2
+		self.telescope.save()
+		ephemeris = get_ephemeris(self.telescope, start)
+		self.assertEqual(ephemeris.latitude, -30.2)
+		self.assertEqual(SiteNightEphemeris.objects.filter(telescope=self.telescope).count(), 3)
+
+class IngestJobTests(YSETestCase):
+
+	def upload(self, ntransients, npoints=200):
+		# the shape of an add_transient upload, noupdatestatus last
+		points = {'%i'%i:{'obs_date':'2019-10-01T00:00:00','band':'r','mag':18.+i/1000.,'mag_err':0.05,
+						  'flux':None,'flux_err':None} for i in range(npoints)}
+		transients = {'t%i'%i:{'name':'2019x%i'%i,'ra':10.,'dec':-20.,
+							   'transientphotometry':{'ps1':{'instrument':'GPC1','photdata':points}}}
+					  for i in range(ntransients)}
+		transients['noupdatestatus'] = True
+		return json.dumps(transients).encode('utf-8')
+
+	def test_items(self):
+		response = queue_ingest_job('add_transient',iter_json_object(io.BytesIO(self.upload(120,5))),self.user)
+		self.assertEqual(response.status_code, 202)
+		job = IngestJob.objects.get()
+		self.assertEqual(job.n_items, 120)
+		self.assertTrue(job.noupdatestatus)
+		items = list(JobItems(job))
+		self.assertEqual(items[0], ('noupdatestatus',True))
+		self.assertEqual([k for k,t in items[1:]], ['t%i'%i for i in range(120)])
+		self.assertEqual(items[-1][1]['name'], '2019x119')
+
+	def test_rejected(self):
+		body = json.dumps({'t0':{'name':'2019x0'},'t1':{'ra':10.}}).encode('utf-8')
+		response = queue_ingest_job('add_transient',iter_json_object(io.BytesIO(body)),self.user)
+		self.assertEqual(response.status_code, 200)
+		self.assertFalse(IngestJob.objects.exists())
+		self.assertFalse(IngestJobItem.objects.exists())
+
+	def peak_memory(self, ntransients):
+		"""peak memory (bytes) while queueing an upload of ntransients and while reading it back"""
+		body = self.upload(ntransients)
+		tracemalloc.start()
+		queue_ingest_job('add_transient',iter_json_object(io.BytesIO(body)),self.user)
+		queue_peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+		job = IngestJob.objects.latest('id')
+		tracemalloc.start()
+		for key,transient in JobItems(job): pass
+		read_peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		return queue_peak,read_peak
+
+	def test_memory(self):
+		# neither queueing an upload nor reading it back holds more than a
+		# chunk of it, so four times the upload takes no more memory
+		self.peak_memory(10)
+		peaks = self.peak_memory(100)
+		for peak,large_peak in zip(peaks,self.peak_memory(400)):
+			self.assertLess(large_peak, 1.5*peak)
+
+	def test_requeue(self):
+		TransientStatus.objects.create(name='New', **self.kw)
+		ObservationGroup.objects.create(name='YSE', **self.kw)
+		transients = {'t%i'%i:{'name':'2019y%i'%i,'ra':10.,'dec':-20.,'status':'New','obs_group':'YSE'}
+					  for i in range(6)}
+		# add_transient can't take tags yet, so this one fails
+		transients['t4']['tags'] = ['TESS']
+		queue_ingest_job('add_transient',iter_json_object(io.BytesIO(json.dumps(transients).encode('utf-8'))),self.user)
+
+		# a worker that dies after three transients leaves its job Running
+		def dying_ingest(items, user, progress=None, ingest_job=None):
+			ingest_transients(itertools.islice(items,3),user,progress=progress,ingest_job=ingest_job)
+			raise KeyboardInterrupt
+		with mock.patch.dict('YSE_App.ingest_queue.ingest_functions', {'add_transient':dying_ingest}):
+			with self.assertRaises(KeyboardInterrupt):
+				run_job(claim_job('worker 1'))
+		job = IngestJob.objects.get()
+		self.assertEqual((job.status,job.n_done), ('Running',3))
+
+		# the next worker picks it up after the third
+		IngestJob.objects.update(modified_date=timezone.now()-datetime.timedelta(hours=2))
+		self.assertEqual(requeue_stale_jobs(60), 1)
+		self.assertEqual([key for key,transient in JobItems(IngestJob.objects.get())], ['t3','t4','t5'])
+		job = run_job(claim_job('worker 2'))
+		self.assertEqual((job.status,job.n_done,job.n_failed), ('Done',6,1))
+
+		results = self.client.get('/ingest_job/%i/'%job.id).json()
+		self.assertEqual(results['succeeded'], ['2019y0','2019y1','2019y2','2019y3','2019y5'])
+		self.assertEqual(list(results['failed'].keys()), ['2019y4'])
+
+class PhotMergeTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		kw = self.kw
+		status = TransientStatus.objects.create(name='New', **kw)
+		obs_group = ObservationGroup.objects.create(name='YSE', **kw)
+		instrument = Instrument.objects.create(name='GPC1', telescope=self.create_telescope(), **kw)
+		for band in ['g','r']:
+			PhotometricBand.objects.create(name=band, instrument=instrument, **kw)
+		transient = Transient.objects.create(name='2019abc', ra=10., dec=-20., status=status, obs_group=obs_group, **kw)
+		self.photometry = TransientPhotometry.objects.create(transient=transient, instrument=instrument,
+															 obs_group=obs_group, **kw)
+		# two bands on each of three nights
+		self.points = [{'obs_date':'2019-10-0%iT10:00:00'%day,'band':band,'flux':None,'flux_err':None,
+						'flux_zero_point':None,'mag':18.+day/10.,'mag_err':0.05,'forced':None,'diffim':None,
+						'data_quality':None,'discovery_point':day == 1}
+					   for day in [1,2,3] for band in ['g','r']]
+
+	def merge(self, points):
+		return merge_transient_phot(TransientPhotometry.objects.get(id=self.photometry.id),
+									points_to_columns(points), 'GPC1', self.user)
+
+	def test_permuted_upload(self):
+		self.assertEqual(self.merge(self.points), (6,0))
+		# the same points in another order, as a dict keyed by obstime may
+		# give them, are recognised without reading the existing ones
+		photometry = TransientPhotometry.objects.get(id=self.photometry.id)
+		with self.assertNumQueries(0):
+			self.assertEqual(merge_transient_phot(photometry, points_to_columns(self.points[::-1]), 'GPC1', self.user),
+							 (0,0))
+		self.assertEqual(self.merge(self.points[3:]+self.points[:3]), (0,0))
+
+		# a changed point makes it a different upload
+		self.points[0]['mag'] = 17.
+		self.assertEqual(self.merge(self.points), (0,0))
+		self.assertNotEqual(TransientPhotometry.objects.get(id=self.photometry.id).content_hash, photometry.content_hash)
+		self.assertEqual(TransientPhotData.objects.filter(photometry=self.photometry).count(), 6)
+
+class LightCurveSummaryTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		status = TransientStatus.objects.create(name='New', **self.kw)
+		obs_group = ObservationGroup.objects.create(name='YSE', **self.kw)
+		instrument = Instrument.objects.create(name='LRIS', telescope=self.create_telescope(), **self.kw)
+		self.band = PhotometricBand.objects.create(name='r', instrument=instrument, **self.kw)
+		self.transient = Transient.objects.create(name='2019abc', ra=10., dec=-20., status=status, obs_group=obs_group, **self.kw)
+		self.photometry = TransientPhotometry.objects.create(transient=self.transient, instrument=instrument,
+															 obs_group=obs_group, **self.kw)
+		self.start = timezone.now()-datetime.timedelta(days=30)
+
+	def point(self, days, mag, discovery_point=False):
+		return TransientPhotData(photometry=self.photometry, band=self.band, obs_date=self.start+datetime.timedelta(days=days),
+								 mag=mag, mag_err=0.05, discovery_point=discovery_point, **self.kw)
+
+	def summary(self):
+		return TransientLightCurveSummary.objects.get(transient=self.transient)
+
+	def test_create_delete(self):
+		first = self.point(0,19.,discovery_point=True)
+		first.save()
+		summary = self.summary()
+		self.assertEqual((summary.n_detections,summary.recent_mag,summary.disc_mag,summary.peak_mag), (1,19.,19.,19.))
+
+		latest = self.point(5,18.)
+		latest.save()
+		summary = self.summary()
+		self.assertEqual((summary.n_detections,summary.recent_mag,summary.peak_mag), (2,18.,18.))
+
+		# the recent and peak point goes, so the summary is worked out again
+		latest.delete()
+		summary = self.summary()
+		self.assertEqual((summary.n_detections,summary.recent_mag,summary.peak_mag), (1,19.,19.))
+
+		# a point that is neither just takes a detection off
+		middle = self.point(2,19.5)
+		middle.save()
+		self.assertEqual(self.summary().n_detections, 2)
+		middle.delete()
+		summary = self.summary()
+		self.assertEqual((summary.n_detections,summary.recent_mag,summary.disc_mag), (1,19.,19.))
+
+	def bulk_delete_queries(self, n, latest):
+		"""
+		the queries taken to delete n of a light curve's points at once: the
+		latest ones, or the oldest after the discovery point
+		"""
+		TransientPhotData.objects.filter(photometry=self.photometry).delete()
+		# fading, so the discovery point is also the peak
+		TransientPhotData.objects.bulk_create([self.point(i,18.+i/10.,discovery_point=i == 0) for i in range(30)])
+		rebuild_summaries([self.transient.id])
+		points = TransientPhotData.objects.filter(photometry=self.photometry)
+		if latest: ids = list(points.order_by('-obs_date').values_list('id',flat=True)[:n])
+		else: ids = list(points.order_by('obs_date').values_list('id',flat=True)[1:n+1])
+		with CaptureQueriesContext(connection) as queries:
+			TransientPhotData.objects.filter(id__in=ids).delete()
+		self.assertEqual(self.summary().n_detections, 30-n)
+		return len(queries.captured_queries)
+
+	def test_bulk_delete(self):
+		self.assertEqual(self.bulk_delete_queries(2,False), self.bulk_delete_queries(20,False))
+		self.assertEqual(self.bulk_delete_queries(2,True), self.bulk_delete_queries(20,True))
+		summary = self.summary()
+		self.assertEqual((summary.recent_mag,summary.peak_mag,summary.disc_mag), (18.9,18.,18.))
+
+	def test_photometry_delete(self):
+		self.point(0,19.).save()
+		self.point(1,18.).save()
+		self.photometry.delete()
+		self.assertEqual(self.summary().n_detections, 0)
+		self.assertIsNone(self.summary().recent_mag)
+
+class RedshiftEnrichment(Enrichment):
+	# takes over the queued TESS rows
+	name = 'tess'
+
+	def run(self, transients):
+		return {t.id:EnrichmentResult(tags=['TESS'],fields={'redshift':0.2}) for t in transients}
+
+class SearchTests(YSETestCase):
+
+	def setUp(self):
+		super().setUp()
+		status = TransientStatus.objects.create(name='New', **self.kw)
+		TransientStatus.objects.create(name='Following', **self.kw)
+		obs_group = ObservationGroup.objects.create(name='YSE', **self.kw)
+		TransientTag.objects.create(name='TESS', **self.kw)
+		host = Host.objects.create(name='NGC 1234', ra=10., dec=-20., redshift=0.05, **self.kw)
+		self.transient = Transient.objects.create(name='2019abc', ra=10., dec=-20., status=status, obs_group=obs_group,
+												  host=host, **self.kw)
+		self.other = Transient.objects.create(name='2019abd', ra=11., dec=-20., status=status, obs_group=obs_group, **self.kw)
+		AlternateTransientNames.objects.create(transient=self.other, name='ATLAS19xyz', **self.kw)
+
+	def found(self, value):
+		return sorted(t.name for t in search_transients(Transient.objects.all(), value))
+
+	def test_parse_query(self):
+		self.assertEqual(parse_query('SN2019abc Status:Following z>0.05 redshift=0.1 foo:bar'),
+						 [(None,':','sn2019abc'),('status',':','following'),('z','>','0.05'),
+						  ('z',':','0.1'),(None,':','foo:bar')])
+		self.assertEqual(parse_query('mag<=19.5 start>2019-10-01', extra_compare={'start':'valid_start'}),
+						 [('mag','<=','19.5'),('start','>','2019-10-01')])
+
+	def test_search(self):
+		self.assertEqual(self.found('2019ab'), ['2019abc','2019abd'])
+		self.assertEqual(self.found('abc'), ['2019abc'])
+		self.assertEqual(self.found('atlas19'), ['2019abd'])
+		self.assertEqual(self.found('host:ngc 2019'), ['2019abc'])
+		# the host's redshift stands in for the transient's
+		self.assertEqual(self.found('z>0.01'), ['2019abc'])
+		self.assertEqual(self.found('status:following'), [])
+		self.assertEqual(self.found('z>abc'), [])
+
+	def test_search_view(self):
+		response = self.client.get('/dashboard/?new-ex=abd')
+		self.assertContains(response, '2019abd')
+		self.assertNotContains(response, '2019abc')
+
+	def test_ingest_update(self):
+		# an existing transient is changed with update(), and still indexed
+		ingest_transients({'t0':{'name':'2019abd','ra':11.,'dec':-20.,'redshift':0.3}}, self.user)
+		self.assertEqual(self.found('z:0.3'), ['2019abd'])
+		ingest_transients({'t0':{'name':'2019abc','ra':10.,'dec':-20.,'host':{'name':'NGC 1234','redshift':0.07}}}, self.user)
+		self.assertEqual(self.found('z:0.07'), ['2019abc'])
+
+	def test_enrichment_update(self):
+		enrichment = RedshiftEnrichment()
+		self.assertEqual(run_batch(enrichment, claim_batch(enrichment,'test')), (2,0))
+		self.assertEqual(self.found('tag:tess z:0.2'), ['2019abc','2019abd'])
+
+def ecliptic_to_radec(lon, lat):
+	# the inverse of tess_obs.radec_to_ecliptic_vec
+	lon,lat = np.radians(lon),np.radians(lat)
+	x,y,z = np.cos(lat)*np.cos(lon),np.cos(lat)*np.sin(lon),np.sin(lat)
+	e = tess_obs.obliquity
+	ra = np.degrees(np.arctan2(np.cos(e)*y - np.sin(e)*z,x)) % 360
+	return ra,np.degrees(np.arcsin(np.sin(e)*y + np.cos(e)*z))
+
+class TESSFootprintTests(TestCase):
+
+	def camera(self, sector, dlon, lat):
+		"""the camera of sector that saw the point dlon, lat (deg) from the sector's boresight meridian"""
+		number,start,end,lon,boresight_lat = tess_obs.sector_table()
+		i = list(number).index(sector)
+		return tess_obs.tess_cameras(*ecliptic_to_radec(lon[i]+dlon,lat))[0][i]
+
+	def test_cameras(self):
+		# in a sector pointed 54 deg from the ecliptic, cameras 1-4 are centred
+		# 18, 42, 66 and 90 deg from it, towards the pole the sector looks at
+		for sector,sign in [(1,-1),(17,1)]:
+			for camera,lat in enumerate([18,42,66,89.9],1):
+				self.assertEqual(self.camera(sector,0,sign*lat), camera)
+
+	def test_camera_edges(self):
+		# along the meridian: camera 1 starts 6 deg from the ecliptic and meets camera 2 at 30
+		self.assertEqual(self.camera(1,0,-5.5), 0)
+		self.assertEqual(self.camera(1,0,-6.5), 1)
+		self.assertEqual(self.camera(1,0,-29.5), 1)
+		self.assertEqual(self.camera(1,0,-30.5), 2)
+		# across it: each camera is 24 deg wide on the sky
+		scale = 1/np.cos(np.radians(18))
+		self.assertEqual(self.camera(1,11.5*scale,-18), 1)
+		self.assertEqual(self.camera(1,-11.5*scale,-18), 1)
+		self.assertEqual(self.camera(1,12.5*scale,-18), 0)
+		self.assertEqual(self.camera(1,-12.5*scale,-18), 0)
+
+	def test_sectors_observed(self):
+		self.assertEqual(tess_obs.tess_sectors_observed(94.1105250,-21.3756833), [(6,2)])
+		self.assertEqual(tess_obs.tess_sectors_observed(65.13394,-38.96065), [(4,3),(5,3)])
+		self.assertEqual(tess_obs.tess_sectors_observed(202.884383,-12.4804833), [])
+		# the south ecliptic pole is in camera 4 all through the first year
+		self.assertEqual(tess_obs.tess_sectors_observed(90.,-66.56), [(s,4) for s in range(1,14)])
+
+	def test_date_window(self):
+		# only sector 1 saw this point; it counts from 20 days before the
+		# sector starts to 100 days after it ends
+		ra,dec = ecliptic_to_radec(315.42,-18)
+		number,start,end,lon,lat = tess_obs.sector_table()
+		for jd,observed in [(start[0]-19,True),(start[0]-21,False),(end[0]+99,True),(end[0]+101,False)]:
+			self.assertEqual(tess_obs.tess_obs(ra,dec,jd), observed)
+		self.assertEqual(tess_obs.tess_obs_batch([ra,ra],[dec,dec],[start[0],end[0]+101]).tolist(), [True,False])
+		self.assertTrue(tess_obs.tess_obs(94.1105250,-21.3756833,2458481.52282))
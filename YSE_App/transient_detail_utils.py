@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+from .models import *
+from .data import PhotometryService, SpectraService
+from .common.detail_cache import detail_version, detail_cache_seconds
+from .common.fingerprint import fingerprint
+
+# the transient detail page.  everything it shows about the transient besides
+# the transient's own row is gathered by detail_bundle in a fixed handful of
+# queries, however many followups, comments or photometry points there are,
+# and cached until one of them changes (see YSE_App/common/detail_cache.py).
+# the photometry table and the observing resources are fragments the page
+# fetches once it's loaded
+
+def observation_tasks():
+	return TransientObservationTask.objects.select_related(
+		'status','modified_by','instrument_config__instrument__telescope__observatory').\
+		prefetch_related('instrument_config__configelement_set')
+
+def detail_bundle(transient, auth_context):
+	"""
+	{name: value} of the comments, names, tags, followups, photometry and
+	spectra that the user behind auth_context may see of transient
+	"""
+	bundle = {}
+	bundle['alt_names'] = list(AlternateTransientNames.objects.filter(transient_id=transient.id))
+	bundle['logs'] = list(Log.objects.filter(transient_id=transient.id).select_related('created_by'))
+	bundle['assigned_transient_tags'] = list(transient.tags.select_related('color'))
+
+	followups = list(TransientFollowup.objects.filter(transient_id=transient.id).select_related(
+		'status','modified_by','too_resource__telescope','classical_resource__telescope',
+		'queued_resource__telescope').prefetch_related(
+			Prefetch('transientobservationtask_set',queryset=observation_tasks())))
+	for f in followups:
+		f.resource = f.classical_resource or f.too_resource or f.queued_resource
+	bundle['followups'] = followups if len(followups) else None
+
+	# the latest point and the discovery point: the latest flagged as such,
+	# or else the first with a magnitude
+	photdata = PhotometryService.GetAuthorizedTransientPhotData_ByUser_ByTransient(auth_context, transient.id)
+	bundle['n_photdata'] = photdata.count()
+	bundle['lastphotdata'] = photdata.select_related('band').order_by('-obs_date').first()
+	bundle['firstphotdata'] = photdata.filter(discovery_point=True).select_related('band').order_by('-obs_date').first() or \
+		photdata.filter(mag__isnull=False).select_related('band').order_by('obs_date').first()
+
+	# the page only lists the spectra, the plots fetch their data themselves; a
+	# spectrum's spec_data is read from the database if anything asks for it
+	bundle['all_transient_spectra'] = list(SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(
+		auth_context, transient.id).select_related('transient','instrument').defer('spec_data'))
+
+	bundle['gw_candidate'],bundle['gw_images'] = None,None
+	if 'GW Candidate' in [t.name for t in bundle['assigned_transient_tags']]:
+		bundle['gw_candidate'] = GWCandidate.objects.filter(name=transient.name).first()
+		if bundle['gw_candidate'] is not None:
+			bundle['gw_images'] = list(GWCandidateImage.objects.filter(
+				gw_candidate__name=bundle['gw_candidate'].name).select_related('image_filter__instrument'))
+	return bundle
+
+def detail_key(transient_id, auth_context):
+	# people in the same groups are shown the same photometry and spectra
+	return 'transient_detail:%s:%s:%s'%(transient_id,detail_version(transient_id),
+										fingerprint(sorted(auth_context.group_ids)))
+
+def cached_detail_bundle(transient, auth_context):
+	"""detail_bundle, from the cache when nothing it shows has changed since"""
+	key = detail_key(transient.id,auth_context)
+	bundle = cache.get(key)
+	if bundle is None:
+		bundle = detail_bundle(transient,auth_context)
+		cache.set(key,bundle,detail_cache_seconds)
+	return bundle
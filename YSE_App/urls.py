@@ -6,6 +6,7 @@ from django.contrib import admin
 from rest_framework.urlpatterns import format_suffix_patterns
 from rest_framework.routers import DefaultRouter
 from rest_framework.schemas import get_schema_view
+from rest_framework.authtoken.views import obtain_auth_token
 
 from . import views, view_utils, data_utils, table_utils
 from . import api_views
@@ -29,6 +30,8 @@ urlpatterns = [
     url(r'^transient_edit/$', views.transient_edit, name='transient_edit'),
     url(r'^transient_edit/(?P<transient_id>[0-9]+)/$', views.transient_edit, name='transient_edit'),
     url(r'^transient_detail/(?P<slug>[a-zA-Z0-9_-]+)/$', views.transient_detail, name='transient_detail'),
+    url(r'^transient_detail/(?P<slug>[a-zA-Z0-9_-]+)/photometry/$', views.transient_photometry_panel, name='transient_photometry_panel'),
+    url(r'^transient_detail/(?P<slug>[a-zA-Z0-9_-]+)/resources/$', views.transient_resources_panel, name='transient_resources_panel'),
 
     url(r'^observing_calendar/$', views.observing_calendar, name='observing_calendar'),
     url(r'^observing_night/(?P<telescope>.*)/(?P<obs_date>[a-zA-Z0-9_-]+)/$', views.observing_night, name='observing_night'),
@@ -36,8 +39,11 @@ urlpatterns = [
 	url(r'^get_transient/(?P<slug>[a-zA-Z0-9_-]+)/$', data_utils.get_transient, name='get_transient'),
 	url(r'^add_transient/', data_utils.add_transient, name='add_transient'),
 	url(r'^add_gw_candidate/', data_utils.add_gw_candidate, name='add_gw_candidate'),
+	url(r'^ingest_job/(?P<job_id>[0-9]+)/$', data_utils.ingest_job, name='ingest_job'),
 	url(r'^add_transient_phot/', data_utils.add_transient_phot, name='add_transient_phot'),
+	url(r'^add_transient_phot_batch/', data_utils.add_transient_phot_batch, name='add_transient_phot_batch'),
 	url(r'^add_transient_spec/', data_utils.add_transient_spec, name='add_transient_spec'),
+	url(r'^crossmatch/', data_utils.crossmatch_transients, name='crossmatch'),
 	url(r'^get_host/(?P<ra>\d+\.\d+)/(?P<dec>[+-]?\d+\.\d+)/(?P<sep>\d+\.?\d*)/$', data_utils.get_host, name='get_host'),
 	url(r'^download_data/(?P<slug>[a-zA-Z0-9_-]+)/$', views.download_data, name='download_data'),
 	url(r'^download_photometry/(?P<slug>[a-zA-Z0-9_-]+)/$', views.download_photometry, name='download_photometry'),
@@ -78,6 +84,7 @@ urlpatterns = [
 
 	url(r'^delta_too_hours/(?P<transient_id>[0-9]+)/(?P<too_id>[a-zA-Z0-9_-]+)',
 		view_utils.delta_too_hours, name='delta_too_hours'),
+	url(r'^observability/$', view_utils.observability, name='observability'),
 
 	url(r'^get_ps1_image/(?P<transient_id>[0-9]+)',
 		view_utils.get_ps1_image, name='get_ps1_image'),
@@ -159,6 +166,8 @@ router.register(r'gwcandidateimages', api_views.GWCandidateImageViewSet)
 # Login/Logout
 api_url_patterns = [url(r'^api/', include(router.urls)),
 					url(r'^api/schema/$', schema_view),
-					url(r'^api-auth/', include('rest_framework.urls', namespace='rest_framework')),]
+					url(r'^api-auth/', include('rest_framework.urls', namespace='rest_framework')),
+					# POST username/password for the key to send as "Authorization: Token <key>"
+					url(r'^api-token-auth/', obtain_auth_token, name='api_token_auth'),]
 
 urlpatterns += api_url_patterns
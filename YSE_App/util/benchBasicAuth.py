@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# requests per second through login_or_basic_auth_required, the way the
+# ingest bots call it.  point it at a running YSE_PZ and compare basic auth
+# (one password hash per credential cache period) with token auth (none);
+# run it against a checkout without the credential cache for the "before"
+# numbers, where every basic-auth request hashed the password twice
+# python benchBasicAuth.py --url http://localhost:8000 --slug 2019abc --user bot --password ... --token ...
+
+import time
+import requests
+
+def bench(url, auth=None, headers=None, nrequests=200):
+	"""requests/s for nrequests sequential GETs of url on one connection"""
+	session = requests.Session()
+	r = session.get(url,auth=auth,headers=headers)
+	if r.status_code != 200:
+		raise RuntimeError('GET %s returned %i: %s'%(url,r.status_code,r.text[:200]))
+
+	tstart = time.time()
+	for i in range(nrequests):
+		session.get(url,auth=auth,headers=headers)
+	return nrequests/(time.time()-tstart)
+
+def main(baseurl, slug, user, password, token, nrequests):
+	url = '%s/get_transient/%s/'%(baseurl.rstrip('/'),slug)
+	print('%-8s %10s'%('auth','req/s'))
+	if user:
+		print('%-8s %10.1f'%('basic',bench(url,auth=(user,password),nrequests=nrequests)))
+	if token:
+		print('%-8s %10.1f'%('token',bench(url,headers={'Authorization':'Token %s'%token},nrequests=nrequests)))
+
+if __name__ == "__main__":
+
+	import optparse
+
+	usagestring='benchBasicAuth.py [options]'
+	parser = optparse.OptionParser(usage=usagestring)
+	parser.add_option('--url', default='http://localhost:8000', type="string",
+					  help='base URL of the YSE_PZ server')
+	parser.add_option('--slug', default=None, type="string",
+					  help='slug of an existing transient to GET from /get_transient/')
+	parser.add_option('--user', default=None, type="string",
+					  help='username for basic auth')
+	parser.add_option('--password', default=None, type="string",
+					  help='password for basic auth')
+	parser.add_option('--token', default=None, type="string",
+					  help='API token (from /api-token-auth/) for token auth')
+	parser.add_option('--nrequests', default=200, type="int",
+					  help='requests per measurement')
+	options, args = parser.parse_args()
+
+	if not options.slug:
+		parser.error('--slug is required')
+	main(options.url,options.slug,options.user,options.password,options.token,options.nrequests)
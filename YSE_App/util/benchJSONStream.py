@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# peak memory of json.load vs. YSE_App.common.json_stream.iter_json_object
+# on add_transient-style uploads of increasing size.  every measurement runs
+# in a fresh process so the peak RSS numbers don't contaminate each other
+# python benchJSONStream.py --ntransients 1000,4000,16000 --npoints 100
+
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import subprocess
+import importlib.util
+
+def load_json_stream():
+	# load the module by path so the benchmark runs without django settings
+	path = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','common','json_stream.py')
+	spec = importlib.util.spec_from_file_location('json_stream',path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+def write_payload(filename, ntransients, npoints):
+	"""an add_transient upload with ntransients transients of npoints photometry points each"""
+	with open(filename,'w') as fout:
+		fout.write('{"noupdatestatus": true')
+		for i in range(ntransients):
+			photdata = {'%i_g'%j:{'obs_date':'2019-10-01T00:00:00','band':'g','groups':[],
+								  'mag':20.0+j*0.001,'mag_err':0.05,'flux':None,'flux_err':None,
+								  'data_quality':0,'forced':1,'diffim':1,'flux_zero_point':27.5,
+								  'discovery_point':0} for j in range(npoints)}
+			transient = {'name':'bench%07i'%i,'ra':10.0,'dec':-10.0,'status':'New','obs_group':'YSE',
+						 'transientphotometry':{'YSE':{'instrument':'GPC1','obs_group':'YSE','photdata':photdata}}}
+			fout.write(', %s: %s'%(json.dumps('bench%07i'%i),json.dumps(transient)))
+		fout.write('}')
+
+def measure(filename, mode):
+	"""parse filename and print 'npoints seconds peak_rss_MB' for this process"""
+	json_stream = load_json_stream()
+	rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	t0 = time.time()
+	npoints = 0
+	with open(filename,'rb') as fin:
+		if mode == 'json':
+			items = json.load(fin).items()
+		else:
+			items = json_stream.iter_json_object(fin)
+		for key,transient in items:
+			if key == 'noupdatestatus': continue
+			npoints += len(transient['transientphotometry']['YSE']['photdata'])
+	t1 = time.time()
+
+	# ru_maxrss is kB on linux
+	rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	print('%i %.3f %.1f'%(npoints,t1-t0,(rss1-rss0)/1024.))
+
+def main(ntransients, npoints):
+	print('%12s %10s %8s %12s %12s %14s %14s'%(
+		'ntransients','payloadMB','npoints','json.load s','stream s','json.load MB','stream MB'))
+	for n in ntransients:
+		fd,filename = tempfile.mkstemp(suffix='.json')
+		os.close(fd)
+		try:
+			write_payload(filename,n,npoints)
+			results = {}
+			for mode in ('json','stream'):
+				out = subprocess.check_output([sys.executable,os.path.abspath(__file__),'--measure',mode,filename])
+				results[mode] = out.decode('utf-8').split()
+			print('%12i %10.1f %8s %12s %12s %14s %14s'%(
+				n,os.path.getsize(filename)/1024.**2,results['json'][0],
+				results['json'][1],results['stream'][1],results['json'][2],results['stream'][2]))
+		finally:
+			os.remove(filename)
+
+if __name__ == "__main__":
+
+	import optparse
+
+	usagestring='benchJSONStream.py [options]'
+	parser = optparse.OptionParser(usage=usagestring)
+	parser.add_option('--ntransients', default='500,2000,8000', type="string",
+					  help='comma-separated list of upload sizes, in transients')
+	parser.add_option('--npoints', default=100, type="int",
+					  help='photometry points per transient')
+	parser.add_option('--measure', default=None, type="string",
+					  help='internal: run one measurement (json or stream) on the file given as argument')
+	options, args = parser.parse_args()
+
+	if options.measure:
+		measure(args[0],options.measure)
+	else:
+		main([int(n) for n in options.ntransients.split(',')],options.npoints)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# rise/set times and moon angles for a night's worth of targets from
+# YSE_App.common.observability vs. astroplan's Observer one target at a time,
+# the way ObsNightFollowupTable and the rise_time/set_time endpoints used to.
+# prints both timings and the largest difference in the rise and set times
+# python benchObservability.py --ntargets 100 --date 2019-10-20 --lat 20.7 --lon -156.25 --elev 3000
+
+import os
+import time
+import warnings
+import importlib.util
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import EarthLocation, SkyCoord
+from astroplan import Observer
+
+def load_observability():
+	# load the module by path so the benchmark runs without django settings
+	path = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','common','observability.py')
+	spec = importlib.util.spec_from_file_location('observability',path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+def random_targets(ntargets, seed=1):
+	"""ra, dec in degrees of ntargets spread evenly over the sky north of dec -60"""
+	rng = np.random.RandomState(seed)
+	return rng.uniform(0,360,ntargets),np.degrees(np.arcsin(rng.uniform(-0.87,1,ntargets)))
+
+def astroplan_times(lat, lon, elev, tme, ra, dec):
+	tel = Observer(location=EarthLocation.from_geodetic(lon*u.deg,lat*u.deg,elev*u.m),timezone="UTC")
+	times = []
+	for r,d in zip(ra,dec):
+		sc = SkyCoord(r,d,unit=u.deg)
+		times += [(tel.target_rise_time(tme,sc,horizon=18*u.deg,which="previous"),
+				   tel.target_set_time(tme,sc,horizon=18*u.deg,which="previous"))]
+	return times
+
+def max_difference(engine_times, astroplan_times):
+	"""largest difference in seconds, and the number of targets where only one of the two has a time"""
+	diffs,nmismatch = [0],0
+	for mine,theirs in zip(engine_times,astroplan_times):
+		missing = np.ma.is_masked(theirs.jd) or not np.isfinite(theirs.jd)
+		if mine is None or missing:
+			nmismatch += (mine is None) != missing
+		else: diffs += [abs(mine.jd-theirs.jd)*86400]
+	return max(diffs),nmismatch
+
+def main(ntargets, date, lat, lon, elev):
+	observability = load_observability()
+	ra,dec = random_targets(ntargets)
+	tme = Time(date)
+
+	tstart = time.time()
+	targets = observability.SiteNight(lat,lon,elev,tme).targets(ra,dec)
+	summary = targets.summary()
+	tengine = time.time()-tstart
+
+	tstart = time.time()
+	reference = astroplan_times(lat,lon,elev,tme,ra,dec)
+	tastroplan = time.time()-tstart
+
+	print('%-10s %10s'%('','seconds'))
+	print('%-10s %10.3f'%('engine',tengine))
+	print('%-10s %10.3f'%('astroplan',tastroplan))
+	for i,name in enumerate(['rise','set']):
+		diff,nmismatch = max_difference([s['%s_time'%name] for s in summary],[r[i] for r in reference])
+		print('%s times: largest difference %.1f s, %i targets up or down all day in only one'%(name,diff,nmismatch))
+
+if __name__ == "__main__":
+
+	import optparse
+
+	usagestring='benchObservability.py [options]'
+	parser = optparse.OptionParser(usage=usagestring)
+	parser.add_option('--ntargets', default=100, type="int",
+					  help='number of targets, as on one observing night table')
+	parser.add_option('--date', default='2019-10-20', type="string",
+					  help='observing night, as ClassicalObservingDate.obs_date')
+	parser.add_option('--lat', default=20.7, type="float",
+					  help='site latitude (deg)')
+	parser.add_option('--lon', default=-156.25, type="float",
+					  help='site longitude (deg)')
+	parser.add_option('--elev', default=3000., type="float",
+					  help='site elevation (m)')
+	options, args = parser.parse_args()
+
+	warnings.simplefilter('ignore')
+	main(options.ntargets,options.date,options.lat,options.lon,options.elev)
@@ -3,6 +3,7 @@
 # python uploadTransientData.py -i foundlc/GPC1v3_F15atz.snana.dat -f -e -s ../../YSE_PZ/settings.ini
 
 import os
+import io
 import json
 import urllib.request
 import urllib
@@ -60,6 +61,11 @@ class upload():
 less than this, in the same filter/instrument are treated as the same data.	 Allows updates to the photometry""")
 		parser.add_option('--spectrum', default=False, action="store_true",
 						  help='input file is a spectrum')
+		parser.add_option('--columnar', default=False, action="store_true",
+						  help='send the photometry as an .npz of columns instead of JSON')
+		parser.add_option('--batch', default=False, action="store_true",
+						  help="""upload the snana light curves of the input file and of every
+further argument in a single request""")
 		
 		return(parser)
 
@@ -99,9 +105,9 @@ less than this, in the same filter/instrument are treated as the same data.	 All
 		
 		return(transid)
 		
-	def uploadSNANAPhotometry(self,db=None):
+	def readSNANAPhotometry(self,inputfile,db=None):
 		import snana
-		sn = snana.SuperNova(self.options.inputfile)
+		sn = snana.SuperNova(inputfile)
 		if self.options.foundationdefaults:
 			sn.SNID = sn.otherID[2:]
 		transid = db.get_transient_from_DB(sn.SNID)
@@ -112,7 +118,7 @@ less than this, in the same filter/instrument are treated as the same data.	 All
 				transid = db.get_transient_from_DB(sn.SNID)
 			if self.options.onlyexisting and not transid:
 				print('Object %s not found!	 Returning'%sn.SNID)
-				return()
+				return(None)
 		print('uploading object %s'%sn.SNID)
 		
 		if self.options.useheader:
@@ -174,13 +180,84 @@ less than this, in the same filter/instrument are treated as the same data.	 All
 			PhotUploadAll['%s_%i'%(obsdate,i)] = PhotUploadDict
 			PhotUploadAll['header'] = {'clobber':self.options.clobber,
 									   'mjdmatchmin':self.options.mjdmatchmin}
+		return(PhotUploadAll)
+
+	def photColumnsNPZ(self,header,points):
+		# the columnar upload format of YSE_App/common/phot_columns.py:
+		# one array per column plus the JSON header
+		columns = {'header':np.array(json.dumps(header)),
+				   'obs_mjd':Time([p['obs_date'] for p in points],format='isot').mjd,
+				   'band':np.array([p['band'] for p in points])}
+		for key in ['flux','flux_err','flux_zero_point','mag','mag_err']:
+			columns[key] = np.array([np.nan if p[key] is None else p[key] for p in points],dtype=float)
+		for key in ['forced','diffim','discovery_point']:
+			columns[key] = np.array([p[key] for p in points],dtype=int)
+		columns['data_quality'] = np.array(['' if p['data_quality'] is None else p['data_quality'] for p in points])
+		for key in ['transient','instrument','obs_group']:
+			if key in points[0].keys(): columns[key] = np.array([p[key] for p in points])
+
+		fout = io.BytesIO()
+		np.savez_compressed(fout,**columns)
+		return(fout.getvalue())
+
+	def uploadSNANAPhotometry(self,db=None):
+		PhotUploadAll = self.readSNANAPhotometry(self.options.inputfile,db=db)
+		if PhotUploadAll is None: return()
+
 		import requests
 		from requests.auth import HTTPBasicAuth
 		url = '%s'%db.dburl.replace('/api','/add_transient_phot')
-		r = requests.post(url = url, data = json.dumps(PhotUploadAll),
-						  auth=HTTPBasicAuth(db.dblogin,db.dbpassword))
+		if self.options.columnar:
+			header = {k:PhotUploadAll[k] for k in ['header','transient','photheader']}
+			points = [PhotUploadAll[k] for k in PhotUploadAll.keys() if k not in header.keys()]
+			r = requests.post(url = url, data = self.photColumnsNPZ(header,points),
+							  headers={'Content-Type':'application/x-npz'},
+							  auth=HTTPBasicAuth(db.dblogin,db.dbpassword))
+		else:
+			r = requests.post(url = url, data = json.dumps(PhotUploadAll),
+							  auth=HTTPBasicAuth(db.dblogin,db.dbpassword))
 		print(self.options.clobber)
 		print('YSE_PZ says: %s'%json.loads(r.text)['message'])
+
+	def uploadSNANAPhotometryBatch(self,inputfiles,db=None):
+		# every light curve in one POST to add_transient_phot_batch
+		PhotUploadBatch = {'header':{'clobber':self.options.clobber,
+									 'mjdmatchmin':self.options.mjdmatchmin}}
+		for inputfile in inputfiles:
+			PhotUploadAll = self.readSNANAPhotometry(inputfile,db=db)
+			if PhotUploadAll is None: continue
+
+			photheader = PhotUploadAll['photheader']
+			photdata = {k:PhotUploadAll[k] for k in PhotUploadAll.keys()
+						if k not in ['transient','photheader','header']}
+			PhotUploadBatch[PhotUploadAll['transient']['name']] = {
+				'transient':PhotUploadAll['transient'],
+				'photometry':{'%s_%s'%(photheader['instrument'],photheader['obs_group']):
+							  dict(photheader,photdata=photdata)}}
+
+		import requests
+		from requests.auth import HTTPBasicAuth
+		url = '%s'%db.dburl.replace('/api','/add_transient_phot_batch')
+		if self.options.columnar:
+			header = {'header':PhotUploadBatch['header'],'transients':{},'photheader':{}}
+			points = []
+			for name in PhotUploadBatch.keys():
+				if name == 'header': continue
+				header['transients'][name] = PhotUploadBatch[name]['transient']
+				for photheader in PhotUploadBatch[name]['photometry'].values():
+					points += [dict(p,transient=name,instrument=photheader['instrument'],obs_group=photheader['obs_group'])
+							   for p in photheader['photdata'].values()]
+					header['photheader']['groups'] = photheader['groups']
+			r = requests.post(url = url, data = self.photColumnsNPZ(header,points),
+							  headers={'Content-Type':'application/x-npz'},
+							  auth=HTTPBasicAuth(db.dblogin,db.dbpassword))
+		else:
+			r = requests.post(url = url, data = json.dumps(PhotUploadBatch),
+							  auth=HTTPBasicAuth(db.dblogin,db.dbpassword))
+		response = json.loads(r.text)
+		print('YSE_PZ says: %s'%response['message'])
+		for name in response.get('results',{}).keys():
+			print('%s: %s'%(name,response['results'][name]['message']))
 		
 	def parsePhotHeaderData(self,snid,ra,dec):
 
@@ -426,6 +503,8 @@ if __name__ == "__main__":
 		upl.uploadBasicSpectrum(db=db)
 	elif options.inputformat == 'basic':
 		upl.uploadBasicPhotometry(db=db)
+	elif options.inputformat == 'snana' and options.batch:
+		upl.uploadSNANAPhotometryBatch([options.inputfile]+args,db=db)
 	elif options.inputformat == 'snana':
 		upl.uploadSNANAPhotometry(db=db)
 	else:
@@ -31,6 +31,8 @@ from astropy.table import Table
 import sncosmo
 from .common.bandpassdict import bandpassdict
 from .common.utilities import date_to_mjd
+from .common.observability import SiteNight, time_string, moon_separation
+from .common.ephemeris import get_ephemeris, get_ephemerides, ephemeris_site_night, stored_site_night, night_date
 import time
 
 py2bokeh_symboldict = {"^":"triangle",
@@ -90,19 +92,19 @@ def getMoonAngle(observingdate,telescope,ra,dec):
 		obstime = Time(observingdate,scale='utc')
 	else:
 		obstime = Time(datetime.datetime.now())
-	mooncoord = get_moon(obstime)
-	cs = SkyCoord(ra,dec,unit=u.deg)
-	return('%.1f'%cs.separation(mooncoord).deg)
+	return('%.1f'%moon_separation(get_moon(obstime),ra,dec))
 
 def get_obs_nights_happening_soon(user):
 	allowed_nights = ObservingResourceService.GetAuthorizedClassicalObservingDate_ByUser(user)
 
-	allowed_nights_happening_soon = []
-	for an in allowed_nights:
-		if an.happening_soon():
-			allowed_nights_happening_soon.append(an)
+	# the window of ClassicalObservingDate.happening_soon, in the database
+	from django.utils import timezone
+	now = timezone.now()
+	allowed_nights_happening_soon = allowed_nights.filter(
+		obs_date__gte=now-datetime.timedelta(days=2),obs_date__lte=now+datetime.timedelta(days=4)).\
+		select_related('resource__telescope')
 
-	return allowed_nights_happening_soon
+	return list(allowed_nights_happening_soon)
 
 def get_too_resources(user):
 	allowed_too_resource = ObservingResourceService.GetAuthorizedToOResource_ByUser(user)
@@ -113,38 +115,10 @@ def getTimeUntilRiseSet(ra,dec,date,lat,lon,elev,utc_off):
 		time = Time(date)
 	else:
 		time = Time(datetime.datetime.now())
-	sc = SkyCoord(ra,dec,unit=u.deg)
-
-	location = EarthLocation.from_geodetic(
-		lon*u.deg,lat*u.deg,
-		elev*u.m)
-	tel = Observer(location=location, timezone="UTC")
-	#night_start = tel.twilight_evening_civil(time,which="previous")
-	#night_end = tel.twilight_morning_civil(time,which="previous")
-	target_rise_time = tel.target_rise_time(time,sc,horizon=18*u.deg,which="previous")
-	target_set_time = tel.target_set_time(time,sc,horizon=18*u.deg,which="previous")
-	
-#	 start_obs = False
-#	 starttime,endtime = None,None
-#	 for jd in np.arange(night_start.mjd,night_end.mjd,0.05):
-#		 time = Time(jd,format="mjd")
-#		 target_up = tel.target_is_up(time,sc,horizon=18*u.deg)
-#		 if target_up and not start_obs:
-#			 start_obs = True
-#			 starttime = copy.copy(time)
-#		 if not target_up and start_obs:
-#			 can_obs = False
-#			 endtime = copy.copy(time)
-#			 break
-
-	if target_rise_time:
-		returnstarttime = target_rise_time.isot.split('T')[-1]
-	else: returnstarttime = None
-	if target_set_time:
-		returnendtime = target_set_time.isot.split('T')[-1]
-	else: returnendtime = None
+	targets = SiteNight(lat,lon,elev,time).targets(ra,dec)
 
-	
+	returnstarttime = time_string(targets.rise_times()[0])
+	returnendtime = time_string(targets.set_times()[0])
 	return(returnstarttime,returnendtime)
 
 	
@@ -403,7 +377,6 @@ def airmassplot(request, transient_id, obs_id, telescope_id):
 	telescope = Telescope.objects.get(pk=telescope_id)
 	
 	target = SkyCoord(transient.ra,transient.dec,unit=u.deg)
-	time = Time(str(obs_date).split('+')[0], format='iso')
 
 	location = EarthLocation.from_geodetic(telescope.longitude*u.deg, telescope.latitude*u.deg,telescope.elevation*u.m)
 	tel = Observer(location=location, name=telescope.name, timezone="UTC")
@@ -414,10 +387,8 @@ def airmassplot(request, transient_id, obs_id, telescope_id):
 
 	ax.set_title("%s, %s, %s"%(telescope.tostring(),transient.name, obs_date))
 
-	night_start = tel.twilight_evening_astronomical(time,which="previous")
-	night_end = tel.twilight_morning_astronomical(time,which="previous")
-	if night_end < night_start:
-		night_end = tel.twilight_morning_astronomical(time,which="next")
+	ephemeris = get_ephemeris(telescope,obs_date)
+	night_start,night_end = Time(ephemeris.night_start),Time(ephemeris.night_end)
 	delta_t = night_end - night_start
 	observe_time = night_start + delta_t*np.linspace(0, 1, 75)
 	plot_airmass(target, tel, observe_time, ax=ax)	  
@@ -677,25 +648,21 @@ def lightcurveplot(request, transient_id, salt2=False):
 def spectrumplot(request, transient_id):
 	tstart = time.time()
 	transient = Transient.objects.get(pk=transient_id)
-	spectrum = SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(request.user, transient_id)
+	spectrum = SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(request.auth_context, transient_id)
 
 	if not len(spectrum):
 		return django.http.HttpResponse('')
 	else:
 		spectrum = spectrum[0]
-	spec = TransientSpecData.objects.filter(spectrum=spectrum)
+	spec = spectrum.get_spec_data()
 	
 	if not len(spec):
 		return django.http.HttpResponse('')
 
 	#figure is a function in the bokeh module
 	ax=figure()
-	#HELLO
-	wave,flux = [],[]
-	for s in spec:
-		wave += [s.wavelength]
-		flux += [s.flux]
-	ax.line(np.sort(wave),np.array(flux)[np.argsort(wave)],color='black')
+	# packed spectra are already sorted by wavelength
+	ax.line(spec['wavelength'],spec['flux'],color='black')
 
 	ax.title.text = "%s, %s, %s, Phase: %s"%(transient.name,spectrum.obs_date.strftime('%m/%d/%Y'),spectrum.instrument,spectrum.spec_phase)
 	ax.xaxis.axis_label = r'Wavelength (Angstrom)'
@@ -714,25 +681,21 @@ def spectrumplotsingle(request, transient_id, spec_id):
 	tstart = time.time()
 	print(transient_id,spec_id)
 	transient = Transient.objects.get(pk=transient_id)
-	spectra = SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(request.user, transient_id)
+	spectra = SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(request.auth_context, transient_id)
 	spectrum = spectra.filter(id=spec_id)
 	
 	if not len(spectrum):
 		return django.http.HttpResponse('')
 	else:
 		spectrum = spectrum[0]
-	spec = TransientSpecData.objects.filter(spectrum=spectrum)
+	spec = spectrum.get_spec_data()
 	
 	if not len(spec):
 		return django.http.HttpResponse('')
 
 	ax=figure()
 
-	wave,flux = [],[]
-	for s in spec:
-		wave += [s.wavelength]
-		flux += [s.flux]
-	ax.line(np.sort(wave),np.array(flux)[np.argsort(wave)],color='black')
+	ax.line(spec['wavelength'],spec['flux'],color='black')
 		
 	ax.title.text = "%s, %s, %s, Phase: %s"%(transient.name,spectrum.obs_date.strftime('%m/%d/%Y'),spectrum.instrument,spectrum.spec_phase)
 	ax.xaxis.axis_label = r'Wavelength (Angstrom)'
@@ -741,130 +704,103 @@ def spectrumplotsingle(request, transient_id, spec_id):
 
 	return HttpResponse(g.replace('width: 90%','width: 100%'))
 
-def rise_time(request,transient_id,obs_id):
-
-	tstart = time.time()
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obsnight = ClassicalObservingDate.objects.get(pk=obs_id)
-	
-	tme = Time(str(obsnight.obs_date).split()[0])
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
+def obsnight_observability(transient_id,obs_id):
+	transient = Transient.objects.get(id=transient_id)
+	obsnight = ClassicalObservingDate.objects.select_related('resource__telescope').get(pk=obs_id)
+	site_night = stored_site_night(obsnight.resource.telescope,obsnight.obs_date)
+	return site_night.targets(transient.ra,transient.dec)
 
-	location = EarthLocation.from_geodetic(
-		obsnight.resource.telescope.longitude*u.deg,obsnight.resource.telescope.latitude*u.deg,
-		obsnight.resource.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
+def tonight_observability(transient_id,too_id):
+	transient = Transient.objects.get(id=transient_id)
+	too = ToOResource.objects.select_related('telescope').get(id=too_id)
+	# not cached, "now" is never asked about twice
+	site_night = SiteNight.for_telescope(too.telescope,Time(datetime.datetime.now()))
+	return site_night.targets(transient.ra,transient.dec)
 
-	target_rise_time = tel.target_rise_time(tme,sc,horizon=18*u.deg,which="previous")
-	
-	if target_rise_time:
-		risetime = target_rise_time.isot.split('T')[-1]
-	else: 
-		risetime = None
-			
-	print(time.time()-tstart)
-	risedict = {'rise_time':risetime}
+def rise_time(request,transient_id,obs_id):
+	targets = obsnight_observability(transient_id,obs_id)
+	risedict = {'rise_time':time_string(targets.rise_times()[0])}
 	return JsonResponse(risedict)
 
 def set_time(request,transient_id,obs_id):
-
-	import time
-	tstart = time.time()
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obsnight = ClassicalObservingDate.objects.get(pk=obs_id)
-	
-	tme = Time(str(obsnight.obs_date).split()[0])
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.resource.telescope.longitude*u.deg,obsnight.resource.telescope.latitude*u.deg,
-		obsnight.resource.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_set_time = tel.target_set_time(tme,sc,horizon=18*u.deg,which="previous")
-	
-	if target_set_time:
-		settime = target_set_time.isot.split('T')[-1]
-	else: 
-		settime = None
-			
-	print(time.time()-tstart)
-	setdict = {'set_time':settime}
+	targets = obsnight_observability(transient_id,obs_id)
+	setdict = {'set_time':time_string(targets.set_times()[0])}
 	return JsonResponse(setdict)
 
 def moon_angle(request,transient_id,obs_id):
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obsnight = ClassicalObservingDate.objects.get(pk=obs_id)
-	
-	obstime = Time(str(obsnight.obs_date).split()[0],scale='utc')
-
-	mooncoord = get_moon(obstime)
-	cs = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-	moondict = {'moon_angle':'%.1f deg'%cs.separation(mooncoord).deg}
+	targets = obsnight_observability(transient_id,obs_id)
+	moondict = {'moon_angle':'%.1f deg'%targets.moon_angles()[0]}
 	return JsonResponse(moondict)
 
 def tonight_rise_time(request,transient_id,too_id):
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obsnight = ToOResource.objects.filter(id=too_id)[0]
-	
-	time = Time(datetime.datetime.now())
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.telescope.longitude*u.deg,obsnight.telescope.latitude*u.deg,
-		obsnight.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_rise_time = tel.target_rise_time(time,sc,horizon=18*u.deg,which="previous")
-
-	if target_rise_time:
-		returnstarttime = target_rise_time.isot.split('T')[-1]
-	else: returnstarttime = None
-
-	risedict = {'rise_time':returnstarttime}
+	targets = tonight_observability(transient_id,too_id)
+	risedict = {'rise_time':time_string(targets.rise_times()[0])}
 	return JsonResponse(risedict)
 
 def tonight_set_time(request,transient_id,too_id):
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obsnight = ToOResource.objects.filter(id=too_id)[0]
-	
-	time = Time(datetime.datetime.now())
-	sc = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-
-	location = EarthLocation.from_geodetic(
-		obsnight.telescope.longitude*u.deg,obsnight.telescope.latitude*u.deg,
-		obsnight.telescope.elevation*u.m)
-	tel = Observer(location=location, timezone="UTC")
-
-	target_set_time = tel.target_set_time(time,sc,horizon=18*u.deg,which="previous")
-
-	if target_set_time:
-		returnstarttime = target_set_time.isot.split('T')[-1]
-	else: returnstarttime = None
-
-	setdict = {'set_time':returnstarttime}
+	targets = tonight_observability(transient_id,too_id)
+	setdict = {'set_time':time_string(targets.set_times()[0])}
 	return JsonResponse(setdict)
 	
 def tonight_moon_angle(request,transient_id,too_id):
-	transient = Transient.objects.filter(id=transient_id)[0]
-	coords = transient.CoordString()
-
-	obstime = Time(datetime.datetime.now())
-	mooncoord = get_moon(obstime)
-	cs = SkyCoord('%s %s'%(coords[0],coords[1]),unit=(u.hourangle,u.deg))
-	moondict = {'moon_angle':'%.1f deg'%cs.separation(mooncoord).deg}
+	targets = tonight_observability(transient_id,too_id)
+	moondict = {'moon_angle':'%.1f deg'%targets.moon_angles()[0]}
 	return JsonResponse(moondict)
 
+def observability_row(o):
+	return {'rise_time':time_string(o['rise_time']),'set_time':time_string(o['set_time']),
+			'moon_angle':'%.1f deg'%o['moon_angle'],'observable':o['observable'],
+			'min_airmass':round(o['min_airmass'],3) if o['min_airmass'] else None}
+
+def resource_observability(transients,observing_nights,too_resources):
+	"""
+	rise, set, moon angle and whether it's observable, of every transient from
+	every observing night and (tonight) every ToO resource with hours left.
+	each site and night is worked out once for all the transients
+	"""
+	ra,dec = [t.ra for t in transients],[t.dec for t in transients]
+	payload = {'transients':{t.id:{'obs_nights':{},'too_resources':{}} for t in transients},'too_resources':{}}
+
+	sites = {}
+	for obsnight in observing_nights:
+		sites.setdefault((obsnight.resource.telescope.id,night_date(obsnight.obs_date)),[]).append(obsnight)
+	ephemerides = get_ephemerides([(o.resource.telescope,o.obs_date) for o in observing_nights])
+	for site,obsnights in sites.items():
+		site_night = ephemeris_site_night(ephemerides[site],obsnights[0].resource.telescope)
+		summary = site_night.targets(ra,dec).summary()
+		for t,o in zip(transients,summary):
+			for obsnight in obsnights:
+				payload['transients'][t.id]['obs_nights'][obsnight.id] = observability_row(o)
+
+	now,tonight = Time(datetime.datetime.now()),{}
+	for too in too_resources:
+		if too.used_too_hours >= too.awarded_too_hours: continue
+		payload['too_resources'][too.id] = {'delta_too_hours':too.awarded_too_hours - too.used_too_hours}
+		if too.telescope_id not in tonight:
+			tonight[too.telescope_id] = SiteNight.for_telescope(too.telescope,now).targets(ra,dec).summary()
+		for t,o in zip(transients,tonight[too.telescope_id]):
+			payload['transients'][t.id]['too_resources'][too.id] = observability_row(o)
+	return payload
+
+@login_required
+def observability(request):
+	"""
+	resource_observability as JSON, for the transients whose ids are in
+	?transients=1,2,3 and the resources the user may see
+	"""
+	try:
+		transient_ids = [int(i) for i in request.GET.get('transients','').split(',') if i]
+	except ValueError:
+		return JsonResponse({"message":"transients must be a comma-separated list of ids"},status=400)
+	transients = list(Transient.objects.filter(id__in=transient_ids).only('id','ra','dec'))
+	if not transients:
+		return JsonResponse({"message":"no transients found"},status=404)
+
+	payload = resource_observability(
+		transients,get_obs_nights_happening_soon(request.auth_context),
+		get_too_resources(request.auth_context).select_related('telescope'))
+	return JsonResponse(payload)
+
 def get_ps1_image(request,transient_id):
 	
 	try:
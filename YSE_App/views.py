@@ -30,6 +30,11 @@ import json
 import time
 
 from .table_utils import TransientTable,NewTransientTable,ObsNightFollowupTable,FollowupTable,TransientFilter,FollowupFilter
+from .dashboard_utils import render_dashboard_tables
+from .followup_utils import followup_tables
+from .transient_detail_utils import cached_detail_bundle
+from .common.user_query_cache import dashboard_query, get_result, is_refreshing
+from .common.ephemeris import get_ephemeris
 import django_tables2 as tables
 from django_tables2 import RequestConfig
 from .basicauth import *
@@ -74,73 +79,16 @@ def auth_logout(request):
 
 @login_required
 def dashboard(request):
-	new_transients = None
-	inprocess_transients = None
-	new_k2_transients = None
-	new_notk2_transients = None
-	watch_transients = None
-	following_transients = None
-	followup_requested_transients = None
-	finishedfollowing_transients = None
-	
-	status_new = TransientStatus.objects.filter(name='New').order_by('-modified_date')
-	if len(status_new) == 1:
-		new_transients = Transient.objects.filter(status=status_new[0]).order_by('-disc_date')
-	newtransientfilter = TransientFilter(request.GET, queryset=new_transients,prefix='new')
-	new_table = NewTransientTable(newtransientfilter.qs,prefix='new')
-	RequestConfig(request, paginate={'per_page': 10}).configure(new_table)
-		
-	status_watch = TransientStatus.objects.filter(name='Watch').order_by('-modified_date')
-	if len(status_watch) == 1:
-		watch_transients = Transient.objects.filter(status=status_watch[0]).order_by('-disc_date')
-	watchtransientfilter = TransientFilter(request.GET, queryset=watch_transients,prefix='watch')
-	watch_table = TransientTable(watchtransientfilter.qs,prefix='watch')
-	RequestConfig(request, paginate={'per_page': 10}).configure(watch_table)
-	
-	status_followrequest = TransientStatus.objects.filter(name='FollowupRequested').order_by('-modified_date')
-	if len(status_followrequest) == 1:
-		followup_requested_transients = Transient.objects.filter(status=status_followrequest[0]).order_by('-disc_date')
-	followrequesttransientfilter = TransientFilter(request.GET, queryset=followup_requested_transients,prefix='followrequest')
-	follow_request_table = TransientTable(followrequesttransientfilter.qs,prefix='followrequest')
-	RequestConfig(request, paginate={'per_page': 10}).configure(follow_request_table)
-		
-	status_following = TransientStatus.objects.filter(name='Following').order_by('-modified_date')
-	if len(status_following) == 1:
-		following_transients = Transient.objects.filter(status=status_following[0]).order_by('-disc_date')
-	followingtransientfilter = TransientFilter(request.GET, queryset=following_transients,prefix='following')
-	following_table = TransientTable(followingtransientfilter.qs,prefix='following')
-	RequestConfig(request, paginate={'per_page': 10}).configure(following_table)
-
-	status_finishedfollowing = TransientStatus.objects.filter(name='FollowupFinished').order_by('-modified_date')
-	if len(status_finishedfollowing) == 1:
-		finishedfollowing_transients = Transient.objects.filter(status=status_finishedfollowing[0]).order_by('-disc_date')
-	finishedfollowingtransientfilter = TransientFilter(request.GET, queryset=finishedfollowing_transients,prefix='finishedfollowing')
-	finished_following_table = TransientTable(finishedfollowingtransientfilter.qs,prefix='finishedfollowing')
-	RequestConfig(request, paginate={'per_page': 10}).configure(finished_following_table)
-
-	status_needs_template = TransientStatus.objects.filter(name='NeedsTemplate').order_by('-modified_date')
-	if len(status_needs_template) == 1:
-		needs_template_transients = Transient.objects.filter(status=status_needs_template[0]).order_by('-disc_date')
-	else:
-		needs_template_transients = Transient.objects.filter(status=None).order_by('-disc_date')
-	needs_templatetransientfilter = TransientFilter(request.GET, queryset=needs_template_transients,prefix='needstemplate')
-	needs_template_table = TransientTable(needs_templatetransientfilter.qs,prefix='needstemplate')
-	RequestConfig(request, paginate={'per_page': 10}).configure(needs_template_table)
 
-	
-	transient_categories = [(new_table,'New Transients','new',newtransientfilter),
-							(follow_request_table,'Followup Requested','followrequest',followrequesttransientfilter),
-							(following_table,'Following','following',followingtransientfilter),
-							(watch_table,'Watch','watch',watchtransientfilter),
-							(finished_following_table,'Finished Following','finishedfollowing',finishedfollowingtransientfilter),
-							(needs_template_table,'Needs Template','needstemplate',needs_templatetransientfilter)]
+	# one query for the transients of every table, and none for a table
+	# that's cached; see dashboard_utils.py
+	transient_categories = render_dashboard_tables(request)
 
 	if request.META['QUERY_STRING']:
 		anchor = request.META['QUERY_STRING'].split('-')[0]
 	else: anchor = ''
 	context = {
 		'transient_categories':transient_categories,
-		'all_transient_statuses':TransientStatus.objects.all(),
 		'anchor':anchor,
 	}
 
@@ -149,21 +97,19 @@ def dashboard(request):
 @login_required
 def personaldashboard(request):
 
-	queries = UserQuery.objects.filter(user = request.user)
+	# the queries themselves are run in the background, see YSE_App/common/user_query_cache.py
+	queries = UserQuery.objects.filter(user = request.user).select_related('query','query__dashboard_result')
 	tables = []
 	for q in queries:
-		if 'yse_app_transient' not in q.query.sql.lower(): continue
-		if 'name' not in q.query.sql.lower(): continue
-		if not q.query.sql.lower().startswith('select'): continue
-		cursor = connections['explorer'].cursor()
-		cursor.execute(q.query.sql.replace('%','%%'), ())
-		transients = Transient.objects.filter(name__in=(x[0] for x in cursor)).order_by('-disc_date')
-		cursor.close()
+		if q.query is None or not dashboard_query(q.query.sql): continue
+		result = get_result(q)
+		transients = Transient.objects.filter(dashboard_query_results=result).order_by('-disc_date')
 
 		transientfilter = TransientFilter(request.GET, queryset=transients,prefix=q.query.title.replace(' ',''))
 		table = TransientTable(transientfilter.qs,prefix=q.query.title.replace(' ',''))
 		RequestConfig(request, paginate={'per_page': 10}).configure(table)
-		tables += [(table,q.query.title,q.query.title.replace(' ',''),transientfilter,q.id)]
+		tables += [(table,q.query.title,q.query.title.replace(' ',''),transientfilter,q.id,
+					result,is_refreshing(result))]
 
 		
 	if request.META['QUERY_STRING']:
@@ -185,20 +131,7 @@ def personaldashboard(request):
 @login_required
 def followup(request):
 
-	followup_transients = None
-
-	telescopes = Telescope.objects.all()
-
-	table_list = []
-	for t in telescopes:
-		followup_transients = TransientFollowup.objects.filter(Q(too_resource__telescope__name=t) |
-															   Q(classical_resource__telescope__name=t) |
-															   Q(queued_resource__telescope__name=t))
-		followuptransientfilter = FollowupFilter(request.GET, queryset=followup_transients,prefix=t)
-		
-		followup_table = FollowupTable(followuptransientfilter.qs,prefix=t)
-		RequestConfig(request, paginate={'per_page': 10}).configure(followup_table)
-		table_list += [(t.name,followup_table,t.name.replace(' ','_'),followup_transients,followuptransientfilter)]
+	table_list = followup_tables(request)
 
 	if request.META['QUERY_STRING']:
 		anchor = request.META['QUERY_STRING'].split('-ex')[0]
@@ -206,7 +139,7 @@ def followup(request):
 	context = {
 		'followup_tables':table_list,
 		'anchor':anchor,
-		'all_followup_statuses':FollowupStatus.objects.all(),
+		'all_followup_statuses':list(FollowupStatus.objects.all()),
 	}
 	return render(request, 'YSE_App/transient_followup.html', context)
 
@@ -270,7 +203,7 @@ def calendar(request):
 
 @login_required
 def observing_calendar(request):
-	all_dates = ClassicalObservingDate.objects.all()
+	all_dates = ClassicalObservingDate.objects.select_related('resource__telescope')
 	colors = ['#dd4b39', 
 				'#f39c12', 
 				'#00c0ef', 
@@ -282,7 +215,7 @@ def observing_calendar(request):
 				'#001f3f']
 
 	telescope_colors = {}
-	for i, c in enumerate(ClassicalResource.objects.all()):
+	for i, c in enumerate(ClassicalResource.objects.select_related('telescope')):
 		telescope_colors[c.telescope.name] = colors[i % len(colors)]
 
 	context = {
@@ -303,18 +236,10 @@ def observing_night(request, telescope, obs_date):
 	RequestConfig(request, paginate={'per_page': 20}).configure(followup_table)
 	table = (telescope.replace('_',' '),followup_table,telescope,follow_requests,followuptransientfilter)
 
-	location = EarthLocation.from_geodetic(
-		classical_obs_date[0].resource.telescope.longitude*u.deg,classical_obs_date[0].resource.telescope.latitude*u.deg,
-		classical_obs_date[0].resource.telescope.elevation*u.m)
-	time = Time(str(classical_obs_date[0].obs_date).split('+')[0], format='iso')
-	tel = Observer(location=location, timezone="UTC")
-
-	sunset = tel.sun_set_time(time,which="previous").isot.split('T')[-1][:-7]
-	night_start_12 = tel.twilight_evening_nautical(time,which="previous").isot.split('T')[-1][:-7]
-	night_start_18 = tel.twilight_evening_astronomical(time,which="previous").isot.split('T')[-1][:-7]
-	night_end_18 = tel.twilight_morning_astronomical(time,which="previous").isot.split('T')[-1][:-7]
-	night_end_12 = tel.twilight_morning_nautical(time,which="previous").isot.split('T')[-1][:-7]
-	sunrise = tel.sun_rise_time(time,which="previous").isot.split('T')[-1][:-7]
+	ephemeris = get_ephemeris(classical_obs_date[0].resource.telescope,classical_obs_date[0].obs_date)
+	sunriseset = tuple(t.strftime('%H:%M') if t else None for t in (
+		ephemeris.sun_evening,ephemeris.nautical_evening,ephemeris.astronomical_evening,
+		ephemeris.astronomical_morning,ephemeris.nautical_morning,ephemeris.sun_morning))
 	
 	if request.META['QUERY_STRING']:
 		anchor = request.META['QUERY_STRING'].split('-ex')[0]
@@ -327,7 +252,7 @@ def observing_night(request, telescope, obs_date):
 		'telescope':telescope.replace('_',' '),
 		'obs_date':obs_date,
 		'classical_obs_date':classical_obs_date[0],
-		'sunriseset':(sunset,night_start_12,night_start_18,night_end_18,night_end_12,sunrise)
+		'sunriseset':sunriseset
 	}
 	return render(request, 'YSE_App/observing_night.html', context)
 
@@ -335,7 +260,8 @@ def download_target_list(request, telescope, obs_date):
 
 	# get follow requests for telescope/date
 	classical_obs_date = ClassicalObservingDate.objects.filter(obs_date__startswith = obs_date).filter(resource__telescope__name = telescope.replace('_',' '))
-	follow_requests = TransientFollowup.objects.filter(classical_resource = classical_obs_date[0].resource).filter(valid_start__lte = classical_obs_date[0].obs_date).filter(valid_stop__gte = classical_obs_date[0].obs_date)
+	follow_requests = TransientFollowup.objects.filter(classical_resource = classical_obs_date[0].resource).filter(valid_start__lte = classical_obs_date[0].obs_date).filter(valid_stop__gte = classical_obs_date[0].obs_date).\
+		select_related('transient__lightcurve_summary')
 
 	location = EarthLocation.from_geodetic(
 		classical_obs_date[0].resource.telescope.longitude*u.deg,classical_obs_date[0].resource.telescope.latitude*u.deg,
@@ -358,7 +284,8 @@ def download_targets_and_finders(request, telescope, obs_date):
 
 	# get follow requests for telescope/date
 	classical_obs_date = ClassicalObservingDate.objects.filter(obs_date__startswith = obs_date).filter(resource__telescope__name = telescope.replace('_',' '))
-	follow_requests = TransientFollowup.objects.filter(classical_resource = classical_obs_date[0].resource).filter(valid_start__lte = classical_obs_date[0].obs_date).filter(valid_stop__gte = classical_obs_date[0].obs_date)
+	follow_requests = TransientFollowup.objects.filter(classical_resource = classical_obs_date[0].resource).filter(valid_start__lte = classical_obs_date[0].obs_date).filter(valid_stop__gte = classical_obs_date[0].obs_date).\
+		select_related('transient__lightcurve_summary')
 
 	location = EarthLocation.from_geodetic(
 		classical_obs_date[0].resource.telescope.longitude*u.deg,classical_obs_date[0].resource.telescope.latitude*u.deg,
@@ -390,139 +317,94 @@ def download_targets_and_finders(request, telescope, obs_date):
 @login_required
 def transient_detail(request, slug):
 
-	transient = Transient.objects.filter(slug=slug)
-	logs = Log.objects.filter(transient=transient[0].id)
+	transient_obj = Transient.objects.filter(slug=slug).select_related(
+		'status','host','best_spec_class','non_detect_band').first()
+	if transient_obj is None:
+		raise Http404('Transient not found')
 
-	obs = None
-	if len(transient) == 1:
-		from django.utils import timezone
-		
-		transient_obj = transient.first() # This should throw an exception if more than one or none are returned
-		transient_id = transient[0].id
+	from django.utils import timezone
 
-		alt_names = AlternateTransientNames.objects.filter(transient__pk=transient_id)
+	# the names, comments, followups, photometry and spectra, cached per group set
+	bundle = cached_detail_bundle(transient_obj, request.auth_context)
 
-		transient_followup_form = TransientFollowupForm()
-		#transient_followup_form.fields["classical_resource"].queryset = \
-		#		view_utils.get_authorized_classical_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name')
-		transient_followup_form.fields["too_resource"].queryset = view_utils.get_authorized_too_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name')
-		transient_followup_form.fields["queued_resource"].queryset = view_utils.get_authorized_queued_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name')
+	transient_followup_form = TransientFollowupForm()
+	#transient_followup_form.fields["classical_resource"].queryset = \
+	#		view_utils.get_authorized_classical_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name')
+	transient_followup_form.fields["too_resource"].queryset = view_utils.get_authorized_too_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name').select_related('telescope')
+	transient_followup_form.fields["queued_resource"].queryset = view_utils.get_authorized_queued_resources(request.user).filter(end_date_valid__gt = timezone.now()-timedelta(days=1)).order_by('telescope__name').select_related('telescope')
+	transient_followup_form.fields["classical_resource"].queryset = transient_followup_form.fields["classical_resource"].queryset.select_related('telescope')
 
-		transient_observation_task_form = TransientObservationTaskForm()
+	transient_observation_task_form = TransientObservationTaskForm()
+	transient_observation_task_form.fields["instrument_config"].queryset = InstrumentConfig.objects.select_related('instrument')
 
-		spectrum_upload_form = SpectrumUploadForm()
-		
-		# Status update properties
-		all_transient_statuses = TransientStatus.objects.all()
-		transient_status_follow = TransientStatus.objects.get(name="Following")
-		transient_status_watch = TransientStatus.objects.get(name="Watch")
-		transient_status_ignore = TransientStatus.objects.get(name="Ignore")
-		transient_comment_form = TransientCommentForm()
-
-		# Transient tag
-		all_colors = WebAppColor.objects.all()
-		all_transient_tags = TransientTag.objects.all()
-		assigned_transient_tags = transient_obj.tags.all()
-
-		# GW Candidate?
-		gwcand,gwimages = None,None
-		for att in assigned_transient_tags:
-			if att.name == 'GW Candidate':
-				gwcand = GWCandidate.objects.filter(name = transient_obj.name)
-				if len(gwcand):
-					gwimages = GWCandidateImage.objects.filter(gw_candidate__name = gwcand[0].name)
-
-		# Get associated Observations
-		followups = TransientFollowup.objects.filter(transient__pk=transient_id)
-		if followups:
-			for i in range(len(followups)):
-				followups[i].observation_set = TransientObservationTask.objects.filter(followup=followups[i].id)
-
-				if followups[i].classical_resource:
-					followups[i].resource = followups[i].classical_resource
-				elif followups[i].too_resource:
-					followups[i].resource = followups[i].too_resource
-				elif followups[i].queued_resource:
-					followups[i].resource = followups[i].queued_resource
-		else:
-			followups = None
+	spectrum_upload_form = SpectrumUploadForm()
+	spectrum_upload_form.fields["instrument"].queryset = spectrum_upload_form.fields["instrument"].queryset.select_related('telescope')
 
-		hostdata = Host.objects.filter(pk=transient_obj.host_id)
-		if hostdata:
-			hostphotdata = view_utils.get_recent_phot_for_host(request.user, host_id=hostdata[0].id)
-			transient_obj.hostdata = hostdata[0]
-		else:
-			hostphotdata = None
-
-		if hostphotdata: transient_obj.hostphotdata = hostphotdata
-
-		lastphotdata = view_utils.get_recent_phot_for_transient(request.user, transient_id=transient_id)
-		firstphotdata = view_utils.get_disc_mag_for_transient(request.user, transient_id=transient_id)
-		allphotdata = view_utils.get_all_phot_for_transient(request.user, transient_id)
-		#import pdb
-		#pdb.set_trace()
-
-		# obsnights,tellist = view_utils.getObsNights(transient[0])
-		# too_resources = ToOResource.objects.all()
-		#
-		# for i in range(len(too_resources)):
-		#	telescope = too_resources[i].telescope
-		#	too_resources[i].telescope_id = telescope.id
-		#	observatory = Observatory.objects.get(pk=telescope.observatory_id)
-		#	too_resources[i].deltahours = too_resources[i].awarded_too_hours - too_resources[i].used_too_hours
-		obsnights = view_utils.get_obs_nights_happening_soon(request.user)
-		too_resources = view_utils.get_too_resources(request.user)
-
-		date = datetime.datetime.now(tz=pytz.utc)
-		date_format='%m/%d/%Y %H:%M:%S'
-
-		spectra = SpectraService.GetAuthorizedTransientSpectrum_ByUser_ByTransient(request.user, transient_id)
-		
-		context = {
-			'transient':transient_obj,
-			'followups':followups,
-			# 'telescope_list': tellist,
-			'observing_nights': obsnights,
-			'too_resource_list': too_resources,
-			'nowtime':date.strftime(date_format),
-			'transient_followup_form': transient_followup_form,
-			'transient_observation_task_form': transient_observation_task_form,
-			'transient_comment_form': transient_comment_form,
-			'alt_names': alt_names,
-			'all_transient_statuses': all_transient_statuses,
-			'transient_status_follow': transient_status_follow,
-			'transient_status_watch': transient_status_watch,
-			'transient_status_ignore': transient_status_ignore,
-			'logs':logs,
-			'all_transient_tags': all_transient_tags,
-			'assigned_transient_tags': assigned_transient_tags,
-			'all_colors': all_colors,
-			'all_transient_spectra': spectra,
-			'gw_candidate':gwcand,
-			'gw_images':gwimages,
-			'spectrum_upload_form':spectrum_upload_form,				  
-		}
-
-		if transient_followup_form.fields["valid_start"].initial:
-			context['followup_initial_dates'] = \
-				(transient_followup_form.fields["valid_start"].initial.strftime('%m/%d/%Y HH:MM'),
-				 transient_followup_form.fields["valid_stop"].initial.strftime('%m/%d/%Y HH:MM'))			
-		
-		if lastphotdata and firstphotdata:
-			context['recent_mag'] = lastphotdata.mag
-			context['recent_filter'] = lastphotdata.band
-			context['recent_magdate'] = lastphotdata.obs_date
-			context['first_mag'] = firstphotdata.mag
-			context['first_filter'] = firstphotdata.band
-			context['first_magdate'] = firstphotdata.obs_date
-			context['allphotdata']=allphotdata
-
-		return render(request,
-			'YSE_App/transient_detail.html',
-			context)
+	# Status update properties
+	all_transient_statuses = list(TransientStatus.objects.all())
+	statuses = {s.name:s for s in all_transient_statuses}
+	transient_comment_form = TransientCommentForm()
 
-	else:
-		return Http404('Transient not found')
+	# Transient tag
+	all_colors = WebAppColor.objects.all()
+	all_transient_tags = TransientTag.objects.select_related('color')
+
+	date = datetime.datetime.now(tz=pytz.utc)
+	date_format='%m/%d/%Y %H:%M:%S'
+
+	context = {
+		'transient':transient_obj,
+		'nowtime':date.strftime(date_format),
+		'transient_followup_form': transient_followup_form,
+		'transient_observation_task_form': transient_observation_task_form,
+		'transient_comment_form': transient_comment_form,
+		'all_transient_statuses': all_transient_statuses,
+		'transient_status_follow': statuses.get('Following'),
+		'transient_status_watch': statuses.get('Watch'),
+		'transient_status_ignore': statuses.get('Ignore'),
+		'all_transient_tags': all_transient_tags,
+		'all_colors': all_colors,
+		'spectrum_upload_form':spectrum_upload_form,
+	}
+	context.update(bundle)
+
+	if transient_followup_form.fields["valid_start"].initial:
+		context['followup_initial_dates'] = \
+			(transient_followup_form.fields["valid_start"].initial.strftime('%m/%d/%Y HH:MM'),
+			 transient_followup_form.fields["valid_stop"].initial.strftime('%m/%d/%Y HH:MM'))
+
+	lastphotdata,firstphotdata = bundle['lastphotdata'],bundle['firstphotdata']
+	if lastphotdata and firstphotdata:
+		context['recent_mag'] = lastphotdata.mag
+		context['recent_filter'] = lastphotdata.band
+		context['recent_magdate'] = lastphotdata.obs_date
+		context['first_mag'] = firstphotdata.mag
+		context['first_filter'] = firstphotdata.band
+		context['first_magdate'] = firstphotdata.obs_date
+
+	return render(request,
+		'YSE_App/transient_detail.html',
+		context)
+
+@login_required
+def transient_photometry_panel(request, slug):
+	"""the detailed photometry table of transient_detail, fetched after the page loads"""
+	transient = get_object_or_404(Transient, slug=slug)
+	photdata = PhotometryService.GetAuthorizedTransientPhotData_ByUser_ByTransient(
+		request.auth_context, transient.id).select_related('band__instrument')
+	return render(request, 'YSE_App/transient_detail_photometry.html',
+				  {'transient':transient,'allphotdata':photdata})
+
+@login_required
+def transient_resources_panel(request, slug):
+	"""the observing nights and ToO resources of transient_detail, fetched after the page loads"""
+	transient = get_object_or_404(Transient, slug=slug)
+	context = {
+		'transient':transient,
+		'observing_nights':view_utils.get_obs_nights_happening_soon(request.auth_context),
+		'too_resource_list':view_utils.get_too_resources(request.auth_context).select_related('telescope'),
+	}
+	return render(request, 'YSE_App/transient_detail_resources.html', context)
 
 @login_required
 def transient_edit(request, transient_id=None):
@@ -549,13 +431,9 @@ from wsgiref.util import FileWrapper
 @login_or_basic_auth_required
 def download_data(request, slug):
 
-	if 'HTTP_AUTHORIZATION' in request.META.keys():
-		auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-		credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-		username, password = credentials.split(':', 1)
-		user = auth.authenticate(username=username, password=password)
-	else:
-		user = request.user
+	# login_or_basic_auth_required has already authenticated the request,
+	# and the services work out what the user may see once for the whole request
+	user = request.auth_context
 		
 	transient = Transient.objects.filter(slug=slug)
 	data = {transient[0].name:{'transient':{},'host':{},'photometry':{},'spectra':{}}}
@@ -583,9 +461,11 @@ def download_data(request, slug):
 		data[transient[0].name]['spectra'] = json.loads(serializers.serialize("json", authorized_spectra, use_natural_foreign_keys=True))
 
 		for s,sd in zip(authorized_spectra,range(len(data[transient[0].name]['spectra']))):
-			specdata = SpectraService.GetAuthorizedHostSpecData_BySpectrum(user, s.id, includeBadData=True)
-			if specdata:
-				data[transient[0].name]['spectra'][sd]['data'] = json.loads(serializers.serialize("json", specdata, use_natural_foreign_keys=True))
+			del data[transient[0].name]['spectra'][sd]['fields']['spec_data']
+			specdata = s.get_spec_data()
+			if len(specdata):
+				data[transient[0].name]['spectra'][sd]['data'] = \
+					{k:[None if np.isnan(x) else x for x in specdata[k].tolist()] for k in specdata.dtype.names}
 
 	response = JsonResponse(data)
 	response['Content-Disposition'] = 'attachment; filename=%s' % '%s_data.json'%slug
@@ -595,13 +475,9 @@ def download_data(request, slug):
 @login_or_basic_auth_required
 def download_photometry(request, slug):
 
-	if 'HTTP_AUTHORIZATION' in request.META.keys():
-		auth_method, credentials = request.META['HTTP_AUTHORIZATION'].split(' ', 1)
-		credentials = base64.b64decode(credentials.strip()).decode('utf-8')
-		username, password = credentials.split(':', 1)
-		user = auth.authenticate(username=username, password=password)
-	else:
-		user = request.user
+	# login_or_basic_auth_required has already authenticated the request,
+	# and the services work out what the user may see once for the whole request
+	user = request.auth_context
 
 		
 	content = ""
@@ -706,29 +582,20 @@ def upload_spectrum(request):
 				tspec = tspec[0]
 			tspec.save()
 
-			existingspec = TransientSpecData.objects.filter(spectrum=tspec)
-			if len(existingspec):
-				for e in existingspec: e.delete()
-
+			wavelength,flux,flux_err = [],[],[]
 			for line in request.FILES['filename']:
 				line = line.decode('utf-8').replace('\n','')
 				if line.startswith('#'): continue
 				if len(line.split()) == 3:
-					wavelength,flux,flux_err = line.split()
-					wavelength,flux,flux_err = float(wavelength),float(flux),float(flux_err)
-					td = TransientSpecData.objects.create(
-						spectrum=tspec,wavelength=wavelength,flux=flux,flux_err=flux_err,
-						created_by=request.user,modified_by=request.user)
-					td.save()
+					w,f,fe = line.split()
+					wavelength += [float(w)]; flux += [float(f)]; flux_err += [float(fe)]
 				elif len(line.split()) == 2:
-					wavelength,flux = line.split()
-					wavelength,flux = float(wavelength),float(flux)
-					td = TransientSpecData.objects.create(
-						spectrum=tspec,wavelength=wavelength,flux=flux,
-						created_by=request.user,modified_by=request.user)
-					td.save()
+					w,f = line.split()
+					wavelength += [float(w)]; flux += [float(f)]; flux_err += [None]
 				else:
 					raise RuntimeError('bad input')
+			tspec.set_spec_data(wavelength,flux,flux_err=flux_err)
+			tspec.save()
 			
 			return redirect('transient_detail', slug=transient.slug) #HttpResponseRedirect(reverse_lazy('transient_detail',transient.slug))
 	else:
@@ -57,6 +57,14 @@ INSTALLED_APPS = [
 
 CRON_CLASSES = [
     'YSE_App.rapid.rapid_classify.rapid_classify_cron',
+    'YSE_App.common.ingest_errors.ingest_failure_digest_cron',
+    'YSE_App.common.user_query_cache.user_query_refresh_cron',
+]
+
+# run on every new transient by manage.py run_enrichments, see YSE_App/enrichments.py
+TRANSIENT_ENRICHMENTS = [
+    'YSE_App.enrichments.TESSEnrichment',
+    'YSE_App.enrichments.ThacherEnrichment',
 ]
 
 MIDDLEWARE = [
@@ -65,6 +73,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'YSE_App.data.AuthorizationContext.AuthorizationContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -115,6 +124,18 @@ DATABASES = {
     }
 }
 
+# The cache must be shared by every web worker and cron process: it holds
+# each user's group ids (access control) and the version counters that the
+# dashboard, followup and transient detail caches are invalidated through.
+# A process-local cache (Django's default LocMemCache) would let a worker
+# keep serving permissions and pages that another process has invalidated.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': config.get('cache', 'CACHE_LOCATION', fallback='127.0.0.1:11211'),
+    }
+}
+
 EXPLORER_CONNECTIONS = { 'Explorer': 'explorer' }
 EXPLORER_DEFAULT_CONNECTION = 'explorer'
 # Allow all users to access and modify SQL Explorer queries.
@@ -128,7 +149,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-       'rest_framework.authentication.BasicAuthentication',
+       'YSE_App.basicauth.CachedBasicAuthentication',
+       'rest_framework.authentication.TokenAuthentication',
        'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',